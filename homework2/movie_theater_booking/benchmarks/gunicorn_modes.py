@@ -0,0 +1,186 @@
+"""
+Compares gunicorn worker modes on the booking endpoints.
+
+Starts gunicorn with gunicorn.conf.py once per mode, hammers the endpoints with
+concurrent clients for a few seconds and prints requests/sec and latency.
+
+Each client also books a seat through POST /api/seats/<id>/book/, then cancels it so
+the seat is free for the next round. Reads and the booking write are reported on
+separate lines. The writes use HTTP Basic auth, so their latency includes hashing
+the password on every request.
+
+    cd homework2/movie_theater_booking
+    python benchmarks/gunicorn_modes.py --modes sync gthread --seconds 10 --clients 16
+
+Run it against a database that has data (python manage.py create_sample_data). The
+bookings are made as the sample data user; --read-only skips them.
+"""
+import argparse
+import base64
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+MODES = {
+    'sync': {'GUNICORN_WORKER_CLASS': 'sync'},
+    'gthread': {'GUNICORN_WORKER_CLASS': 'gthread'},
+    'uvicorn': {'GUNICORN_WORKER_CLASS': 'uvicorn.workers.UvicornWorker'},
+}
+
+ENDPOINTS = ['/api/movies/', '/api/seats/available/']
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_up(url, timeout=30):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        try:
+            urllib.request.urlopen(url, timeout=1)
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f"gunicorn did not come up at {url}")
+
+
+# Reads a list endpoint, paginated or not
+def fetch_list(base_url, path):
+    data = json.loads(urllib.request.urlopen(base_url + path).read())
+    return data['results'] if isinstance(data, dict) else data
+
+
+# Adds the seat booking page for the first movie, if there is one
+def endpoints_for(base_url, movies):
+    return ENDPOINTS + [f"/book/{movies[0]['id']}/"] if movies else ENDPOINTS
+
+
+# Authorization header for HTTP Basic auth, which the API accepts without a CSRF token
+def basic_auth(username, password):
+    return 'Basic ' + base64.b64encode(f'{username}:{password}'.encode()).decode()
+
+
+# POSTs JSON as the given user and returns the decoded response
+def post_json(auth, url, data):
+    request = urllib.request.Request(url, json.dumps(data).encode(), method='POST', headers={
+        'Content-Type': 'application/json', 'Authorization': auth,
+    })
+    return json.loads(urllib.request.urlopen(request, timeout=10).read())
+
+
+# One client: requests the endpoints in turn until the deadline. With credentials and a
+# seat, every round also books the seat and cancels the booking. A cancel that fails is
+# retried before the next booking and once more at the end, so the seat isn't left booked.
+# Returns latencies in seconds and error counts, keyed by 'read' and 'book'
+def client(base_url, endpoints, deadline, auth=None, seat_id=None, movie_id=None):
+    latencies = {'read': [], 'book': []}
+    errors = {'read': 0, 'book': 0}
+    uncancelled = None
+    index = 0
+    while time.time() < deadline:
+        if auth and seat_id and index % len(endpoints) == 0:
+            try:
+                if uncancelled is None:
+                    started = time.perf_counter()
+                    uncancelled = post_json(auth, f'{base_url}/api/seats/{seat_id}/book/', {'movie_id': movie_id})['id']
+                    latencies['book'].append(time.perf_counter() - started)
+                post_json(auth, f'{base_url}/api/bookings/{uncancelled}/cancel/', {})
+                uncancelled = None
+            except OSError:
+                errors['book'] += 1
+        url = base_url + endpoints[index % len(endpoints)]
+        index += 1
+        started = time.perf_counter()
+        try:
+            urllib.request.urlopen(url, timeout=10).read()
+            latencies['read'].append(time.perf_counter() - started)
+        except OSError:
+            errors['read'] += 1
+    if uncancelled is not None:
+        post_json(auth, f'{base_url}/api/bookings/{uncancelled}/cancel/', {})
+    return latencies, errors
+
+
+# One result line: requests/sec and latency percentiles for one kind of request
+def summary(label, latencies, errors, seconds):
+    latencies = sorted(latencies)
+    if not latencies:
+        return f"{label:<14} no successful requests ({errors} errors)"
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    return (
+        f"{label:<14} {len(latencies) / seconds:8.1f} req/s   "
+        f"p50 {statistics.median(latencies) * 1000:6.1f} ms   p95 {p95 * 1000:6.1f} ms   errors {errors}"
+    )
+
+
+def run_mode(name, env_overrides, args):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port), **env_overrides)
+    if args.workers:
+        env['WEB_CONCURRENCY'] = str(args.workers)
+    server = subprocess.Popen(
+        [sys.executable, '-m', 'gunicorn', '--access-logfile', '/dev/null'],
+        cwd=PROJECT_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+    base_url = f'http://127.0.0.1:{port}'
+    try:
+        wait_until_up(base_url + ENDPOINTS[0])
+        movies = fetch_list(base_url, '/api/movies/')
+        endpoints = endpoints_for(base_url, movies)
+        # Each client books its own seat so clients never race for the same one
+        seat_ids = []
+        if not args.read_only and movies:
+            seat_ids = [seat['id'] for seat in fetch_list(base_url, '/api/seats/available/')][:args.clients]
+        auth = basic_auth(args.username, args.password)
+        deadline = time.time() + args.seconds
+        with ThreadPoolExecutor(args.clients) as pool:
+            results = list(pool.map(
+                lambda i: client(
+                    base_url, endpoints, deadline,
+                    auth=auth,
+                    seat_id=seat_ids[i] if i < len(seat_ids) else None,
+                    movie_id=movies[0]['id'] if movies else None,
+                ),
+                range(args.clients),
+            ))
+    finally:
+        server.terminate()
+        server.wait()
+
+    lines = []
+    for kind in ['read', 'book'] if seat_ids else ['read']:
+        latencies = [l for result in results for l in result[0][kind]]
+        errors = sum(result[1][kind] for result in results)
+        lines.append(summary(f"{name} {kind}", latencies, errors, args.seconds))
+    return '\n'.join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--modes', nargs='+', choices=MODES, default=['sync', 'gthread'])
+    parser.add_argument('--seconds', type=float, default=10)
+    parser.add_argument('--clients', type=int, default=16)
+    parser.add_argument('--workers', type=int, help='overrides the worker count from gunicorn.conf.py')
+    parser.add_argument('--username', default='user', help='account the booking clients book as')
+    parser.add_argument('--password', default='user123')
+    parser.add_argument('--read-only', action='store_true', help='skip the POST /api/seats/<id>/book/ workload')
+    args = parser.parse_args()
+
+    for name in args.modes:
+        print(run_mode(name, MODES[name], args), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,174 @@
+"""
+Performance regression check for the booking endpoints.
+
+Seeds a SQLite database with 10k movies, 50k seats, 1k users and 1M bookings (times
+--scale), then times:
+
+    seats_available     SeatViewSet.available (every available seat, unpaginated)
+    booking_history     BookingViewSet.history for one user
+    movie_list          the home page with the movie list fragment cache cleared
+    movie_list_cached   the home page with the fragment cached
+    book                SeatViewSet.book, rolled back after each run
+
+Each benchmark keeps the best of --repeat runs and is compared with the baseline for
+the same scale in benchmarks/baselines.json. The script exits with status 1 when any
+result is more than --threshold slower than its baseline. Baselines are machine
+specific, record new ones with --update after an intended change or on a new machine.
+
+The seeded database is kept in the temp directory and reused by later runs.
+
+    cd homework2/movie_theater_booking
+    python benchmarks/regression.py                 # full size, seeds on first run
+    python benchmarks/regression.py --scale 0.1     # 1k movies, 5k seats, 100k bookings
+    python benchmarks/regression.py --update        # record the results as the baseline
+"""
+import argparse
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import timeit
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+BASELINES = Path(__file__).resolve().parent / 'baselines.json'
+
+MOVIES = 10_000
+SEATS = 50_000
+USERS = 1_000
+BOOKINGS = 1_000_000
+
+parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+parser.add_argument('--scale', type=float, default=1.0)
+parser.add_argument('--repeat', type=int, default=5)
+# Allowed slowdown before a benchmark counts as a regression, 0.25 = 25% slower
+parser.add_argument('--threshold', type=float, default=0.25)
+parser.add_argument('--update', action='store_true')
+parser.add_argument('--db', type=Path)
+args = parser.parse_args()
+
+database = args.db or Path(tempfile.gettempdir()) / f'movie_theater_benchmark_{args.scale:g}.sqlite3'
+sys.path.insert(0, str(PROJECT_DIR))
+os.environ['DATABASE_URL'] = f'sqlite:///{database}'
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movie_theater_booking.settings')
+os.environ['DEBUG'] = 'False'
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import AnonymousUser, User  # noqa: E402
+from django.core.cache import cache  # noqa: E402
+from django.core.management import call_command  # noqa: E402
+from django.db import connection, transaction  # noqa: E402
+from django.test import RequestFactory, override_settings  # noqa: E402
+from rest_framework.test import APIRequestFactory, force_authenticate  # noqa: E402
+
+from bookings import factories  # noqa: E402
+from bookings.models import Booking, Movie, Seat  # noqa: E402
+from bookings.views import BookingViewSet, SeatViewSet, movie_list  # noqa: E402
+from bookings.warmup import invalidate_movie_list  # noqa: E402
+
+
+def seed(scale):
+    call_command('migrate', verbosity=0)
+    call_command('createcachetable', verbosity=0)
+    if Booking.objects.exists():
+        return
+    counts = {name: max(int(count * scale), 1) for name, count in [
+        ('movies', MOVIES), ('seats', SEATS), ('users', USERS), ('bookings', BOOKINGS),
+    ]}
+    print(f"Seeding {database}: {', '.join(f'{count:,} {name}' for name, count in counts.items())}")
+    started = time.perf_counter()
+    with transaction.atomic():
+        factories.make_dataset(**counts)
+    print(f"Seeded in {time.perf_counter() - started:.1f}s")
+
+
+def benchmarks():
+    api = APIRequestFactory()
+    user = User.objects.order_by('id').first()
+    # The last movie has no bookings, so any seat can be booked for it
+    movie = Movie.objects.order_by('-id').first()
+    seat = Seat.objects.filter(booking_status='available').order_by('id').first()
+
+    available_view = SeatViewSet.as_view({'get': 'available'})
+    history_view = BookingViewSet.as_view({'get': 'history'})
+    book_view = SeatViewSet.as_view({'post': 'book'})
+
+    def seats_available():
+        available_view(api.get('/api/seats/available/')).render()
+
+    def booking_history():
+        request = api.get('/api/bookings/history/')
+        force_authenticate(request, user=user)
+        history_view(request).render()
+
+    def render_movie_list():
+        request = RequestFactory().get('/')
+        request.user = AnonymousUser()
+        return movie_list(request)
+
+    def movie_list_cold():
+        invalidate_movie_list()
+        render_movie_list()
+
+    def book():
+        request = api.post(f'/api/seats/{seat.id}/book/', {'movie_id': movie.id}, format='json')
+        force_authenticate(request, user=user)
+        with transaction.atomic():
+            response = book_view(request, pk=seat.id)
+            assert response.status_code == 201, response.data
+            transaction.set_rollback(True)
+
+    render_movie_list()
+    return {
+        'seats_available': seats_available,
+        'booking_history': booking_history,
+        'movie_list': movie_list_cold,
+        'movie_list_cached': render_movie_list,
+        'book': book,
+    }
+
+
+def main():
+    seed(args.scale)
+    cache.clear()
+    results = {}
+    for name, benchmark in benchmarks().items():
+        benchmark()
+        results[name] = min(timeit.repeat(benchmark, number=1, repeat=args.repeat))
+
+    baselines = json.loads(BASELINES.read_text()) if BASELINES.exists() else {}
+    key = f'{args.scale:g}'
+    baseline = baselines.get(key, {}).get('results', {})
+    regressions = []
+    print(f"\nscale {key}, best of {args.repeat}, threshold {args.threshold:.0%}")
+    for name, seconds in results.items():
+        line = f"  {name:<20}{seconds * 1000:10.2f}ms"
+        if name in baseline:
+            change = seconds / baseline[name] - 1
+            line += f"   baseline {baseline[name] * 1000:10.2f}ms  {change:+7.1%}"
+            if change > args.threshold:
+                regressions.append(name)
+                line += "  REGRESSION"
+        print(line)
+
+    if args.update:
+        baselines[key] = {
+            'machine': f"{platform.machine()}, {os.cpu_count()} CPUs, Python {platform.python_version()}, "
+                       f"SQLite {connection.Database.sqlite_version}",
+            'results': {name: round(seconds, 6) for name, seconds in results.items()},
+        }
+        BASELINES.write_text(json.dumps(baselines, indent=2, sort_keys=True) + '\n')
+        print(f"Baseline for scale {key} written to {BASELINES.name}")
+    elif regressions:
+        print(f"\n{len(regressions)} regressed: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    with override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage'):
+        main()
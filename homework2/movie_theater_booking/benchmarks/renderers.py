@@ -0,0 +1,74 @@
+"""
+Serialization throughput of the seat and booking lists.
+
+Builds in-memory seats and bookings (no database needed), serializes them with the
+API serializers and times rendering the result with DRF's stdlib JSONRenderer and
+with FastJSONRenderer.
+
+    cd homework2/movie_theater_booking
+    python benchmarks/renderers.py --rows 5000
+"""
+import argparse
+import os
+import sys
+import timeit
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'movie_theater_booking.settings')
+
+import django  # noqa: E402
+
+django.setup()
+
+from django.contrib.auth.models import User  # noqa: E402
+from rest_framework.renderers import JSONRenderer  # noqa: E402
+
+from bookings import renderers  # noqa: E402
+from bookings.models import Booking, Movie, Seat  # noqa: E402
+from bookings.serializers import BookingSerializer, SeatSerializer  # noqa: E402
+
+
+def build_rows(count):
+    movie = Movie(id=1, title='Benchmark Movie', description='x' * 200, release_date=date.today(), duration=120)
+    user = User(id=1, username='benchmark')
+    seats = [Seat(id=i, seat_number=f'{chr(65 + i % 26)}{i}', booking_status='available') for i in range(count)]
+    now = datetime.now()
+    bookings = []
+    for i, seat in enumerate(seats):
+        booking = Booking(id=i, movie=movie, seat=seat, user=user)
+        booking.booking_date = now - timedelta(minutes=i)
+        bookings.append(booking)
+    return seats, bookings
+
+
+def rate(rows, seconds):
+    return f"{rows / seconds:12,.0f} rows/s"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--rows', type=int, default=5000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    seats, bookings = build_rows(args.rows)
+    print(f"orjson installed: {renderers.orjson is not None}")
+    for name, serializer_class, objects in [
+        ('seats', SeatSerializer, seats),
+        ('bookings', BookingSerializer, bookings),
+    ]:
+        serialize = lambda: serializer_class(objects, many=True).data
+        data = serialize()
+        serialize_time = min(timeit.repeat(serialize, number=1, repeat=args.repeat))
+        stdlib_time = min(timeit.repeat(lambda: JSONRenderer().render(data), number=1, repeat=args.repeat))
+        fast_time = min(timeit.repeat(lambda: renderers.FastJSONRenderer().render(data), number=1, repeat=args.repeat))
+        print(f"\n{name} ({args.rows} rows)")
+        print(f"  serializer          {rate(args.rows, serialize_time)}")
+        print(f"  JSONRenderer        {rate(args.rows, stdlib_time)}")
+        print(f"  FastJSONRenderer    {rate(args.rows, fast_time)}   ({stdlib_time / fast_time:.1f}x)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,48 @@
+"""
+Wall-clock time of the bookings test suite, serial and in parallel processes.
+
+Runs manage.py test once per process count (each run repeated --repeat times, best
+kept) and prints the time and the speedup over the first count, serial by default.
+Parallel runs split the suite by test class, one database clone per process.
+
+    cd homework2/movie_theater_booking
+    python benchmarks/test_suite.py --processes 1 2 4
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+from pathlib import Path
+
+PROJECT_DIR = Path(__file__).resolve().parent.parent
+
+
+def run_suite(processes, labels):
+    command = [sys.executable, 'manage.py', 'test', *labels, '--noinput', '--parallel', str(processes)]
+    started = time.perf_counter()
+    result = subprocess.run(command, cwd=PROJECT_DIR, capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode:
+        sys.stderr.write(result.stderr)
+        raise SystemExit(f"Test run with {processes} processes failed")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--processes', type=int, nargs='+', default=[1, 2, 4])
+    parser.add_argument('--repeat', type=int, default=3)
+    parser.add_argument('labels', nargs='*', default=['bookings'])
+    args = parser.parse_args()
+
+    print(f"CPUs: {os.cpu_count()}")
+    serial = None
+    for processes in args.processes:
+        elapsed = min(run_suite(processes, args.labels) for _ in range(args.repeat))
+        serial = serial or elapsed
+        print(f"  {processes:>2} processes  {elapsed:7.2f}s   ({serial / elapsed:.2f}x)")
+
+
+if __name__ == '__main__':
+    main()
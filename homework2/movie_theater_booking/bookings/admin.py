@@ -1,5 +1,70 @@
-from django.contrib import admin
-from .models import Movie, Seat, Booking
+from django.contrib import admin, messages
+from django.contrib.admin.views.main import PAGE_VAR
+from django.contrib.auth.models import User
+from django.core.paginator import Paginator
+from django.db import connections
+from django.db.models import Q
+from django.db.models.functions import Substr
+from django.utils.functional import cached_property
+from .models import (
+    Movie, Seat, Booking, WaitlistEntry, Job, ArchivedBooking, Auditorium, Showtime, BookingEvent, Theater,
+)
+from .search import matching_movie_ids
+
+
+# Paginator that reads the planner's row estimate instead of running COUNT(*) over
+# big unfiltered tables. Small or filtered querysets still get an exact count
+class EstimatedCountPaginator(Paginator):
+    # Below this many rows an exact count is cheap enough
+    estimate_threshold = 100000
+
+    @cached_property
+    def count(self):
+        queryset = self.object_list
+        connection = connections[queryset.db]
+        if connection.vendor == 'postgresql' and not queryset.query.where:
+            with connection.cursor() as cursor:
+                # A partitioned parent holds no rows itself (its reltuples is -1 or 0), so
+                # its partitions' estimates are summed instead. -1 means never analyzed
+                cursor.execute(
+                    """SELECT GREATEST(
+                        (SELECT reltuples FROM pg_class WHERE oid = %s::regclass),
+                        (SELECT COALESCE(SUM(GREATEST(child.reltuples, 0)), 0)
+                         FROM pg_inherits JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+                         WHERE pg_inherits.inhparent = %s::regclass)
+                    )::bigint""",
+                    [queryset.model._meta.db_table] * 2,
+                )
+                row = cursor.fetchone()
+            if row and row[0] > self.estimate_threshold:
+                return row[0]
+        return super().count
+
+
+# Filter that shows a text box instead of a link per movie, so the sidebar
+# doesn't load every movie. Matches titles through the full-text index
+class MovieTitleFilter(admin.SimpleListFilter):
+    title = 'movie'
+    parameter_name = 'movie_title'
+    template = 'admin/bookings/input_filter.html'
+
+    # One placeholder choice so the admin renders the filter
+    def lookups(self, request, model_admin):
+        return ((None, ''),)
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(movie_id__in=matching_movie_ids(self.value()))
+        return queryset
+
+    # Hidden inputs keep the other active filters and search when the form is submitted
+    def choices(self, changelist):
+        all_choice = next(super().choices(changelist))
+        all_choice['query_parts'] = [
+            (key, value) for key, value in changelist.params.items()
+            if key not in (self.parameter_name, PAGE_VAR)
+        ]
+        yield all_choice
 
 @admin.register(Movie)
 class MovieAdmin(admin.ModelAdmin):
@@ -7,15 +72,152 @@ class MovieAdmin(admin.ModelAdmin):
     list_filter = ['release_date']
     search_fields = ['title', 'description']
 
+    # Uses the full-text index instead of icontains scans over every description
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip():
+            return queryset, False
+        return queryset.filter(id__in=matching_movie_ids(search_term)), False
+
+# Filters seats by row (the letter their seat number starts with) so a whole row
+# can be selected and changed with one action
+class SeatRowFilter(admin.SimpleListFilter):
+    title = 'row'
+    parameter_name = 'row'
+
+    def lookups(self, request, model_admin):
+        rows = (
+            Seat.objects.annotate(row=Substr('seat_number', 1, 1))
+            .order_by('row').values_list('row', flat=True).distinct()
+        )
+        return [(row, f'Row {row}') for row in rows]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(seat_number__startswith=self.value())
+        return queryset
+
+@admin.register(Theater)
+class TheaterAdmin(admin.ModelAdmin):
+    list_display = ['name']
+    search_fields = ['name']
+
 @admin.register(Seat)
 class SeatAdmin(admin.ModelAdmin):
-    list_display = ['seat_number', 'booking_status']
-    list_filter = ['booking_status']
+    list_display = ['seat_number', 'theater', 'booking_status', 'seat_class']
+    list_select_related = ['theater']
+    list_filter = ['theater', 'booking_status', 'seat_class', SeatRowFilter]
     search_fields = ['seat_number']
+    actions = ['mark_maintenance', 'mark_available']
+
+    # Runs one UPDATE for the whole selection and reports the seats it had to skip
+    def _set_status(self, request, queryset, status):
+        selected = queryset.count()
+        changed = queryset.set_status(status)
+        protected = queryset.filter(booking_status__in=Seat.PROTECTED_STATUSES).count()
+        self.message_user(request, f"{changed} seats marked {status}.", messages.SUCCESS)
+        if protected:
+            self.message_user(
+                request, f"{protected} of {selected} selected seats are booked or held and were skipped.",
+                messages.WARNING,
+            )
+
+    @admin.action(description='Mark selected seats as maintenance')
+    def mark_maintenance(self, request, queryset):
+        self._set_status(request, queryset, 'maintenance')
+
+    @admin.action(description='Mark selected seats as available')
+    def mark_available(self, request, queryset):
+        self._set_status(request, queryset, 'available')
 
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
-    list_display = ['user', 'movie', 'seat', 'booking_date']
-    list_filter = ['booking_date', 'movie']
+    list_display = ['user', 'movie', 'seat', 'theater', 'booking_date']
+    # Joins user, movie, seat and theater in the changelist query instead of one query per row
+    list_select_related = ['user', 'movie', 'seat', 'theater']
+    list_filter = ['theater', 'booking_date', MovieTitleFilter]
     search_fields = ['user__username', 'movie__title', 'seat__seat_number']
+    search_help_text = 'Exact username or seat number, or words from the movie title'
     readonly_fields = ['booking_date']
+    # Select boxes on the edit form would load every user, movie and seat
+    autocomplete_fields = ['user', 'movie', 'seat']
+    paginator = EstimatedCountPaginator
+    # Skips the second COUNT(*) over the whole table when filtering
+    show_full_result_count = False
+
+    # Resolves the term to user, seat and movie ids through their own indexes first so
+    # the booking query is a lookup on the foreign key indexes instead of joined LIKE scans
+    def get_search_results(self, request, queryset, search_term):
+        search_term = search_term.strip()
+        if not search_term:
+            return queryset, False
+        user_ids = User.objects.filter(username=search_term).values('id')
+        seat_ids = Seat.objects.filter(seat_number=search_term).values('id')
+        movie_ids = matching_movie_ids(search_term)
+        return queryset.filter(
+            Q(user_id__in=user_ids) | Q(seat_id__in=seat_ids) | Q(movie_id__in=movie_ids)
+        ), False
+
+    # Deleting bookings from the admin releases their seats instead of leaking them
+    def delete_model(self, request, obj):
+        obj.cancel()
+
+    def delete_queryset(self, request, queryset):
+        queryset.cancel()
+
+
+@admin.register(WaitlistEntry)
+class WaitlistEntryAdmin(admin.ModelAdmin):
+    list_display = ['user', 'movie', 'theater', 'status', 'seat', 'offer_expires_at', 'created_at']
+    list_filter = ['theater', 'status']
+    search_fields = ['user__username', 'movie__title']
+    readonly_fields = ['created_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['name', 'status', 'attempts', 'run_at', 'finished_at']
+    list_filter = ['status', 'name']
+    readonly_fields = ['created_at', 'finished_at', 'last_error']
+
+
+@admin.register(ArchivedBooking)
+class ArchivedBookingAdmin(admin.ModelAdmin):
+    list_display = ['booking_id', 'user', 'movie_title', 'seat_number', 'booking_date']
+    list_select_related = ['user']
+    search_fields = ['=booking_id', 'movie_title']
+    raw_id_fields = ['user']
+
+
+@admin.register(Auditorium)
+class AuditoriumAdmin(admin.ModelAdmin):
+    list_display = ['name', 'theater', 'cleaning_minutes']
+    list_filter = ['theater']
+
+
+# Showtime.clean rejects overlaps when a showtime is added or moved by hand
+@admin.register(Showtime)
+class ShowtimeAdmin(admin.ModelAdmin):
+    list_display = ['movie', 'theater', 'auditorium', 'starts_at', 'ends_at', 'booked_count']
+    list_select_related = ['movie', 'theater', 'auditorium']
+    list_filter = ['theater', 'auditorium', 'starts_at']
+    readonly_fields = ['ends_at', 'price_table', 'booked_count']
+    autocomplete_fields = ['movie']
+
+
+# Read-only view of the event log
+@admin.register(BookingEvent)
+class BookingEventAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'seat_id', 'booking_id', 'showtime_id', 'user_id', 'refund', 'created_at']
+    list_filter = ['kind']
+    search_fields = ['=seat_id', '=booking_id', '=user_id']
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_delete_permission(self, request, obj=None):
+        return False
@@ -4,3 +4,8 @@ from django.apps import AppConfig
 class BookingsConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'bookings'
+
+    # Registers background jobs, seat-map and movie list cache invalidation, price tables,
+    # event logging for cascade deletes and their signal receivers
+    def ready(self):
+        from . import events, pricing, seatmap, tasks, warmup  # noqa: F401
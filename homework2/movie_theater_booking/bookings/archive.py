@@ -0,0 +1,38 @@
+from django.db import transaction
+
+from .models import ArchivedBooking, Booking, without_seat_release
+
+
+# Moves bookings made before cutoff into ArchivedBooking, batch_size rows per transaction.
+# Archiving isn't a cancellation: the rows are deleted inside without_seat_release(), so
+# seats, showtime counts and the event log are left as they are. Returns how many were moved
+def archive_bookings(cutoff, batch_size=5000):
+    total = 0
+    while True:
+        with transaction.atomic():
+            rows = list(
+                Booking.objects.filter(booking_date__lt=cutoff)
+                .order_by('id')
+                .values_list(
+                    'id', 'user_id', 'movie_id', 'movie__title', 'seat__seat_number', 'booking_date', 'theater_id',
+                )
+                [:batch_size]
+            )
+            if not rows:
+                break
+            ArchivedBooking.objects.bulk_create(
+                [
+                    ArchivedBooking(
+                        booking_id=booking_id, user_id=user_id, movie_id=movie_id,
+                        movie_title=movie_title, seat_number=seat_number, booking_date=booking_date,
+                        theater_id=theater_id,
+                    )
+                    for booking_id, user_id, movie_id, movie_title, seat_number, booking_date, theater_id in rows
+                ]
+            )
+            with without_seat_release():
+                Booking.objects.filter(id__in=[row[0] for row in rows]).delete()
+        total += len(rows)
+        if len(rows) < batch_size:
+            break
+    return total
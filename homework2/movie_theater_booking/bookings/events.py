@@ -0,0 +1,84 @@
+from collections import Counter, defaultdict
+
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from . import seatmap
+from .models import Booking, BookingEvent, Seat, Showtime, releases_seats_on_delete
+from .signals import seats_changed
+
+
+# Folds the log, oldest first, into seat statuses and net bookings per showtime.
+# Reads batch_size events at a time so memory holds the state, not the log.
+# until limits the replay to events at or before that time for a point-in-time view
+def replay(until=None, batch_size=10000):
+    statuses = {}
+    booked = Counter()
+    events = BookingEvent.objects.order_by('id')
+    if until is not None:
+        events = events.filter(created_at__lte=until)
+    rows = events.values_list('kind', 'seat_id', 'showtime_id')
+    for kind, seat_id, showtime_id in rows.iterator(chunk_size=batch_size):
+        required, status = BookingEvent.TRANSITIONS[kind]
+        if required is None or statuses.get(seat_id, 'available') == required:
+            statuses[seat_id] = status
+        if showtime_id and kind == 'book':
+            booked[showtime_id] += 1
+        elif showtime_id and kind == 'cancel':
+            booked[showtime_id] -= 1
+    return statuses, booked
+
+
+# Writes replayed state back: one UPDATE per status per batch of seats and one per
+# distinct counter value. Seats with no events are available. Returns (seats, showtimes) changed
+def apply_state(statuses, booked, batch_size=10000):
+    by_status = defaultdict(list)
+    with transaction.atomic():
+        current = Seat.objects.select_for_update().values_list('id', 'booking_status')
+        for seat_id, status in current.iterator(chunk_size=batch_size):
+            target = statuses.get(seat_id, 'available')
+            if target != status:
+                by_status[target].append(seat_id)
+        for status, seat_ids in by_status.items():
+            for start in range(0, len(seat_ids), batch_size):
+                Seat.objects.filter(id__in=seat_ids[start:start + batch_size]).update(booking_status=status)
+
+        by_count = defaultdict(list)
+        counters = Showtime.objects.select_for_update().values_list('id', 'booked_count')
+        for showtime_id, count in counters.iterator(chunk_size=batch_size):
+            target = max(booked.get(showtime_id, 0), 0)
+            if target != count:
+                by_count[target].append(showtime_id)
+        for count, showtime_ids in by_count.items():
+            for start in range(0, len(showtime_ids), batch_size):
+                Showtime.objects.filter(id__in=showtime_ids[start:start + batch_size]).update(booked_count=count)
+
+        transaction.on_commit(seatmap.invalidate)
+    return sum(map(len, by_status.values())), sum(map(len, by_count.values()))
+
+
+# Bookings removed by a cascade (deleting their movie, user or showtime's movie) release
+# their seat and are logged as cancellations, like Booking.cancel(). cancel() and archiving
+# delete inside without_seat_release(), so this only acts on cascades
+@receiver(post_delete, sender=Booking)
+def booking_deleted_release_seat(sender, instance, using, **kwargs):
+    if not releases_seats_on_delete():
+        return
+    if not Seat._base_manager.using(using).filter(id=instance.seat_id, booking_status='booked').update(
+        booking_status='available'
+    ):
+        return
+    BookingEvent.record(
+        'cancel', [instance.seat_id], booking_id=instance.id, movie_id=instance.movie_id,
+        showtime_id=instance.showtime_id, user_id=instance.user_id, refund=instance.price,
+    )
+    if instance.showtime_id:
+        Showtime.objects.using(using).filter(id=instance.showtime_id).update(
+            booked_count=Greatest(F('booked_count') - 1, 0)
+        )
+    transaction.on_commit(
+        lambda: seats_changed.send(sender=Seat, seat_ids=[instance.seat_id], status='available'), using=using,
+    )
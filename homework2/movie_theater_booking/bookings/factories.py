@@ -0,0 +1,90 @@
+from datetime import date, timedelta
+from itertools import islice
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+
+from .models import Booking, Movie, Seat, Theater, default_theater_id
+
+# Builders for large test and benchmark datasets. Rows go in with bulk_create, so model
+# save() and signals are skipped: callers that read seat maps, prices or the movie list
+# afterwards must clear those caches themselves
+BATCH_SIZE = 2000
+
+SEAT_CLASSES = [seat_class for seat_class, _ in Seat.SEAT_CLASS_CHOICES]
+
+
+# Inserts rows from an iterable batch by batch so only one batch is in memory.
+# Returns the saved objects, or just how many were saved when keep is False
+def bulk_insert(model, rows, batch_size=BATCH_SIZE, keep=True):
+    rows = iter(rows)
+    saved = []
+    count = 0
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            break
+        model.objects.bulk_create(batch)
+        count += len(batch)
+        if keep:
+            saved.extend(batch)
+    return saved if keep else count
+
+
+# Every user shares one password hash, so thousands of users cost one hash
+def make_users(count, prefix='user', password='testpass123'):
+    hashed = make_password(password)
+    return bulk_insert(User, (User(username=f'{prefix}{i}', password=hashed) for i in range(count)))
+
+
+# Release dates step back a day per movie so ordering by release date is meaningful
+def make_movies(count, prefix='Movie', duration=120):
+    today = date.today()
+    return bulk_insert(Movie, (
+        Movie(
+            title=f'{prefix} {i}', description=f'Description of {prefix.lower()} {i}',
+            release_date=today - timedelta(days=i), duration=duration,
+        )
+        for i in range(count)
+    ))
+
+
+# Seats A0, A1, ... in one theater, cycling through the price classes
+def make_seats(count, theater=None, prefix='A', booking_status='available'):
+    theater_id = theater.id if theater else default_theater_id()
+    return bulk_insert(Seat, (
+        Seat(
+            theater_id=theater_id, seat_number=f'{prefix}{i}', booking_status=booking_status,
+            seat_class=SEAT_CLASSES[i % len(SEAT_CLASSES)],
+        )
+        for i in range(count)
+    ))
+
+
+# Books every seat for the first movie, then every seat for the next, and so on, so
+# (movie, seat) pairs never repeat. Users take turns. Returns how many were created
+def make_bookings(count, movies, seats, users):
+    if count > len(movies) * len(seats):
+        raise ValueError(f"{len(movies)} movies x {len(seats)} seats can't hold {count} bookings")
+    rows = (
+        Booking(
+            movie_id=movies[i // len(seats)].id, seat_id=seats[i % len(seats)].id,
+            user_id=users[i % len(users)].id, theater_id=seats[i % len(seats)].theater_id,
+        )
+        for i in range(count)
+    )
+    return bulk_insert(Booking, rows, keep=False)
+
+
+# A theater's worth of data in one call. Returns the theater, movies, seats, users and booking count
+def make_dataset(movies=10, seats=50, bookings=100, users=10, theater=None):
+    if theater is None:
+        theater = Theater.objects.get(id=default_theater_id())
+    dataset = {
+        'theater': theater,
+        'movies': make_movies(movies),
+        'seats': make_seats(seats, theater=theater),
+        'users': make_users(users),
+    }
+    dataset['bookings'] = make_bookings(bookings, dataset['movies'], dataset['seats'], dataset['users'])
+    return dataset
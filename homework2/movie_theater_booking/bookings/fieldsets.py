@@ -0,0 +1,94 @@
+from django.core.exceptions import FieldDoesNotExist
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+FIELDS_PARAM = 'fields'
+EXPAND_PARAM = 'expand'
+
+
+def _split(request, param):
+    value = request.query_params.get(param, '') if request is not None else ''
+    return {name.strip() for name in value.split(',') if name.strip()}
+
+
+# Trims the output to ?fields=a,b and swaps the foreign keys named in ?expand= for the
+# nested object. Only applies to the top-level serializer the view built with a request.
+# Reads only: trimming a write serializer would silently drop the fields it left out
+class SparseFieldsMixin:
+    # Field name: serializer class used for it when expanded
+    expandable_fields = {}
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        wanted, expand = _split(request, FIELDS_PARAM), _split(request, EXPAND_PARAM)
+        if (wanted or expand) and request.method not in SAFE_METHODS:
+            raise serializers.ValidationError({'fields': "?fields= and ?expand= only apply to reads"})
+
+        unknown = (wanted - set(self.fields)) | (expand - set(self.expandable_fields))
+        if unknown:
+            raise serializers.ValidationError({'fields': f"Unknown fields: {', '.join(sorted(unknown))}"})
+
+        for name in expand:
+            self.fields[name] = self.expandable_fields[name](read_only=True)
+        if wanted:
+            for name in set(self.fields) - wanted - expand:
+                self.fields.pop(name)
+
+
+# Limits the queryset to the columns the serializer reads: only() for plain fields and
+# select_related() for dotted sources and expanded objects. Returns it unchanged if any
+# field reads something that is not a model field, since that can't be deferred safely
+def narrow_queryset(queryset, serializer):
+    only, related = set(), set()
+    for field in serializer.fields.values():
+        if field.write_only:
+            continue
+        path = _model_path(queryset.model, field.source_attrs)
+        if path is None:
+            return queryset
+        if isinstance(field, serializers.BaseSerializer):
+            related.add(path)
+            nested = narrow_queryset(field.Meta.model.objects.all(), field)
+            if not nested.query.deferred_loading[0]:
+                return queryset
+            only.add(path)
+            only.update(f'{path}__{name}' for name in nested.query.deferred_loading[0])
+            continue
+        parts = path.split('__')
+        only.add(path)
+        for depth in range(1, len(parts)):
+            related.add('__'.join(parts[:depth]))
+            only.add('__'.join(parts[:depth]))
+    if related:
+        queryset = queryset.select_related(*sorted(related))
+    return queryset.only(*sorted(only))
+
+
+# Turns source attributes into an ORM path, or None if one of them isn't a concrete field
+def _model_path(model, attrs):
+    names = []
+    for attr in attrs:
+        if model is None:
+            return None
+        try:
+            field = model._meta.get_field(attr)
+        except FieldDoesNotExist:
+            return None
+        if not field.concrete:
+            return None
+        names.append(field.name)
+        model = field.related_model
+    return '__'.join(names) if names else None
+
+
+# Builds list and detail querysets from the serializer that will render them, so
+# ?fields= also trims the SELECT and related rows come in one join instead of N queries
+class SparseQuerysetMixin:
+    sparse_actions = ('list', 'retrieve')
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        if self.action not in self.sparse_actions:
+            return queryset
+        return narrow_queryset(queryset, self.get_serializer())
@@ -0,0 +1,98 @@
+import logging
+import traceback
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Job
+from .routers import use_primary
+
+logger = logging.getLogger(__name__)
+
+# Jobs still marked running after this long are assumed to belong to a dead worker
+LOCK_TIMEOUT_SECONDS = getattr(settings, 'JOB_LOCK_TIMEOUT_SECONDS', 300)
+
+# Job functions by name, filled in by the @job decorator
+registry = {}
+
+
+# Registers a function so it can be queued by name with enqueue()
+def job(func):
+    registry[func.__name__] = func
+    return func
+
+
+# Queues a job to run later in the worker. The row is written in the caller's
+# transaction so the job only exists if the work that queued it commits
+def enqueue(name, run_at=None, unique=False, **payload):
+    if name not in registry:
+        raise ValueError(f"Unknown job: {name}")
+    # unique=True skips the insert when an identical job is already waiting
+    if unique and Job.objects.filter(name=name, payload=payload, status='queued').exists():
+        return None
+    return Job.objects.create(name=name, payload=payload, run_at=run_at or timezone.now())
+
+
+# Claims up to batch_size due jobs. Uses SELECT ... FOR UPDATE SKIP LOCKED so
+# several workers can poll the same table without handing out a job twice.
+# Stale running jobs are retried only while they have attempts left, the rest are
+# marked failed so a job that keeps killing its worker stops being picked up
+def claim_jobs(batch_size=10):
+    now = timezone.now()
+    stale = now - timedelta(seconds=LOCK_TIMEOUT_SECONDS)
+    with transaction.atomic():
+        Job.objects.filter(status='running', locked_at__lt=stale, attempts__gte=F('max_attempts')).update(
+            status='failed', finished_at=now, last_error='Worker stopped responding during the last attempt',
+        )
+        jobs = list(
+            Job.objects.select_for_update(skip_locked=True)
+            .filter(
+                Q(status='queued', run_at__lte=now)
+                | Q(status='running', locked_at__lt=stale, attempts__lt=F('max_attempts'))
+            )
+            [:batch_size]
+        )
+        Job.objects.filter(id__in=[j.id for j in jobs]).update(
+            status='running', locked_at=now, attempts=F('attempts') + 1
+        )
+    for j in jobs:
+        j.attempts += 1
+    return jobs
+
+
+# Runs one claimed job and records the result. Failures are retried with
+# exponential backoff until max_attempts is reached
+def run_job(j):
+    try:
+        # Jobs usually follow a write that the replica may not have yet
+        with use_primary():
+            registry[j.name](**j.payload)
+    except Exception:
+        logger.exception("Job %s (%s) failed", j.id, j.name)
+        j.last_error = traceback.format_exc()
+        if j.attempts >= j.max_attempts:
+            j.status = 'failed'
+            j.finished_at = timezone.now()
+        else:
+            j.status = 'queued'
+            j.run_at = timezone.now() + timedelta(seconds=2 ** j.attempts * 10)
+        j.save(update_fields=['status', 'run_at', 'last_error', 'finished_at'])
+        return False
+    j.status = 'done'
+    j.finished_at = timezone.now()
+    j.save(update_fields=['status', 'finished_at'])
+    return True
+
+
+# Claims and runs one batch of jobs. Returns (succeeded, failed)
+def run_jobs(batch_size=10):
+    succeeded = failed = 0
+    for j in claim_jobs(batch_size):
+        if run_job(j):
+            succeeded += 1
+        else:
+            failed += 1
+    return succeeded, failed
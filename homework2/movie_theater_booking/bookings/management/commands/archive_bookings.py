@@ -0,0 +1,34 @@
+import time
+from datetime import datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+
+from bookings.archive import archive_bookings
+
+
+class Command(BaseCommand):
+    help = "Moves old bookings into the compact ArchivedBooking table in batches"
+
+    def add_arguments(self, parser):
+        # Archive bookings made before this date (YYYY-MM-DD) ...
+        parser.add_argument('--before')
+        # ... or more than this many days ago
+        parser.add_argument('--days', type=int, default=180)
+        parser.add_argument('--batch-size', type=int, default=5000)
+
+    def handle(self, *args, **options):
+        if options['before']:
+            try:
+                cutoff = datetime.fromisoformat(options['before'])
+            except ValueError:
+                raise CommandError("--before must be a date like 2024-01-01")
+        else:
+            cutoff = timezone.now() - timedelta(days=options['days'])
+
+        started = time.perf_counter()
+        moved = archive_bookings(cutoff, batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Archived {moved} bookings made before {cutoff:%Y-%m-%d} in {elapsed:.1f}s"
+        ))
@@ -0,0 +1,36 @@
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.partitions import archive_partitions, ensure_partitions, is_partitioned, list_partitions
+
+
+class Command(BaseCommand):
+    help = "Rolls monthly Booking partitions forward and archives old ones (PostgreSQL only)"
+
+    def add_arguments(self, parser):
+        # Months past the current one to create partitions for
+        parser.add_argument('--ahead', type=int, default=3)
+        # Detach partitions for months ending on or before this date (YYYY-MM-DD)
+        parser.add_argument('--archive-before')
+        parser.add_argument('--list', action='store_true')
+
+    def handle(self, *args, **options):
+        if not is_partitioned():
+            self.stdout.write("Booking table is not partitioned on this database, nothing to do")
+            return
+
+        for name in ensure_partitions(ahead=options['ahead']):
+            self.stdout.write(f"Created {name}")
+
+        if options['archive_before']:
+            try:
+                cutoff = date.fromisoformat(options['archive_before'])
+            except ValueError:
+                raise CommandError("--archive-before must be a date like 2024-01-01")
+            for name in archive_partitions(cutoff):
+                self.stdout.write(f"Archived to {name}")
+
+        if options['list']:
+            for name, bounds, rows in list_partitions():
+                self.stdout.write(f"{name}: {bounds} (~{max(rows, 0)} rows)")
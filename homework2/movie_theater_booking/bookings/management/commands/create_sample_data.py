@@ -1,5 +1,5 @@
 from django.core.management.base import BaseCommand
-from bookings.models import Movie, Seat
+from bookings.models import Movie, Seat, default_theater_id
 from django.contrib.auth.models import User
 from datetime import date
 
@@ -25,8 +25,11 @@ class Command(BaseCommand):
         )
 
         # Create sample seats
+        theater_id = default_theater_id()
         for seat_number in ["A1", "A2", "A3", "B1", "B2", "B3"]:
-            Seat.objects.get_or_create(seat_number=seat_number, defaults={"booking_status": "available"})
+            Seat.objects.get_or_create(
+                theater_id=theater_id, seat_number=seat_number, defaults={"booking_status": "available"}
+            )
 
         # Create a test user
         if not User.objects.filter(username="user").exists():
@@ -0,0 +1,53 @@
+import time as timer
+from datetime import date, datetime, timedelta
+
+from django.core.management.base import BaseCommand, CommandError
+
+from bookings.scheduling import plan_week, schedule_showtimes
+from bookings.tenancy import use_theater
+
+
+def parse_time(value):
+    try:
+        return datetime.strptime(value, '%H:%M').time()
+    except ValueError:
+        raise CommandError(f"Expected HH:MM, got {value!r}")
+
+
+class Command(BaseCommand):
+    help = "Schedules a week of showtimes in every auditorium around the showtimes that already exist"
+
+    def add_arguments(self, parser):
+        # Defaults to next Monday
+        parser.add_argument('--start', type=date.fromisoformat)
+        parser.add_argument('--days', type=int, default=7)
+        parser.add_argument('--opens', type=parse_time, default='10:00')
+        parser.add_argument('--closes', type=parse_time, default='23:00')
+        # Showtimes start on multiples of this many minutes
+        parser.add_argument('--step', type=int, default=5)
+        parser.add_argument('--dry-run', action='store_true')
+        # Only schedule this theater's auditoriums
+        parser.add_argument('--theater', type=int)
+
+    def handle(self, *args, **options):
+        start = options['start']
+        if start is None:
+            today = date.today()
+            start = today + timedelta(days=7 - today.weekday())
+
+        started = timer.perf_counter()
+        with use_theater(options['theater']):
+            proposals = plan_week(
+                start, days=options['days'], opens=options['opens'], closes=options['closes'], step=options['step'],
+            )
+        if options['dry_run']:
+            for showtime in proposals:
+                self.stdout.write(f"{showtime.starts_at:%a %Y-%m-%d %H:%M}  {showtime.auditorium}  {showtime.movie_id}")
+            self.stdout.write(f"Would create {len(proposals)} showtimes")
+            return
+
+        created, rejected = schedule_showtimes(proposals)
+        elapsed = timer.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(
+            f"Created {len(created)} showtimes from {start} in {elapsed:.2f}s, {len(rejected)} conflicted"
+        ))
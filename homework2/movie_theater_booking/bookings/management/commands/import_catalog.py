@@ -0,0 +1,206 @@
+import csv
+import json
+import time
+from collections import defaultdict
+from datetime import date
+from itertools import islice
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from bookings import seatmap
+from bookings.warmup import invalidate_movie_list
+from bookings.models import Booking, BookingEvent, Movie, Seat, default_theater_id
+
+
+# Seats, titles or users a lookup can name in one IN list, well under SQLite's bound parameter limit
+LOOKUP_CHUNK = 500
+
+
+# Yields one dict per row. Files are read line by line so memory stays flat however big they are
+def read_rows(path, fmt):
+    with open(path, newline='', encoding='utf-8') as handle:
+        if fmt == 'csv':
+            yield from csv.DictReader(handle)
+        else:
+            for line in handle:
+                if line.strip():
+                    yield json.loads(line)
+
+
+# Builds model instances for one batch of rows
+# Movies are a catalog shared by every theater, theater_id is unused. A movie is matched
+# on title and release date, so ones that already exist, or repeat in the batch, are skipped
+def build_movies(rows, theater_id):
+    first_rows = {}
+    for row in rows:
+        first_rows.setdefault((row['title'], date.fromisoformat(row['release_date'])), row)
+    titles = list({title for title, _ in first_rows})
+    existing = set()
+    for start in range(0, len(titles), LOOKUP_CHUNK):
+        existing.update(
+            Movie.objects.filter(title__in=titles[start:start + LOOKUP_CHUNK]).values_list('title', 'release_date')
+        )
+    return [
+        Movie(
+            title=title,
+            description=row.get('description', ''),
+            release_date=release_date,
+            duration=int(row['duration']),
+        )
+        for (title, release_date), row in first_rows.items()
+        if (title, release_date) not in existing
+    ]
+
+
+# Seat numbers that already exist in their theater, or repeat in the batch, are skipped
+def build_seats(rows, theater_id):
+    first_rows = {}
+    for row in rows:
+        first_rows.setdefault((int(row.get('theater_id') or theater_id), row['seat_number']), row)
+    existing = seats_by_key(first_rows)
+    return [
+        Seat(
+            theater_id=key_theater,
+            seat_number=seat_number,
+            booking_status=row.get('booking_status') or 'available',
+            seat_class=row.get('seat_class') or 'standard',
+        )
+        for (key_theater, seat_number), row in first_rows.items()
+        if (key_theater, seat_number) not in existing
+    ]
+
+
+# Fetches seats by (theater id, seat number), one seat_number IN query per theater and
+# chunk, and returns them keyed the same way
+def seats_by_key(keys):
+    numbers = defaultdict(list)
+    for theater_id, seat_number in keys:
+        numbers[theater_id].append(seat_number)
+    seats = {}
+    for theater_id, seat_numbers in numbers.items():
+        for start in range(0, len(seat_numbers), LOOKUP_CHUNK):
+            chunk = Seat.objects.filter(theater_id=theater_id, seat_number__in=seat_numbers[start:start + LOOKUP_CHUNK])
+            seats.update(((seat.theater_id, seat.seat_number), seat) for seat in chunk)
+    return seats
+
+
+# Reads a booking_date as export_bookings writes it, str() for CSV and isoformat() for
+# JSON Lines. Rows without one are stamped with the time of the import
+def parse_booking_date(value):
+    if not value:
+        return timezone.now()
+    parsed = parse_datetime(value)
+    if parsed is None:
+        raise CommandError(f"Invalid booking_date: {value!r}")
+    if settings.USE_TZ and timezone.is_naive(parsed):
+        return timezone.make_aware(parsed)
+    if not settings.USE_TZ and timezone.is_aware(parsed):
+        return timezone.make_naive(parsed)
+    return parsed
+
+
+# Bookings reference users by username, movies by id and seats by theater id and seat
+# number. Lookups are done per batch so only the batch's users and seats are in memory.
+# (movie, seat) pairs that are already booked, or repeat in the batch, are skipped
+def build_bookings(rows, theater_id):
+    users = User.objects.in_bulk({row['username'] for row in rows}, field_name='username')
+    seats = seats_by_key({(int(row.get('theater_id') or theater_id), row['seat_number']) for row in rows})
+    seat_ids = [seat.id for seat in seats.values()]
+    booked = set()
+    for start in range(0, len(seat_ids), LOOKUP_CHUNK):
+        booked.update(
+            Booking.objects.filter(seat_id__in=seat_ids[start:start + LOOKUP_CHUNK]).values_list('movie_id', 'seat_id')
+        )
+    bookings = []
+    for row in rows:
+        user = users.get(row['username'])
+        seat = seats.get((int(row.get('theater_id') or theater_id), row['seat_number']))
+        if user is None or seat is None:
+            raise CommandError(f"Unknown user or seat in row: {row}")
+        pair = (int(row['movie_id']), seat.id)
+        if pair in booked:
+            continue
+        booked.add(pair)
+        bookings.append(Booking(
+            movie_id=pair[0], seat=seat, user=user, theater_id=seat.theater_id,
+            booking_date=parse_booking_date(row.get('booking_date')),
+        ))
+    return bookings
+
+
+BUILDERS = {
+    'movies': (Movie, build_movies),
+    'seats': (Seat, build_seats),
+    'bookings': (Booking, build_bookings),
+}
+
+
+class Command(BaseCommand):
+    help = "Imports movies, seats or bookings from a CSV or JSON Lines file in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--kind', choices=BUILDERS.keys(), required=True)
+        # Defaults to the file extension, .csv or .jsonl
+        parser.add_argument('--format', choices=['csv', 'jsonl'])
+        parser.add_argument('--batch-size', type=int, default=5000)
+        # Theater for seat and booking rows without a theater_id column. Defaults to the oldest theater
+        parser.add_argument('--theater', type=int)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or ('csv' if options['path'].endswith('.csv') else 'jsonl')
+        model, build = BUILDERS[options['kind']]
+        rows = read_rows(options['path'], fmt)
+        batch_size = options['batch_size']
+        theater_id = options['theater'] or default_theater_id()
+
+        started = time.perf_counter()
+        total = 0
+        skipped = 0
+        while True:
+            batch = list(islice(rows, batch_size))
+            if not batch:
+                break
+            with transaction.atomic():
+                # Builders drop existing movies, seats and booked (movie, seat) pairs up front, so
+                # every object is inserted and the events below match the rows written
+                objects = build(batch, theater_id)
+                skipped += len(batch) - len(objects)
+                model.objects.bulk_create(objects, batch_size=batch_size)
+                # Imported bookings take their seats off the market
+                if model is Booking:
+                    Seat.objects.filter(id__in=[b.seat_id for b in objects]).update(booking_status='booked')
+                    BookingEvent.objects.bulk_create([
+                        BookingEvent(kind='book', seat_id=b.seat_id, movie_id=b.movie_id, user_id=b.user_id)
+                        for b in objects
+                    ])
+                # Seats imported in any other state are logged so a replay keeps it
+                if model is Seat:
+                    imported = seats_by_key(
+                        (seat.theater_id, seat.seat_number) for seat in objects if seat.booking_status != 'available'
+                    )
+                    BookingEvent.objects.bulk_create([
+                        BookingEvent(kind=BookingEvent.KIND_FOR_STATUS[seat.booking_status], seat_id=seat.id)
+                        for seat in imported.values()
+                    ])
+            total += len(batch)
+            elapsed = time.perf_counter() - started
+            self.stderr.write(f"{total} rows ({total / elapsed:,.0f} rows/sec)")
+
+        # bulk_create and update() skip the signals that keep seat maps and the movie list fresh
+        if model is Movie:
+            invalidate_movie_list()
+        else:
+            seatmap.invalidate()
+
+        elapsed = time.perf_counter() - started
+        rate = total / elapsed if elapsed else 0
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {total - skipped} {options['kind']} in {elapsed:.1f}s ({rate:,.0f} rows/sec), "
+            f"{skipped} already existed"
+        ))
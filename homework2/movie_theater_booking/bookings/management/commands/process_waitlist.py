@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.routers import use_primary
+from bookings.waitlist import process_waitlist
+
+
+class Command(BaseCommand):
+    help = "Offers freed seats to waitlisted users and releases expired holds in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=100)
+        # Keep running and poll every --interval seconds instead of a single pass
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=5.0)
+
+    def handle(self, *args, **options):
+        while True:
+            # The worker decides based on seat states so it always reads the primary
+            with use_primary():
+                expired, offered = process_waitlist(batch_size=options['batch_size'])
+            if expired or offered or not options['loop']:
+                self.stdout.write(f"Expired {expired} holds, offered {offered} seats")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
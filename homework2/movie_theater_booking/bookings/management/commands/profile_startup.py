@@ -0,0 +1,78 @@
+import json
+import os
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter so nothing is imported yet. Times each startup phase the way
+# a gunicorn worker goes through them and prints the results as JSON on the last line
+PHASES_SCRIPT = """
+import json, time
+timings = {}
+start = time.perf_counter()
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+timings['settings'] = time.perf_counter() - start
+
+mark = time.perf_counter()
+django.setup()
+timings['apps_ready'] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+from django.urls import get_resolver
+get_resolver().url_patterns
+timings['url_router'] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+timings['wsgi_middleware'] = time.perf_counter() - mark
+
+mark = time.perf_counter()
+from rest_framework.settings import api_settings
+api_settings.DEFAULT_RENDERER_CLASSES
+timings['drf_renderers'] = time.perf_counter() - mark
+
+timings['total'] = time.perf_counter() - start
+print(json.dumps(timings))
+"""
+
+
+class Command(BaseCommand):
+    help = "Reports how long a cold worker spends importing and setting up the app"
+
+    def add_arguments(self, parser):
+        # How many of the slowest top-level packages to list
+        parser.add_argument('--top', type=int, default=15)
+
+    def handle(self, *args, **options):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE=os.environ.get(
+            'DJANGO_SETTINGS_MODULE', 'movie_theater_booking.settings'
+        ))
+        result = subprocess.run(
+            [sys.executable, '-X', 'importtime', '-c', PHASES_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        timings = json.loads(result.stdout.strip().splitlines()[-1])
+
+        self.stdout.write("Startup phases:")
+        for phase, seconds in timings.items():
+            self.stdout.write(f"  {phase:<16} {seconds * 1000:8.1f} ms")
+
+        self.stdout.write(f"\nSlowest packages by import time (top {options['top']}):")
+        for package, micros in self.package_import_times(result.stderr)[:options['top']]:
+            self.stdout.write(f"  {package:<30} {micros / 1000:8.1f} ms")
+
+    # Adds up -X importtime self times per top-level package
+    def package_import_times(self, importtime_output):
+        totals = defaultdict(int)
+        for line in importtime_output.splitlines():
+            if not line.startswith('import time:') or 'self [us]' in line:
+                continue
+            self_us, _, name = line[len('import time:'):].split('|')
+            totals[name.strip().split('.')[0]] += int(self_us)
+        return sorted(totals.items(), key=lambda item: item[1], reverse=True)
@@ -0,0 +1,35 @@
+import time
+from datetime import datetime
+
+from django.core.management.base import BaseCommand
+
+from bookings.events import apply_state, replay
+
+
+class Command(BaseCommand):
+    help = "Rebuilds seat statuses and showtime booking counters from the booking event log"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10000)
+        # Replays events up to this time (ISO format). Implies --dry-run
+        parser.add_argument('--until', type=datetime.fromisoformat)
+        # Prints the replayed seat counts without writing them
+        parser.add_argument('--dry-run', action='store_true')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        statuses, booked = replay(until=options['until'], batch_size=options['batch_size'])
+        elapsed = time.perf_counter() - started
+
+        if options['dry_run'] or options['until']:
+            counts = {}
+            for status in statuses.values():
+                counts[status] = counts.get(status, 0) + 1
+            summary = ', '.join(f"{status}: {count}" for status, count in sorted(counts.items()))
+            self.stdout.write(f"Replayed {len(statuses)} seats in {elapsed:.2f}s ({summary or 'no events'})")
+            return
+
+        seats, showtimes = apply_state(statuses, booked, batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f"Replayed {len(statuses)} seats in {elapsed:.2f}s, fixed {seats} seats and {showtimes} showtime counters"
+        ))
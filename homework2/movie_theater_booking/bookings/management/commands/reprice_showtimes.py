@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.pricing import DYNAMIC_PRICING, reprice_showtimes
+
+
+class Command(BaseCommand):
+    help = "Rebuilds upcoming showtimes' price tables from their occupancy when DYNAMIC_PRICING is on"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        # Keep running and reprice every --interval seconds instead of a single pass
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=300.0)
+
+    def handle(self, *args, **options):
+        if not DYNAMIC_PRICING:
+            self.stdout.write("DYNAMIC_PRICING is off, price tables are fixed")
+            return
+        while True:
+            started = time.perf_counter()
+            changed = reprice_showtimes(batch_size=options['batch_size'])
+            self.stdout.write(f"Repriced {changed} showtimes in {time.perf_counter() - started:.2f}s")
+            if not options['loop']:
+                break
+            time.sleep(options['interval'])
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.jobs import run_jobs
+
+
+class Command(BaseCommand):
+    help = "Runs queued background jobs (booking emails, waitlist passes, ...)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=10)
+        # Keep running and poll every --interval seconds when the queue is empty
+        parser.add_argument('--loop', action='store_true')
+        parser.add_argument('--interval', type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        while True:
+            succeeded, failed = run_jobs(batch_size=options['batch_size'])
+            if succeeded or failed:
+                self.stdout.write(f"Ran {succeeded + failed} jobs ({failed} failed)")
+            if not options['loop']:
+                break
+            # Only sleep when the queue is drained so a backlog is worked through quickly
+            if succeeded + failed < options['batch_size']:
+                time.sleep(options['interval'])
@@ -0,0 +1,20 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from bookings.warmup import warm_caches
+
+
+class Command(BaseCommand):
+    help = "Compiles templates and fills the movie list, seat map and price table caches"
+
+    def add_arguments(self, parser):
+        # Seat maps and prices are warmed for showtimes starting within this many hours
+        parser.add_argument('--hours', type=int, default=24)
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        for name, count, elapsed in warm_caches(hours=options['hours']):
+            self.stdout.write(f"{name:<14}{count:>8}  {elapsed * 1000:8.1f}ms")
+        elapsed = time.perf_counter() - started
+        self.stdout.write(self.style.SUCCESS(f"Warmed caches in {elapsed:.2f}s"))
@@ -0,0 +1,56 @@
+from django.db import migrations
+
+# Must stay identical to PG_SEARCH_VECTOR in bookings/search.py or queries won't use the index
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+
+# Builds the full-text index for movie search. PostgreSQL gets a GIN index on the
+# weighted tsvector, SQLite gets an FTS5 table kept in sync by triggers
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute(
+            f"CREATE INDEX IF NOT EXISTS bookings_movie_search_idx ON bookings_movie USING GIN (({PG_SEARCH_VECTOR}))"
+        )
+    elif vendor == 'sqlite':
+        statements = [
+            "CREATE VIRTUAL TABLE bookings_movie_fts USING fts5("
+            "title, description, content='bookings_movie', content_rowid='id')",
+            "CREATE TRIGGER bookings_movie_fts_insert AFTER INSERT ON bookings_movie BEGIN "
+            "INSERT INTO bookings_movie_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+            "CREATE TRIGGER bookings_movie_fts_delete AFTER DELETE ON bookings_movie BEGIN "
+            "INSERT INTO bookings_movie_fts(bookings_movie_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); END",
+            "CREATE TRIGGER bookings_movie_fts_update AFTER UPDATE ON bookings_movie BEGIN "
+            "INSERT INTO bookings_movie_fts(bookings_movie_fts, rowid, title, description) "
+            "VALUES ('delete', old.id, old.title, old.description); "
+            "INSERT INTO bookings_movie_fts(rowid, title, description) VALUES (new.id, new.title, new.description); END",
+            # Index the movies that already exist
+            "INSERT INTO bookings_movie_fts(bookings_movie_fts) VALUES ('rebuild')",
+        ]
+        for statement in statements:
+            schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS bookings_movie_search_idx")
+    elif vendor == 'sqlite':
+        for trigger in ['insert', 'delete', 'update']:
+            schema_editor.execute(f"DROP TRIGGER IF EXISTS bookings_movie_fts_{trigger}")
+        schema_editor.execute("DROP TABLE IF EXISTS bookings_movie_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_job'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,131 @@
+from django.db import migrations
+
+
+# PostgreSQL only: turns bookings_booking into a table range-partitioned by booking_date.
+#
+# Partitioned primary keys and unique constraints have to include the partition key,
+# so the primary key becomes (id, booking_date) and the (movie, seat) unique_together is
+# enforced through bookings_booking_slot, a small unpartitioned table kept in sync by a
+# trigger. Inserting a duplicate (movie, seat) still raises an IntegrityError.
+#
+# Migration state is left as it was, so it still declares unique_together and the
+# primary key on id alone. On PostgreSQL, later migrations that touch either one must
+# use SeparateDatabaseAndState and write their own SQL, since the index and constraint
+# Django would generate no longer exist.
+#
+# Rows land in bookings_booking_default until the booking_partitions command creates
+# monthly partitions and moves them there.
+def partition_bookings(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    statements = [
+        "ALTER TABLE bookings_booking RENAME TO bookings_booking_unpartitioned",
+        "CREATE SEQUENCE bookings_booking_partitioned_id_seq",
+        """CREATE TABLE bookings_booking_partitioned (
+            id bigint NOT NULL DEFAULT nextval('bookings_booking_partitioned_id_seq'),
+            booking_date timestamp with time zone NOT NULL,
+            movie_id bigint NOT NULL,
+            seat_id bigint NOT NULL,
+            user_id integer NOT NULL,
+            CONSTRAINT bookings_booking_partitioned_pkey PRIMARY KEY (id, booking_date)
+        ) PARTITION BY RANGE (booking_date)""",
+        "CREATE TABLE bookings_booking_default PARTITION OF bookings_booking_partitioned DEFAULT",
+        """INSERT INTO bookings_booking_partitioned (id, booking_date, movie_id, seat_id, user_id)
+            SELECT id, booking_date, movie_id, seat_id, user_id FROM bookings_booking_unpartitioned""",
+        """SELECT setval('bookings_booking_partitioned_id_seq',
+            (SELECT COALESCE(MAX(id), 0) + 1 FROM bookings_booking_partitioned), false)""",
+        "DROP TABLE bookings_booking_unpartitioned",
+        "ALTER TABLE bookings_booking_partitioned RENAME TO bookings_booking",
+        "ALTER SEQUENCE bookings_booking_partitioned_id_seq RENAME TO bookings_booking_id_seq",
+        "ALTER SEQUENCE bookings_booking_id_seq OWNED BY bookings_booking.id",
+        "ALTER TABLE bookings_booking RENAME CONSTRAINT bookings_booking_partitioned_pkey TO bookings_booking_pkey",
+        # Indexes and foreign keys the unpartitioned table had, created once the rows are in
+        "CREATE INDEX booking_date_idx ON bookings_booking (booking_date DESC)",
+        "CREATE INDEX bookings_booking_movie_id_idx ON bookings_booking (movie_id)",
+        "CREATE INDEX bookings_booking_seat_id_idx ON bookings_booking (seat_id)",
+        "CREATE INDEX bookings_booking_user_id_idx ON bookings_booking (user_id)",
+        """ALTER TABLE bookings_booking ADD CONSTRAINT bookings_booking_movie_id_fk
+            FOREIGN KEY (movie_id) REFERENCES bookings_movie (id) DEFERRABLE INITIALLY DEFERRED""",
+        """ALTER TABLE bookings_booking ADD CONSTRAINT bookings_booking_seat_id_fk
+            FOREIGN KEY (seat_id) REFERENCES bookings_seat (id) DEFERRABLE INITIALLY DEFERRED""",
+        """ALTER TABLE bookings_booking ADD CONSTRAINT bookings_booking_user_id_fk
+            FOREIGN KEY (user_id) REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED""",
+        # One row per booked (movie, seat) across every partition
+        """CREATE TABLE bookings_booking_slot (
+            movie_id bigint NOT NULL,
+            seat_id bigint NOT NULL,
+            booking_id bigint NOT NULL,
+            PRIMARY KEY (movie_id, seat_id)
+        )""",
+        "INSERT INTO bookings_booking_slot (movie_id, seat_id, booking_id) SELECT movie_id, seat_id, id FROM bookings_booking",
+        """CREATE FUNCTION bookings_booking_slot_sync() RETURNS trigger AS $$
+        BEGIN
+            IF TG_OP IN ('UPDATE', 'DELETE') THEN
+                DELETE FROM bookings_booking_slot
+                WHERE movie_id = OLD.movie_id AND seat_id = OLD.seat_id AND booking_id = OLD.id;
+            END IF;
+            IF TG_OP IN ('INSERT', 'UPDATE') THEN
+                INSERT INTO bookings_booking_slot (movie_id, seat_id, booking_id)
+                VALUES (NEW.movie_id, NEW.seat_id, NEW.id);
+            END IF;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER bookings_booking_slot_sync AFTER INSERT OR UPDATE OR DELETE ON bookings_booking
+            FOR EACH ROW EXECUTE FUNCTION bookings_booking_slot_sync()""",
+    ]
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+# Rebuilds the plain table with the (movie, seat) unique constraint back on it. Later
+# migrations undo their own columns first, so only the 0005 columns are left to copy.
+# Monthly partitions go with the partitioned table, detached archive tables stay
+def unpartition_bookings(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    statements = [
+        "DROP TRIGGER bookings_booking_slot_sync ON bookings_booking",
+        "DROP FUNCTION bookings_booking_slot_sync()",
+        "DROP TABLE bookings_booking_slot",
+        """CREATE TABLE bookings_booking_unpartitioned (
+            id bigint GENERATED BY DEFAULT AS IDENTITY PRIMARY KEY,
+            booking_date timestamp with time zone NOT NULL,
+            movie_id bigint NOT NULL,
+            seat_id bigint NOT NULL,
+            user_id integer NOT NULL,
+            CONSTRAINT bookings_booking_movie_id_seat_id_uniq UNIQUE (movie_id, seat_id)
+        )""",
+        """INSERT INTO bookings_booking_unpartitioned (id, booking_date, movie_id, seat_id, user_id)
+            SELECT id, booking_date, movie_id, seat_id, user_id FROM bookings_booking""",
+        """SELECT setval(pg_get_serial_sequence('bookings_booking_unpartitioned', 'id'),
+            (SELECT COALESCE(MAX(id), 0) + 1 FROM bookings_booking_unpartitioned), false)""",
+        # Drops the partitions and the bookings_booking_id_seq sequence with it
+        "DROP TABLE bookings_booking",
+        "ALTER TABLE bookings_booking_unpartitioned RENAME TO bookings_booking",
+        "ALTER SEQUENCE bookings_booking_unpartitioned_id_seq RENAME TO bookings_booking_id_seq",
+        "ALTER TABLE bookings_booking RENAME CONSTRAINT bookings_booking_unpartitioned_pkey TO bookings_booking_pkey",
+        "CREATE INDEX booking_date_idx ON bookings_booking (booking_date DESC)",
+        "CREATE INDEX bookings_booking_movie_id_idx ON bookings_booking (movie_id)",
+        "CREATE INDEX bookings_booking_seat_id_idx ON bookings_booking (seat_id)",
+        "CREATE INDEX bookings_booking_user_id_idx ON bookings_booking (user_id)",
+        """ALTER TABLE bookings_booking ADD CONSTRAINT bookings_booking_movie_id_fk
+            FOREIGN KEY (movie_id) REFERENCES bookings_movie (id) DEFERRABLE INITIALLY DEFERRED""",
+        """ALTER TABLE bookings_booking ADD CONSTRAINT bookings_booking_seat_id_fk
+            FOREIGN KEY (seat_id) REFERENCES bookings_seat (id) DEFERRABLE INITIALLY DEFERRED""",
+        """ALTER TABLE bookings_booking ADD CONSTRAINT bookings_booking_user_id_fk
+            FOREIGN KEY (user_id) REFERENCES auth_user (id) DEFERRABLE INITIALLY DEFERRED""",
+    ]
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0005_booking_date_index'),
+    ]
+
+    operations = [
+        migrations.RunPython(partition_bookings, unpartition_bookings),
+    ]
@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:13
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0007_archived_booking'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Auditorium',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+                ('cleaning_minutes', models.PositiveIntegerField(default=15)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.CreateModel(
+            name='Showtime',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('starts_at', models.DateTimeField()),
+                ('ends_at', models.DateTimeField(editable=False)),
+                ('auditorium', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='showtimes', to='bookings.auditorium')),
+                ('movie', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='showtimes', to='bookings.movie')),
+            ],
+            options={
+                'ordering': ['starts_at'],
+                'indexes': [models.Index(fields=['auditorium', 'starts_at'], name='showtime_auditorium_start_idx'), models.Index(fields=['movie', 'starts_at'], name='showtime_movie_start_idx')],
+            },
+        ),
+    ]
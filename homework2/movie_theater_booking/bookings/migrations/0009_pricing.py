@@ -0,0 +1,39 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:16
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0008_showtimes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='booking',
+            name='price',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='booking',
+            name='showtime',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='bookings', to='bookings.showtime'),
+        ),
+        migrations.AddField(
+            model_name='seat',
+            name='seat_class',
+            field=models.CharField(choices=[('standard', 'Standard'), ('premium', 'Premium'), ('vip', 'VIP')], default='standard', max_length=20),
+        ),
+        migrations.AddField(
+            model_name='showtime',
+            name='booked_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.AddField(
+            model_name='showtime',
+            name='price_table',
+            field=models.JSONField(blank=True, default=dict, editable=False),
+        ),
+    ]
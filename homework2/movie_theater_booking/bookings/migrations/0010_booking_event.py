@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:23
+
+from django.db import migrations, models
+import django.utils.timezone
+
+
+# Seeds the log with the current state so a replay on an existing database gives back
+# what is there now: a book event per booking, then one per seat held, under maintenance
+# or booked without a booking row
+def snapshot_state(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    BookingEvent = apps.get_model('bookings', 'BookingEvent')
+    Seat = apps.get_model('bookings', 'Seat')
+    kinds = {'booked': 'book', 'held': 'hold', 'maintenance': 'maintenance'}
+
+    events = []
+    booked_seats = set()
+    bookings = Booking.objects.order_by('booking_date', 'id').values_list(
+        'id', 'seat_id', 'movie_id', 'showtime_id', 'user_id', 'booking_date'
+    )
+    for booking_id, seat_id, movie_id, showtime_id, user_id, booking_date in bookings.iterator():
+        booked_seats.add(seat_id)
+        events.append(BookingEvent(
+            kind='book', booking_id=booking_id, seat_id=seat_id, movie_id=movie_id,
+            showtime_id=showtime_id, user_id=user_id, created_at=booking_date,
+        ))
+    for seat_id, status in Seat.objects.exclude(booking_status='available').values_list('id', 'booking_status'):
+        if status == 'booked' and seat_id in booked_seats:
+            continue
+        events.append(BookingEvent(kind=kinds[status], seat_id=seat_id, created_at=django.utils.timezone.now()))
+    BookingEvent.objects.bulk_create(events, batch_size=5000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0009_pricing'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookingEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('hold', 'Hold'), ('release', 'Release hold'), ('book', 'Book'), ('cancel', 'Cancel'), ('maintenance', 'Maintenance'), ('available', 'Available')], max_length=20)),
+                ('seat_id', models.BigIntegerField()),
+                ('movie_id', models.BigIntegerField(blank=True, null=True)),
+                ('showtime_id', models.BigIntegerField(blank=True, null=True)),
+                ('user_id', models.BigIntegerField(blank=True, null=True)),
+                ('booking_id', models.BigIntegerField(blank=True, null=True)),
+                ('created_at', models.DateTimeField(default=django.utils.timezone.now)),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['created_at'], name='booking_event_created_idx'), models.Index(fields=['seat_id', 'id'], name='booking_event_seat_idx')],
+            },
+        ),
+        migrations.RunPython(snapshot_state, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,97 @@
+# Generated by Django 4.2.7 on 2026-10-19 13:27
+
+import bookings.models
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Puts everything that exists today in one "Main" theater. Showtimes and bookings copy
+# the theater of their auditorium and seat
+def assign_default_theater(apps, schema_editor):
+    Theater = apps.get_model('bookings', 'Theater')
+    Auditorium = apps.get_model('bookings', 'Auditorium')
+    Seat = apps.get_model('bookings', 'Seat')
+    Showtime = apps.get_model('bookings', 'Showtime')
+    Booking = apps.get_model('bookings', 'Booking')
+    if not (Seat.objects.exists() or Auditorium.objects.exists()):
+        return
+    theater = Theater.objects.create(name='Main')
+    for model in (Auditorium, Seat, Showtime, Booking):
+        model.objects.update(theater=theater)
+
+
+def theater_field(related_name, null=False, **kwargs):
+    return models.ForeignKey(
+        null=null, on_delete=django.db.models.deletion.CASCADE, related_name=related_name,
+        to='bookings.theater', **kwargs
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0010_booking_event'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Theater',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('name', models.CharField(max_length=100, unique=True)),
+            ],
+            options={
+                'ordering': ['name'],
+            },
+        ),
+        migrations.AddField(model_name='auditorium', name='theater', field=theater_field('auditoriums', null=True)),
+        migrations.AddField(model_name='seat', name='theater', field=theater_field('seats', null=True)),
+        migrations.AddField(
+            model_name='showtime', name='theater', field=theater_field('showtimes', null=True, editable=False),
+        ),
+        migrations.AddField(
+            model_name='booking', name='theater', field=theater_field('bookings', null=True, editable=False),
+        ),
+        migrations.RunPython(assign_default_theater, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='auditorium', name='theater',
+            field=theater_field('auditoriums', default=bookings.models.default_theater_id),
+        ),
+        migrations.AlterField(
+            model_name='seat', name='theater',
+            field=theater_field('seats', default=bookings.models.default_theater_id),
+        ),
+        migrations.AlterField(model_name='showtime', name='theater', field=theater_field('showtimes', editable=False)),
+        migrations.AlterField(model_name='booking', name='theater', field=theater_field('bookings', editable=False)),
+        # Names and seat numbers are now unique per theater
+        migrations.AlterField(
+            model_name='auditorium',
+            name='name',
+            field=models.CharField(max_length=100),
+        ),
+        migrations.AlterField(
+            model_name='seat',
+            name='seat_number',
+            field=models.CharField(max_length=10),
+        ),
+        migrations.AddConstraint(
+            model_name='auditorium',
+            constraint=models.UniqueConstraint(fields=('theater', 'name'), name='unique_auditorium_per_theater'),
+        ),
+        migrations.AddConstraint(
+            model_name='seat',
+            constraint=models.UniqueConstraint(fields=('theater', 'seat_number'), name='unique_seat_per_theater'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['theater', '-booking_date'], name='booking_theater_date_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='seat',
+            index=models.Index(fields=['theater', 'booking_status'], name='seat_theater_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='showtime',
+            index=models.Index(fields=['theater', 'starts_at'], name='showtime_theater_start_idx'),
+        ),
+    ]
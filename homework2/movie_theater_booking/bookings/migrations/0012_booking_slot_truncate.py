@@ -0,0 +1,39 @@
+from django.db import migrations
+
+
+# PostgreSQL only: TRUNCATE skips the row triggers that keep bookings_booking_slot in
+# sync, so test flushes and manual truncates would leave stale slots behind and block
+# rebooking the same (movie, seat). A statement trigger empties the slots along with it.
+def add_truncate_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    statements = [
+        """CREATE FUNCTION bookings_booking_slot_truncate() RETURNS trigger AS $$
+        BEGIN
+            TRUNCATE bookings_booking_slot;
+            RETURN NULL;
+        END
+        $$ LANGUAGE plpgsql""",
+        """CREATE TRIGGER bookings_booking_slot_truncate AFTER TRUNCATE ON bookings_booking
+            FOR EACH STATEMENT EXECUTE FUNCTION bookings_booking_slot_truncate()""",
+    ]
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def remove_truncate_trigger(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("DROP TRIGGER bookings_booking_slot_truncate ON bookings_booking")
+    schema_editor.execute("DROP FUNCTION bookings_booking_slot_truncate()")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0011_theaters'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_truncate_trigger, remove_truncate_trigger),
+    ]
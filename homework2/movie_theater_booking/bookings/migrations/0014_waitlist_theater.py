@@ -0,0 +1,43 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Entries made before theaters were tracked wait at their held seat's theater, or at
+# the first theater (the one the old single-theater routes served)
+def assign_waitlist_theater(apps, schema_editor):
+    Theater = apps.get_model('bookings', 'Theater')
+    WaitlistEntry = apps.get_model('bookings', 'WaitlistEntry')
+    if not WaitlistEntry.objects.exists():
+        return
+    for entry in WaitlistEntry.objects.filter(seat__isnull=False).select_related('seat'):
+        entry.theater_id = entry.seat.theater_id
+        entry.save(update_fields=['theater'])
+    theater = Theater.objects.order_by('id').first() or Theater.objects.create(name='Main')
+    WaitlistEntry.objects.filter(theater__isnull=True).update(theater=theater)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0013_archived_booking_theater'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='waitlistentry',
+            name='theater',
+            field=models.ForeignKey(
+                null=True, on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries',
+                to='bookings.theater',
+            ),
+        ),
+        migrations.RunPython(assign_waitlist_theater, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='waitlistentry',
+            name='theater',
+            field=models.ForeignKey(
+                on_delete=django.db.models.deletion.CASCADE, related_name='waitlist_entries',
+                to='bookings.theater',
+            ),
+        ),
+    ]
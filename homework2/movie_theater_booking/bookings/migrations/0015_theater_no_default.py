@@ -0,0 +1,24 @@
+# Generated by Django 4.2.7 on 2026-10-19 14:11
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0014_waitlist_theater'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='auditorium',
+            name='theater',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='auditoriums', to='bookings.theater'),
+        ),
+        migrations.AlterField(
+            model_name='seat',
+            name='theater',
+            field=models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='seats', to='bookings.theater'),
+        ),
+    ]
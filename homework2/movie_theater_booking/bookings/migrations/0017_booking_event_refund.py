@@ -0,0 +1,18 @@
+# Generated by Django 4.2.7 on 2026-10-19 16:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0016_booking_date_default'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bookingevent',
+            name='refund',
+            field=models.DecimalField(blank=True, decimal_places=2, max_digits=8, null=True),
+        ),
+    ]
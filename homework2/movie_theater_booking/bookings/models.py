@@ -1,5 +1,17 @@
-from django.db import models
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db import models, transaction
+from django.db.models import F
+from django.db.models.functions import Greatest
 from django.contrib.auth.models import User
+from django.utils import timezone
+from .signals import seats_changed
+from .tenancy import TheaterQuerySet, TheaterScopedManager
 
 # Below is the movie class, it has fields for title, description, release date, and duration.
 class Movie(models.Model):
@@ -16,16 +28,126 @@ class Movie(models.Model):
     class Meta:
         ordering = ['release_date']
 
+# One of the shop's locations. Seats, auditoriums, showtimes and bookings belong to a
+# theater, movies are a shared catalog
+class Theater(models.Model):
+    name = models.CharField(max_length=100, unique=True)
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+
+# Theater for create paths that weren't given one: the oldest location, created on first
+# use. Called explicitly where rows are made, never as a field default, so building an
+# unsaved Seat or Auditorium doesn't touch the database
+def default_theater_id():
+    theater = Theater.objects.order_by('id').first() or Theater.objects.create(name='Main')
+    return theater.pk
+
+# A screen in the theater. Showtimes in the same auditorium may not overlap
+class Auditorium(models.Model):
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='auditoriums')
+    name = models.CharField(max_length=100)
+    # Time between one showing ending and the next starting, for cleaning and seating
+    cleaning_minutes = models.PositiveIntegerField(default=15)
+
+    objects = TheaterScopedManager.from_queryset(TheaterQuerySet)()
+
+    def __str__(self):
+        return self.name
+
+    class Meta:
+        ordering = ['name']
+        constraints = [
+            models.UniqueConstraint(fields=['theater', 'name'], name='unique_auditorium_per_theater'),
+        ]
+
+# One showing of a movie in an auditorium. ends_at covers the running time plus the
+# auditorium's cleaning buffer so overlap checks only compare start and end
+class Showtime(models.Model):
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='showtimes')
+    auditorium = models.ForeignKey(Auditorium, on_delete=models.CASCADE, related_name='showtimes')
+    # Copied from the auditorium so per-location listings don't need the join
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='showtimes', editable=False)
+    starts_at = models.DateTimeField()
+    ends_at = models.DateTimeField(editable=False)
+    # Price per seat class as decimal strings, built by bookings.pricing when the showtime
+    # is created and rebuilt by the reprice_showtimes batch when dynamic pricing is on
+    price_table = models.JSONField(default=dict, blank=True, editable=False)
+    # Bookings for this showtime, kept up to date on book and cancel so repricing never counts rows
+    booked_count = models.PositiveIntegerField(default=0, editable=False)
+
+    objects = TheaterScopedManager.from_queryset(TheaterQuerySet)()
+
+    # Fills in ends_at and the theater from the movie and auditorium
+    def save(self, *args, **kwargs):
+        self.ends_at = self.compute_end()
+        self.theater_id = self.auditorium.theater_id
+        super().save(*args, **kwargs)
+
+    def compute_end(self):
+        return self.starts_at + timedelta(minutes=self.movie.duration + self.auditorium.cleaning_minutes)
+
+    # Rejects a showtime that overlaps another one in the same auditorium
+    def clean(self):
+        if self.starts_at is None or self.movie_id is None or self.auditorium_id is None:
+            return
+        overlapping = Showtime.objects.filter(
+            auditorium_id=self.auditorium_id, starts_at__lt=self.compute_end(), ends_at__gt=self.starts_at,
+        ).exclude(pk=self.pk)
+        if overlapping.exists():
+            raise ValidationError({'starts_at': 'Overlaps another showtime in this auditorium.'})
+
+    def __str__(self):
+        return f"{self.movie.title} - {self.auditorium.name} - {self.starts_at:%Y-%m-%d %H:%M}"
+
+    class Meta:
+        ordering = ['starts_at']
+        indexes = [
+            # Overlap checks and schedules are always per auditorium over a time window
+            models.Index(fields=['auditorium', 'starts_at'], name='showtime_auditorium_start_idx'),
+            models.Index(fields=['theater', 'starts_at'], name='showtime_theater_start_idx'),
+            models.Index(fields=['movie', 'starts_at'], name='showtime_movie_start_idx'),
+        ]
+
+# Queryset for seats with set-based status changes
+class SeatQuerySet(TheaterQuerySet):
+    # Moves every unprotected seat in the queryset to status with a single UPDATE and
+    # notifies seat-map caches once. Returns how many seats changed
+    def set_status(self, status):
+        with transaction.atomic(using=self.db):
+            seat_ids = list(
+                self.select_for_update()
+                .exclude(booking_status__in=self.model.PROTECTED_STATUSES)
+                .exclude(booking_status=status)
+                .values_list('id', flat=True)
+            )
+            if seat_ids:
+                self.model.objects.filter(id__in=seat_ids).update(booking_status=status)
+                BookingEvent.record(BookingEvent.KIND_FOR_STATUS[status], seat_ids)
+                transaction.on_commit(
+                    lambda: seats_changed.send(sender=self.model, seat_ids=seat_ids, status=status),
+                    using=self.db,
+                )
+        return len(seat_ids)
+
 # Class to represent individual seats to book within the theater
 class Seat(models.Model):
-    # 3 statuses for bookings
+    # 4 statuses for bookings, held means the seat is reserved for a waitlisted user
     SEAT_STATUS_CHOICES = [
         ('available', 'Available'),
         ('booked', 'Booked'),
         ('maintenance', 'Maintenance'),
+        ('held', 'Held'),
     ]
+    # Booked and held seats belong to a user, bulk status changes never touch them
+    PROTECTED_STATUSES = ['booked', 'held']
     
-    seat_number = models.CharField(max_length=10, unique=True)
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='seats')
+    # Unique within the theater
+    seat_number = models.CharField(max_length=10)
 
     booking_status = models.CharField(
         max_length=20, 
@@ -33,14 +155,108 @@ class Seat(models.Model):
         # Sets default to each seat as available
         default='available'
     )
+
+    # Pricing tier of the seat, see bookings.pricing
+    SEAT_CLASS_CHOICES = [
+        ('standard', 'Standard'),
+        ('premium', 'Premium'),
+        ('vip', 'VIP'),
+    ]
+    seat_class = models.CharField(max_length=20, choices=SEAT_CLASS_CHOICES, default='standard')
+
+    objects = TheaterScopedManager.from_queryset(SeatQuerySet)()
     
     # Returns string stating seat number and its current status
     def __str__(self):
         return f"Seat {self.seat_number} - {self.booking_status}"
+
+    # Every status change saved through a Seat instance (API, admin, create, get_or_create)
+    # is logged here, compared with the stored row so the log can't drift from the table.
+    # New seats only log a status other than available, which is what replay assumes.
+    # event_fields adds booking details (movie_id, user_id, ...) to the event
+    def save(self, *args, event_fields=None, **kwargs):
+        update_fields = kwargs.get('update_fields')
+        writes_status = 'booking_status' in self.__dict__ and (
+            update_fields is None or 'booking_status' in update_fields
+        )
+        with transaction.atomic(using=kwargs.get('using')):
+            previous = 'available'
+            if writes_status and not self._state.adding:
+                previous = (
+                    Seat._base_manager.filter(pk=self.pk).values_list('booking_status', flat=True).first() or 'available'
+                )
+            super().save(*args, **kwargs)
+            if writes_status and self.booking_status != previous:
+                BookingEvent.record(BookingEvent.KIND_FOR_STATUS[self.booking_status], [self.pk], **(event_fields or {}))
     
     # Orders seats by number
     class Meta:
         ordering = ['seat_number']
+        constraints = [
+            # Also the index for seat lookups by number within a theater
+            models.UniqueConstraint(fields=['theater', 'seat_number'], name='unique_seat_per_theater'),
+        ]
+        indexes = [
+            # Available-seat lists and seat maps are per theater and status
+            models.Index(fields=['theater', 'booking_status'], name='seat_theater_status_idx'),
+        ]
+
+# Queryset for bookings with set-based helpers
+# False while Booking rows are deleted by code that takes care of their seats itself, so
+# the post_delete receiver in events.py only releases seats for cascades
+_release_on_delete = ContextVar('release_on_delete', default=True)
+
+
+# Booking deletes in the block leave seats, showtime counts and the event log alone
+@contextmanager
+def without_seat_release():
+    token = _release_on_delete.set(False)
+    try:
+        yield
+    finally:
+        _release_on_delete.reset(token)
+
+
+def releases_seats_on_delete():
+    return _release_on_delete.get()
+
+
+class BookingQuerySet(TheaterQuerySet):
+    # Cancels every booking in the queryset and releases their seats in one transaction.
+    # Runs one UPDATE for the seats and one DELETE for the bookings no matter how many rows match.
+    # Each booking's price is refunded and logged on its cancel event. Returns
+    # (bookings cancelled, total refunded)
+    def cancel(self):
+        with transaction.atomic(using=self.db):
+            rows = list(self.select_for_update().values_list(
+                'id', 'seat_id', 'showtime_id', 'movie_id', 'user_id', 'price',
+            ))
+            if not rows:
+                return 0, Decimal('0.00')
+            booking_ids = [row[0] for row in rows]
+            seat_ids = [row[1] for row in rows]
+            # Only booked seats go back to available so maintenance is never overwritten
+            Seat.objects.filter(id__in=seat_ids, booking_status='booked').update(booking_status='available')
+            with without_seat_release():
+                self.model.objects.filter(id__in=booking_ids).delete()
+            BookingEvent.objects.bulk_create([
+                BookingEvent(
+                    kind='cancel', booking_id=booking_id, seat_id=seat_id, showtime_id=showtime_id,
+                    movie_id=movie_id, user_id=user_id, refund=price,
+                )
+                for booking_id, seat_id, showtime_id, movie_id, user_id, price in rows
+            ])
+            # One UPDATE per showtime touched, not per booking
+            released = Counter(row[2] for row in rows if row[2])
+            for showtime_id, count in released.items():
+                Showtime.objects.filter(id=showtime_id).update(booked_count=Greatest(F('booked_count') - count, 0))
+            # Tell seat-map caches and subscribers once the release is committed
+            transaction.on_commit(
+                lambda: seats_changed.send(sender=Seat, seat_ids=seat_ids, status='available'),
+                using=self.db,
+            )
+        # Bookings made before pricing have no price and refund nothing
+        return len(booking_ids), sum((row[5] for row in rows if row[5] is not None), Decimal('0.00'))
 
 # Model to represent each users booking
 class Booking(models.Model):
@@ -50,15 +266,211 @@ class Booking(models.Model):
     seat = models.ForeignKey(Seat, on_delete=models.CASCADE)
     # Link to which user the booking is for 
     user = models.ForeignKey(User, on_delete=models.CASCADE)
-    # Timestamp for when the booking was made
-    booking_date = models.DateTimeField(auto_now_add=True)
+    # Theater of the seat, copied in so per-location history and reports skip the seat join
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='bookings', editable=False)
+    # Timestamp for when the booking was made. A default rather than auto_now_add so
+    # import_catalog can keep the dates of imported bookings
+    booking_date = models.DateTimeField(default=timezone.now, editable=False)
+    # Showing the seat is for and the price quoted when it was booked
+    showtime = models.ForeignKey(Showtime, on_delete=models.SET_NULL, null=True, blank=True, related_name='bookings')
+    price = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+
+    objects = TheaterScopedManager.from_queryset(BookingQuerySet)()
+
+    # Takes the theater from the seat
+    def save(self, *args, **kwargs):
+        if self.theater_id is None:
+            self.theater_id = self.seat.theater_id
+        super().save(*args, **kwargs)
     
     class Meta:
-        # Makes sure you can't book the same seat twice for the same movie
+        # Makes sure you can't book the same seat twice for the same movie.
+        # On PostgreSQL the table is partitioned by booking_date (migration 0006) and this is
+        # enforced by the bookings_booking_slot table instead of a unique index. Migration
+        # state still lists it, so a migration that changes it can't use AlterUniqueTogether
+        # there: it needs SeparateDatabaseAndState with its own SQL for the slot table
         unique_together = ('movie', 'seat')
         # Newest first
         ordering = ['-booking_date']
+        indexes = [
+            # Serves the default newest-first ordering and date filters without a sort
+            models.Index(fields=['-booking_date'], name='booking_date_idx'),
+            models.Index(fields=['theater', '-booking_date'], name='booking_theater_date_idx'),
+        ]
     
     # Returns a string stating the user, what movie, and what seat
     def __str__(self):
         return f"{self.user.username} - {self.movie.title} - Seat {self.seat.seat_number}"
+
+    # Cancels this booking and makes its seat available again. Returns (1, amount refunded)
+    def cancel(self):
+        return Booking.objects.filter(pk=self.pk).cancel()
+
+# Compact copy of a booking moved out of the Booking table by the archive_bookings command.
+# Titles and seat numbers are copied in so history never has to join the hot tables
+class ArchivedBooking(models.Model):
+    # Id the booking had in the Booking table
+    booking_id = models.BigIntegerField(unique=True)
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='archived_bookings')
+    movie_id = models.BigIntegerField()
+    movie_title = models.CharField(max_length=200)
+    seat_number = models.CharField(max_length=10)
+    booking_date = models.DateTimeField()
+    # Theater the booking was made at, None for rows archived before it was recorded
+    theater_id = models.BigIntegerField(null=True)
+
+    # Full history on a theater's routes only sees that theater's archive
+    objects = TheaterScopedManager()
+
+    class Meta:
+        ordering = ['-booking_date']
+        indexes = [
+            # Full history lookups are always per user, newest first
+            models.Index(fields=['user', '-booking_date'], name='archived_user_date_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.user_id} - {self.movie_title} - Seat {self.seat_number} (archived)"
+
+# A user waiting for a seat to free up for a movie. Entries are served first in, first out
+class WaitlistEntry(models.Model):
+    STATUS_CHOICES = [
+        ('waiting', 'Waiting'),
+        # A seat is held for the user until offer_expires_at
+        ('offered', 'Offered'),
+        ('fulfilled', 'Fulfilled'),
+        ('expired', 'Expired'),
+    ]
+
+    movie = models.ForeignKey(Movie, on_delete=models.CASCADE, related_name='waitlist_entries')
+    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name='waitlist_entries')
+    # Theater the user is waiting at, only its seats are offered
+    theater = models.ForeignKey(Theater, on_delete=models.CASCADE, related_name='waitlist_entries')
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='waiting')
+    # Seat held for the user once an offer is made
+    seat = models.ForeignKey(Seat, on_delete=models.SET_NULL, null=True, blank=True)
+    offer_expires_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        # Oldest first so the queue is FIFO
+        ordering = ['created_at', 'id']
+        indexes = [
+            # The worker scans by status in queue order
+            models.Index(fields=['status', 'created_at'], name='waitlist_status_created_idx'),
+        ]
+        constraints = [
+            # A user can only be in the queue once per movie at a time
+            models.UniqueConstraint(
+                fields=['movie', 'user'],
+                condition=models.Q(status__in=['waiting', 'offered']),
+                name='unique_active_waitlist_entry',
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.user.username} - {self.movie.title} - {self.status}"
+
+# A deferred side effect (emails, cache warming, ...) picked up by the run_jobs worker
+class Job(models.Model):
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    # Name the job function was registered under in bookings.jobs
+    name = models.CharField(max_length=100)
+    payload = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    # Earliest time the job may run, pushed back after each failed attempt
+    run_at = models.DateTimeField(default=timezone.now)
+    # Set when a worker claims the job so stuck jobs can be picked up again
+    locked_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['run_at', 'id']
+        indexes = [
+            # Workers claim due jobs by status and run_at
+            models.Index(fields=['status', 'run_at'], name='job_status_run_at_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.name} - {self.status}"
+
+# Queryset for the event log. Rows are never changed once written
+class BookingEventQuerySet(models.QuerySet):
+    def update(self, **kwargs):
+        raise TypeError("Booking events are append-only")
+
+    def delete(self):
+        raise TypeError("Booking events are append-only")
+
+# One seat state change, appended in the same transaction as the change itself. Ids are
+# plain columns, not foreign keys, so the log outlives deleted bookings, seats and showtimes.
+# Replaying the log in id order rebuilds seat statuses and showtime counters
+class BookingEvent(models.Model):
+    KIND_CHOICES = [
+        ('hold', 'Hold'),
+        ('release', 'Release hold'),
+        ('book', 'Book'),
+        ('cancel', 'Cancel'),
+        ('maintenance', 'Maintenance'),
+        ('available', 'Available'),
+    ]
+    # Kind: (status the seat must be in for the event to apply or None for any, new status).
+    # Mirrors the guarded UPDATEs that write the events
+    TRANSITIONS = {
+        'hold': (None, 'held'),
+        'release': ('held', 'available'),
+        'book': (None, 'booked'),
+        'cancel': ('booked', 'available'),
+        'maintenance': (None, 'maintenance'),
+        'available': (None, 'available'),
+    }
+    # Event for a seat set straight to a status (admin edits, imports, the baseline snapshot)
+    KIND_FOR_STATUS = {'available': 'available', 'booked': 'book', 'maintenance': 'maintenance', 'held': 'hold'}
+
+    kind = models.CharField(max_length=20, choices=KIND_CHOICES)
+    seat_id = models.BigIntegerField()
+    movie_id = models.BigIntegerField(null=True, blank=True)
+    showtime_id = models.BigIntegerField(null=True, blank=True)
+    user_id = models.BigIntegerField(null=True, blank=True)
+    booking_id = models.BigIntegerField(null=True, blank=True)
+    # Amount refunded by a cancel event, the price the booking was made at
+    refund = models.DecimalField(max_digits=8, decimal_places=2, null=True, blank=True)
+    created_at = models.DateTimeField(default=timezone.now)
+
+    objects = BookingEventQuerySet.as_manager()
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            # Point-in-time replays stop at a timestamp
+            models.Index(fields=['created_at'], name='booking_event_created_idx'),
+            # One seat's history
+            models.Index(fields=['seat_id', 'id'], name='booking_event_seat_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.kind} seat {self.seat_id} at {self.created_at}"
+
+    def save(self, *args, **kwargs):
+        if self.pk is not None:
+            raise TypeError("Booking events are append-only")
+        super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        raise TypeError("Booking events are append-only")
+
+    # Appends one event per seat with one INSERT. Call inside the transaction making the change
+    @classmethod
+    def record(cls, kind, seat_ids, **fields):
+        now = timezone.now()
+        return cls.objects.bulk_create([cls(kind=kind, seat_id=seat_id, created_at=now, **fields) for seat_id in seat_ids])
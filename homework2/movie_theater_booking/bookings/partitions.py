@@ -0,0 +1,126 @@
+from datetime import date
+
+from django.db import connection, transaction
+
+PARENT = 'bookings_booking'
+DEFAULT_PARTITION = 'bookings_booking_default'
+
+
+# True when the Booking table is partitioned (PostgreSQL after migration 0006)
+def is_partitioned():
+    if connection.vendor != 'postgresql':
+        return False
+    with connection.cursor() as cursor:
+        cursor.execute("SELECT 1 FROM pg_partitioned_table WHERE partrelid = %s::regclass", [PARENT])
+        return cursor.fetchone() is not None
+
+
+# First day of the month that is `months` months after the one `day` falls in
+def add_months(day, months):
+    index = day.year * 12 + day.month - 1 + months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month):
+    return f"{PARENT}_y{month.year}m{month.month:02d}"
+
+
+# Returns (name, lower bound, upper bound, estimated rows) for each monthly partition
+def list_partitions():
+    with connection.cursor() as cursor:
+        cursor.execute(
+            """
+            SELECT child.relname, pg_get_expr(child.relpartbound, child.oid), child.reltuples::bigint
+            FROM pg_inherits
+            JOIN pg_class child ON child.oid = pg_inherits.inhrelid
+            WHERE pg_inherits.inhparent = %s::regclass
+            ORDER BY child.relname
+            """,
+            [PARENT],
+        )
+        return cursor.fetchall()
+
+
+# Creates the partition for one month. Bookings for that month already sitting in the
+# default partition are moved into it first, since PostgreSQL won't create a partition
+# whose range overlaps rows in the default one. Returns how many rows were moved
+def create_month_partition(month):
+    name = partition_name(month)
+    lower, upper = month.isoformat(), add_months(month, 1).isoformat()
+    with transaction.atomic(), connection.cursor() as cursor:
+        cursor.execute(f"CREATE TABLE {name} (LIKE {PARENT} INCLUDING DEFAULTS INCLUDING CONSTRAINTS)")
+        cursor.execute(
+            f"""
+            WITH moved AS (
+                DELETE FROM {DEFAULT_PARTITION}
+                WHERE booking_date >= %s AND booking_date < %s
+                RETURNING *
+            )
+            INSERT INTO {name} SELECT * FROM moved
+            """,
+            [lower, upper],
+        )
+        moved = cursor.rowcount
+        cursor.execute(f"ALTER TABLE {PARENT} ATTACH PARTITION {name} FOR VALUES FROM (%s) TO (%s)", [lower, upper])
+        # The delete above fired the slot trigger, so put the moved bookings' slots back
+        cursor.execute(
+            f"INSERT INTO bookings_booking_slot (movie_id, seat_id, booking_id) SELECT movie_id, seat_id, id FROM {name}"
+        )
+    return moved
+
+
+# Makes sure there is a partition for every month from the oldest booking still in the
+# default partition through `ahead` months past today. Returns the names created
+def ensure_partitions(ahead=3, today=None):
+    today = today or date.today()
+    existing = {row[0] for row in list_partitions()}
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT MIN(booking_date) FROM {DEFAULT_PARTITION}")
+        oldest = cursor.fetchone()[0]
+    month = add_months(min(oldest.date(), today) if oldest else today, 0)
+    last = add_months(today, ahead)
+    created = []
+    while month <= last:
+        if partition_name(month) not in existing:
+            create_month_partition(month)
+            created.append(partition_name(month))
+        month = add_months(month, 1)
+    return created
+
+
+# Detaches every monthly partition that ends on or before `cutoff` and renames it
+# bookings_booking_archive_yYYYYmMM. The rows leave Booking (and free their slots) and are
+# copied into ArchivedBooking so full history still shows them, after which the archive
+# table can be dumped or dropped. Returns the archive table names
+def archive_partitions(cutoff):
+    archived = []
+    for name, _, _ in list_partitions():
+        if name == DEFAULT_PARTITION:
+            continue
+        year, month = int(name[-7:-3]), int(name[-2:])
+        if add_months(date(year, month, 1), 1) > cutoff:
+            continue
+        archive = name.replace(PARENT, f"{PARENT}_archive", 1)
+        with transaction.atomic(), connection.cursor() as cursor:
+            cursor.execute(f"ALTER TABLE {PARENT} DETACH PARTITION {name}")
+            cursor.execute(f"ALTER TABLE {name} RENAME TO {archive}")
+            cursor.execute(
+                f"""
+                DELETE FROM bookings_booking_slot slot USING {archive} archived
+                WHERE slot.booking_id = archived.id
+                  AND slot.movie_id = archived.movie_id AND slot.seat_id = archived.seat_id
+                """
+            )
+            cursor.execute(
+                f"""
+                INSERT INTO bookings_archivedbooking
+                    (booking_id, user_id, movie_id, movie_title, seat_number, booking_date, theater_id)
+                SELECT archived.id, archived.user_id, archived.movie_id, movie.title, seat.seat_number,
+                       archived.booking_date, archived.theater_id
+                FROM {archive} archived
+                JOIN bookings_movie movie ON movie.id = archived.movie_id
+                JOIN bookings_seat seat ON seat.id = archived.seat_id
+                """
+            )
+        archived.append(archive)
+    return archived
@@ -0,0 +1,117 @@
+from datetime import time
+from decimal import Decimal, ROUND_HALF_UP
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count
+from django.db.models.signals import post_save, pre_save
+from django.dispatch import receiver
+from django.utils import timezone
+
+from .models import Seat, Showtime
+
+# Evening price per seat class
+SEAT_CLASS_PRICES = {
+    'standard': Decimal('12.00'),
+    'premium': Decimal('15.00'),
+    'vip': Decimal('20.00'),
+}
+# Showings starting before this are matinees and get the discount
+MATINEE_BEFORE = time(17)
+MATINEE_MULTIPLIER = Decimal('0.75')
+# (occupancy at least, multiplier), highest first. Only used in dynamic mode
+DEMAND_TIERS = [
+    (Decimal('0.90'), Decimal('1.30')),
+    (Decimal('0.70'), Decimal('1.15')),
+    (Decimal('0.50'), Decimal('1.05')),
+]
+
+# When off, price tables are fixed at creation and never repriced
+DYNAMIC_PRICING = getattr(settings, 'DYNAMIC_PRICING', False)
+
+CENT = Decimal('0.01')
+
+# Tables are re-cached whenever they are saved or repriced. The timeout bounds how long a
+# quote can lag a table changed without going through save() or reprice_showtimes
+PRICE_TABLE_TIMEOUT = 10 * 60
+
+
+def cache_key(showtime_id):
+    return f'pricing:showtime:{showtime_id}'
+
+
+def demand_multiplier(occupancy):
+    for threshold, multiplier in DEMAND_TIERS:
+        if occupancy >= threshold:
+            return multiplier
+    return Decimal('1')
+
+
+# Price of every seat class for the showtime as decimal strings, ready to store as JSON
+def build_price_table(showtime, occupancy=0):
+    multiplier = MATINEE_MULTIPLIER if showtime.starts_at.time() < MATINEE_BEFORE else Decimal('1')
+    if DYNAMIC_PRICING:
+        multiplier *= demand_multiplier(Decimal(occupancy))
+    return {
+        seat_class: str((price * multiplier).quantize(CENT, rounding=ROUND_HALF_UP))
+        for seat_class, price in SEAT_CLASS_PRICES.items()
+    }
+
+
+# Cached price table for a showtime, read from the stored table on a miss. Showtimes
+# scheduled before pricing existed get their table built and stored the first time
+def price_table(showtime_id):
+    table = cache.get(cache_key(showtime_id))
+    if table is None:
+        showtime = Showtime.objects.filter(id=showtime_id).only('id', 'starts_at', 'price_table').first()
+        if showtime is None:
+            return None
+        table = showtime.price_table
+        if not table:
+            table = build_price_table(showtime)
+            Showtime.objects.filter(id=showtime_id).update(price_table=table)
+        cache.set(cache_key(showtime_id), table, PRICE_TABLE_TIMEOUT)
+    return table
+
+
+# Price of one seat. Bookings without a showtime pay the evening price for the class
+def quote(seat_class, showtime_id=None):
+    if showtime_id is None:
+        return SEAT_CLASS_PRICES[seat_class]
+    return Decimal(price_table(showtime_id)[seat_class])
+
+
+# New showtimes get their table before they are inserted. schedule_showtimes uses
+# bulk_create, which skips this signal, and fills the tables itself
+@receiver(pre_save, sender=Showtime)
+def fill_price_table(sender, instance, **kwargs):
+    if not instance.price_table:
+        instance.price_table = build_price_table(instance)
+
+
+# Keeps the cache in step with tables edited through save()
+@receiver(post_save, sender=Showtime)
+def refresh_cached_table(sender, instance, **kwargs):
+    cache.set(cache_key(instance.id), instance.price_table, PRICE_TABLE_TIMEOUT)
+
+
+# Rebuilds the tables of upcoming showtimes from their booked_count counters and
+# refreshes the cache. Returns how many tables changed
+def reprice_showtimes(batch_size=500):
+    if not DYNAMIC_PRICING:
+        return 0
+    # Occupancy is against the seats of the showtime's own theater
+    seats = dict(Seat.objects.values('theater_id').annotate(total=Count('id')).values_list('theater_id', 'total'))
+    showtimes = Showtime.objects.filter(starts_at__gte=timezone.now()).only(
+        'id', 'theater_id', 'starts_at', 'price_table', 'booked_count'
+    )
+    changed = []
+    for showtime in showtimes.iterator(chunk_size=batch_size):
+        occupancy = Decimal(showtime.booked_count) / (seats.get(showtime.theater_id) or 1)
+        table = build_price_table(showtime, occupancy=occupancy)
+        if table != showtime.price_table:
+            showtime.price_table = table
+            changed.append(showtime)
+    Showtime.objects.bulk_update(changed, ['price_table'], batch_size=batch_size)
+    cache.set_many({cache_key(showtime.id): showtime.price_table for showtime in changed}, PRICE_TABLE_TIMEOUT)
+    return len(changed)
@@ -0,0 +1,25 @@
+from rest_framework.renderers import JSONRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+# JSONRenderer that encodes with orjson when it is installed and falls back to DRF's
+# stdlib encoder otherwise. Output and media type are the same either way
+class FastJSONRenderer(JSONRenderer):
+    # Types orjson doesn't know (Decimal, lazy strings, querysets, ...) go through DRF's encoder
+    _fallback = JSONEncoder()
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if orjson is None:
+            return super().render(data, accepted_media_type, renderer_context)
+        if data is None:
+            return b''
+        option = orjson.OPT_NON_STR_KEYS
+        # orjson only supports two-space indents, used when a client asks for pretty output
+        if self.get_indent(accepted_media_type or '', renderer_context or {}):
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(data, default=self._fallback.default, option=option)
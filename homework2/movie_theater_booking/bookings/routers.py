@@ -0,0 +1,52 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.conf import settings
+
+# True while the current request may read from the replica. Off by default, so
+# management commands, workers and the shell always read from the primary
+_replica_reads = ContextVar('replica_reads', default=False)
+
+
+# Lets reads in the block go to the replica. Only safe API requests opt in
+@contextmanager
+def use_replica():
+    token = _replica_reads.set(True)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+# Sends every read in the block to the primary, for code that must see its own writes
+@contextmanager
+def use_primary():
+    token = _replica_reads.set(False)
+    try:
+        yield
+    finally:
+        _replica_reads.reset(token)
+
+
+# Sends reads to the replica named by REPLICA_DATABASE_ALIAS inside use_replica() and all
+# writes to default. Everything else reads from the primary (unsafe requests, recent
+# writers, commands and workers).
+# The database cache table is read from the primary too, a lagging copy would serve
+# entries that were already invalidated
+class PrimaryReplicaRouter:
+    def db_for_read(self, model, **hints):
+        replica = getattr(settings, 'REPLICA_DATABASE_ALIAS', None)
+        if not replica or not _replica_reads.get() or model._meta.app_label == 'django_cache':
+            return 'default'
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    # Both aliases hold the same data
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    # The replica gets its schema through replication
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == 'default'
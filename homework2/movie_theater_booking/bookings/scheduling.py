@@ -0,0 +1,144 @@
+from bisect import bisect_right
+from collections import defaultdict
+from datetime import datetime, time, timedelta
+
+from django.db import transaction
+
+from .models import Auditorium, Movie, Showtime
+from .pricing import build_price_table
+
+
+# Non-overlapping [start, end) intervals for one auditorium kept in two parallel sorted
+# lists. Because stored intervals never overlap, ends are sorted too, so an overlap
+# check only has to look at the neighbours around one bisect: O(log n). Adding is O(n)
+# for the list inserts, a memmove that stays cheap at one auditorium's showtime count
+class IntervalIndex:
+    def __init__(self, intervals=()):
+        self.starts = []
+        self.ends = []
+        for start, end in sorted(intervals):
+            self.starts.append(start)
+            self.ends.append(end)
+
+    def __len__(self):
+        return len(self.starts)
+
+    # Position of the first stored interval starting after start, or None on overlap
+    def _slot(self, start, end):
+        i = bisect_right(self.starts, start)
+        if i and self.ends[i - 1] > start:
+            return None
+        if i < len(self.starts) and self.starts[i] < end:
+            return None
+        return i
+
+    def overlaps(self, start, end):
+        return self._slot(start, end) is None
+
+    # Adds the interval if it fits and reports whether it did
+    def add(self, start, end):
+        i = self._slot(start, end)
+        if i is None:
+            return False
+        self.starts.insert(i, start)
+        self.ends.insert(i, end)
+        return True
+
+    # Earliest start at or after start where an interval of length fits
+    def next_free(self, start, length):
+        i = bisect_right(self.starts, start)
+        if i and self.ends[i - 1] > start:
+            start = self.ends[i - 1]
+        while i < len(self.starts) and self.starts[i] < start + length:
+            start = max(start, self.ends[i])
+            i += 1
+        return start
+
+
+# One index per auditorium holding the showtimes that touch [start, end)
+def load_indexes(start, end):
+    intervals = defaultdict(list)
+    rows = Showtime.objects.filter(starts_at__lt=end, ends_at__gt=start).values_list(
+        'auditorium_id', 'starts_at', 'ends_at'
+    )
+    for auditorium_id, starts_at, ends_at in rows.iterator():
+        intervals[auditorium_id].append((starts_at, ends_at))
+    return defaultdict(IntervalIndex, {key: IntervalIndex(value) for key, value in intervals.items()})
+
+
+# Validates proposed Showtime objects (unsaved, movie and auditorium set) against the
+# schedule and each other, and saves the ones that fit in one bulk insert.
+# Returns (created, rejected)
+def schedule_showtimes(proposals):
+    proposals = list(proposals)
+    if not proposals:
+        return [], []
+    # bulk_create skips save() and pre_save, so end times, theaters and price tables are filled here
+    for showtime in proposals:
+        showtime.ends_at = showtime.compute_end()
+        showtime.theater_id = showtime.auditorium.theater_id
+        showtime.price_table = showtime.price_table or build_price_table(showtime)
+
+    with transaction.atomic():
+        # Locks the auditoriums so two schedulers can't both fill the same gap
+        auditorium_ids = {showtime.auditorium_id for showtime in proposals}
+        list(Auditorium.objects.select_for_update().filter(id__in=auditorium_ids).values_list('id'))
+        indexes = load_indexes(
+            min(showtime.starts_at for showtime in proposals),
+            max(showtime.ends_at for showtime in proposals),
+        )
+        accepted, rejected = [], []
+        for showtime in proposals:
+            if indexes[showtime.auditorium_id].add(showtime.starts_at, showtime.ends_at):
+                accepted.append(showtime)
+            else:
+                rejected.append(showtime)
+        Showtime.objects.bulk_create(accepted, batch_size=1000)
+    return accepted, rejected
+
+
+# Rounds up to the next multiple of step minutes so listings start on round times
+def _round_up(moment, step):
+    minutes = moment.hour * 60 + moment.minute
+    if moment.second or moment.microsecond:
+        minutes += 1
+    rounded = -(-minutes // step) * step
+    return datetime.combine(moment.date(), time()) + timedelta(minutes=rounded)
+
+
+# Fills every auditorium from opens to closes on each of the days starting at first_day,
+# rotating through the movies already released by then. Existing showtimes are kept and
+# scheduled around. Returns the unsaved Showtime proposals
+def plan_week(first_day, days=7, opens=time(10), closes=time(23), step=5, movies=None, auditoriums=None):
+    movies = list(movies if movies is not None else Movie.objects.filter(
+        release_date__lte=first_day + timedelta(days=days - 1)
+    ).only('id', 'duration'))
+    auditoriums = list(auditoriums if auditoriums is not None else Auditorium.objects.all())
+    if not movies or not auditoriums:
+        return []
+
+    window_start = datetime.combine(first_day, time())
+    indexes = load_indexes(window_start, window_start + timedelta(days=days + 1))
+    proposals = []
+    turn = 0
+    for day in range(days):
+        date = first_day + timedelta(days=day)
+        open_at, close_at = datetime.combine(date, opens), datetime.combine(date, closes)
+        for auditorium in auditoriums:
+            index = indexes[auditorium.id]
+            cursor = open_at
+            while True:
+                movie = movies[turn % len(movies)]
+                length = timedelta(minutes=movie.duration + auditorium.cleaning_minutes)
+                start = _round_up(index.next_free(cursor, length), step)
+                # Rounding can land inside the next showtime, keep looking from there
+                while index.overlaps(start, start + length):
+                    start = _round_up(index.next_free(start, length), step)
+                # Last showing has to start before closing time
+                if start >= close_at:
+                    break
+                index.add(start, start + length)
+                proposals.append(Showtime(movie=movie, auditorium=auditorium, starts_at=start))
+                cursor = start + length
+                turn += 1
+    return proposals
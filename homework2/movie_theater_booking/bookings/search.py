@@ -0,0 +1,95 @@
+import re
+
+from django.db import connection
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+
+from .models import Movie
+
+# Title matches weigh more than description matches. The PostgreSQL GIN index in
+# migration 0004 is built on this exact expression so the planner can use it
+PG_SEARCH_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'B')"
+)
+
+PG_SEARCH_SQL = f"""
+    SELECT id FROM bookings_movie, websearch_to_tsquery('english', %s) AS query
+    WHERE {PG_SEARCH_VECTOR} @@ query
+    ORDER BY ts_rank({PG_SEARCH_VECTOR}, query) DESC, id
+    LIMIT %s
+"""
+
+# Every match, unranked, for use as an IN subquery
+PG_MATCH_SQL = f"SELECT id FROM bookings_movie WHERE {PG_SEARCH_VECTOR} @@ websearch_to_tsquery('english', %s)"
+
+# bm25 weights are per column (title, description), lower scores rank first
+SQLITE_SEARCH_SQL = """
+    SELECT rowid FROM bookings_movie_fts
+    WHERE bookings_movie_fts MATCH %s
+    ORDER BY bm25(bookings_movie_fts, 10.0, 1.0), rowid
+    LIMIT %s
+"""
+
+SQLITE_MATCH_SQL = "SELECT rowid FROM bookings_movie_fts WHERE bookings_movie_fts MATCH %s"
+
+
+# Turns free text into an FTS5 query where every word must match as a prefix.
+# Quoting each word keeps FTS5 operators in user input from being interpreted
+def _fts5_query(text):
+    words = re.findall(r'\w+', text)
+    return ' '.join(f'"{word}"*' for word in words)
+
+
+# Returns ids of movies matching the text, best match first
+def search_movie_ids(text, limit=20):
+    text = text.strip()
+    if not text:
+        return []
+
+    if connection.vendor == 'postgresql':
+        with connection.cursor() as cursor:
+            cursor.execute(PG_SEARCH_SQL, [text, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    if connection.vendor == 'sqlite':
+        query = _fts5_query(text)
+        if not query:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(SQLITE_SEARCH_SQL, [query, limit])
+            return [row[0] for row in cursor.fetchall()]
+
+    # Other databases fall back to a plain scan
+    return list(_scan_movies(text).values_list('id', flat=True)[:limit])
+
+
+# Ids of every movie matching the text as a subquery, so callers can filter with
+# id__in in the database however many movies match. Unranked
+def matching_movie_ids(text):
+    text = text.strip()
+    if not text:
+        return Movie.objects.none().values('id')
+
+    if connection.vendor == 'postgresql':
+        return RawSQL(PG_MATCH_SQL, [text])
+
+    if connection.vendor == 'sqlite':
+        query = _fts5_query(text)
+        if not query:
+            return Movie.objects.none().values('id')
+        return RawSQL(SQLITE_MATCH_SQL, [query])
+
+    return _scan_movies(text).values('id')
+
+
+# Same columns as the full-text indexes
+def _scan_movies(text):
+    return Movie.objects.filter(Q(title__icontains=text) | Q(description__icontains=text))
+
+
+# Returns matching Movie objects in ranked order
+def search_movies(text, limit=20):
+    ids = search_movie_ids(text, limit)
+    movies = Movie.objects.in_bulk(ids)
+    return [movies[movie_id] for movie_id in ids if movie_id in movies]
@@ -0,0 +1,115 @@
+import base64
+import hashlib
+
+from django.core.cache import cache
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .models import Seat, Theater
+from .signals import seats_changed
+
+# Each seat's status is packed into 2 bits, four seats per byte, in layout order
+STATUS_CODES = {status: code for code, (status, _) in enumerate(Seat.SEAT_STATUS_CHOICES)}
+BITS_PER_SEAT = 2
+SEATS_PER_BYTE = 8 // BITS_PER_SEAT
+
+# Maps are invalidated on every change. The timeouts bound how long one survives a write
+# that skipped the signals (raw SQL, another deploy's code) or a missed invalidation
+LAYOUT_TIMEOUT = 60 * 60
+STATUS_TIMEOUT = 5 * 60
+
+
+# Maps are cached per theater
+def layout_key(theater_id):
+    return f'seatmap:layout:{theater_id}'
+
+
+def status_key(theater_id):
+    return f'seatmap:status:{theater_id}'
+
+
+# A theater's seat ids, numbers and price classes in a fixed order plus the status code table.
+# Only changes when seats are added, removed or edited, so clients fetch it once and keep it by version
+def layout(theater_id):
+    data = cache.get(layout_key(theater_id))
+    if data is None:
+        rows = list(
+            Seat.objects.filter(theater_id=theater_id).order_by('seat_number', 'id')
+            .values_list('id', 'seat_number', 'seat_class')
+        )
+        digest = hashlib.sha1(repr(rows).encode()).hexdigest()[:12]
+        data = {
+            'version': digest,
+            'ids': [seat_id for seat_id, _, _ in rows],
+            'seats': [seat_number for _, seat_number, _ in rows],
+            'classes': [seat_class for _, _, seat_class in rows],
+            'statuses': [status for status, _ in Seat.SEAT_STATUS_CHOICES],
+            'bits_per_seat': BITS_PER_SEAT,
+        }
+        cache.set(layout_key(theater_id), data, LAYOUT_TIMEOUT)
+    return data
+
+
+def pack(statuses):
+    packed = bytearray((len(statuses) + SEATS_PER_BYTE - 1) // SEATS_PER_BYTE)
+    for i, status in enumerate(statuses):
+        packed[i // SEATS_PER_BYTE] |= STATUS_CODES[status] << (i % SEATS_PER_BYTE * BITS_PER_SEAT)
+    return bytes(packed)
+
+
+def unpack(packed, count):
+    statuses = [status for status, _ in Seat.SEAT_STATUS_CHOICES]
+    mask = (1 << BITS_PER_SEAT) - 1
+    return [
+        statuses[packed[i // SEATS_PER_BYTE] >> (i % SEATS_PER_BYTE * BITS_PER_SEAT) & mask]
+        for i in range(count)
+    ]
+
+
+# Returns (layout version, packed statuses). Seats missing from the cached layout
+# count as available until the layout is rebuilt
+def status_bitmap(theater_id):
+    cached = cache.get(status_key(theater_id))
+    if cached is None:
+        current = layout(theater_id)
+        statuses = dict(Seat.objects.filter(theater_id=theater_id).values_list('id', 'booking_status'))
+        packed = pack([statuses.get(seat_id, 'available') for seat_id in current['ids']])
+        cached = (current['version'], packed)
+        cache.set(status_key(theater_id), cached, STATUS_TIMEOUT)
+    return cached
+
+
+def status_bitmap_base64(theater_id):
+    version, packed = status_bitmap(theater_id)
+    return version, base64.b64encode(packed).decode('ascii')
+
+
+# Drops the cached maps of the given theaters, or of every theater. Call after bulk
+# writes that skip model signals
+def invalidate(theater_ids=None, layout=True):
+    if theater_ids is None:
+        theater_ids = Theater.objects.values_list('id', flat=True)
+    keys = []
+    for theater_id in theater_ids:
+        keys.append(status_key(theater_id))
+        if layout:
+            keys.append(layout_key(theater_id))
+    cache.delete_many(keys)
+
+
+@receiver(seats_changed)
+def seats_changed_invalidate(sender, seat_ids, **kwargs):
+    theater_ids = Seat._base_manager.filter(id__in=seat_ids).values_list('theater_id', flat=True).distinct()
+    invalidate(theater_ids, layout=False)
+
+
+# Status-only saves keep the layout, anything else may have changed a seat number
+@receiver(post_save, sender=Seat)
+def seat_saved_invalidate(sender, instance, created, update_fields=None, **kwargs):
+    layout_changed = created or update_fields is None or set(update_fields) != {'booking_status'}
+    invalidate([instance.theater_id], layout=layout_changed)
+
+
+@receiver(post_delete, sender=Seat)
+def seat_deleted_invalidate(sender, instance, **kwargs):
+    invalidate([instance.theater_id])
@@ -1,36 +1,64 @@
+from django.db import transaction
+from django.db.models import F
 from rest_framework import serializers
-from .models import Movie, Seat, Booking
+from .fieldsets import SparseFieldsMixin
+from .jobs import enqueue
+from .pricing import quote
+from .models import Movie, Seat, Booking, WaitlistEntry, ArchivedBooking, Showtime, Theater
 
 #DRF will automatically make serializer fields for the movie model due to using ModelSerializer
-class MovieSerializer(serializers.ModelSerializer):
+class MovieSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Will output the listed fields from the movie model in JSON format
     class Meta:
         model = Movie
         fields = ['id', 'title', 'description', 'release_date', 'duration']
 
 # Same thing as the Movie serializer but for seats
-class SeatSerializer(serializers.ModelSerializer):
+class SeatSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Seat
-        fields = ['id', 'seat_number', 'booking_status']
+        fields = ['id', 'seat_number', 'booking_status', 'seat_class', 'theater']
+        read_only_fields = ['theater']
 
-class BookingSerializer(serializers.ModelSerializer):
+class BookingSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     # Read-only fields to show movie title, seat num, and user. DRF uses the foreignkey to to grab var using "source='..'"
     movie_title = serializers.CharField(source='movie.title', read_only=True)
     seat_number = serializers.CharField(source='seat.seat_number', read_only=True)
     username = serializers.CharField(source='user.username', read_only=True)
 
+    # ?expand=movie,seat nests the full objects instead of their ids
+    expandable_fields = {'movie': MovieSerializer, 'seat': SeatSerializer}
+
     # Returns booking info
     class Meta:
         model = Booking
         fields = ['id', 'movie', 'movie_title', 'seat', 'seat_number', 
-                 'user', 'username', 'booking_date']
-        read_only_fields = ['user', 'booking_date']
+                 'user', 'username', 'booking_date', 'showtime', 'price']
+        read_only_fields = ['user', 'booking_date', 'price']
+
+# Archived bookings in the same shape as BookingSerializer so full history can mix both.
+# The seat may have been removed since, so only its number is kept
+class ArchivedBookingSerializer(serializers.ModelSerializer):
+    id = serializers.IntegerField(source='booking_id')
+    movie = serializers.IntegerField(source='movie_id')
+    seat = serializers.ReadOnlyField(default=None)
+    user = serializers.IntegerField(source='user_id')
+    username = serializers.CharField(source='user.username')
+    showtime = serializers.ReadOnlyField(default=None)
+    price = serializers.ReadOnlyField(default=None)
+    archived = serializers.ReadOnlyField(default=True)
+
+    class Meta:
+        model = ArchivedBooking
+        fields = ['id', 'movie', 'movie_title', 'seat', 'seat_number',
+                  'user', 'username', 'booking_date', 'showtime', 'price', 'archived']
+        read_only_fields = fields
 
 # Inherits from Serilizaers instead of modelserializer
 class SeatBookingSerializer(serializers.Serializer):
     movie_id = serializers.IntegerField()
     seat_id = serializers.IntegerField()
+    showtime_id = serializers.IntegerField(required=False, allow_null=True)
     
     def validate(self, data):
         # Makes sure that movie and seat exist in the db
@@ -42,28 +70,82 @@ class SeatBookingSerializer(serializers.Serializer):
         except Seat.DoesNotExist:
             raise serializers.ValidationError("Seat not found")
         
-        # Makes sure the seat is available to prevent double booking
-        if seat.booking_status != 'available':
+        # Makes sure the seat is available to prevent double booking.
+        # A held seat can only be booked by the waitlisted user it is being held for
+        data['offer'] = None
+        if seat.booking_status == 'held':
+            data['offer'] = WaitlistEntry.objects.filter(
+                movie=movie, seat=seat, user=self.context['request'].user, status='offered'
+            ).first()
+        if seat.booking_status != 'available' and data['offer'] is None:
             raise serializers.ValidationError("Seat is not available")
         
+        # The showtime has to be a showing of the movie being booked
+        data['showtime'] = None
+        if data.get('showtime_id') is not None:
+            data['showtime'] = Showtime.objects.filter(id=data['showtime_id'], movie=movie).only('id').first()
+            if data['showtime'] is None:
+                raise serializers.ValidationError("Showtime not found for this movie")
+
         data['movie'] = movie
         data['seat'] = seat
         return data
     
+    # Booking, seat status, counter and event log change together or not at all
+    @transaction.atomic
     def create(self, validated_data):
         # Uses current user that is logged in
         user = self.context['request'].user
 
-        # Makes the booking for user
+        # Makes the booking for user at the cached price for the seat's class
+        showtime = validated_data.get('showtime')
+        showtime_id = showtime.id if showtime else None
         booking = Booking.objects.create(
             movie=validated_data['movie'],
             seat=validated_data['seat'],
-            user=user
+            user=user,
+            showtime=showtime,
+            price=quote(validated_data['seat'].seat_class, showtime_id),
         )
+        # Occupancy counter read by the reprice_showtimes batch
+        if showtime:
+            Showtime.objects.filter(id=showtime_id).update(booked_count=F('booked_count') + 1)
         
         # Update seat status
         seat = validated_data['seat']
         seat.booking_status = 'booked'
-        seat.save()
+        seat.save(update_fields=['booking_status'], event_fields={
+            'booking_id': booking.id, 'movie_id': booking.movie_id, 'showtime_id': showtime_id, 'user_id': user.id,
+        })
+
+        # Closes out the waitlist offer the seat was held for
+        if validated_data.get('offer'):
+            WaitlistEntry.objects.filter(id=validated_data['offer'].id).update(status='fulfilled')
+
+        # Side effects run in the run_jobs worker so they don't slow down the response
+        enqueue('send_booking_confirmation', booking_id=booking.id)
         
         return booking
+
+# Shows a user's place in the waitlist and any seat being held for them
+class WaitlistEntrySerializer(serializers.ModelSerializer):
+    seat_number = serializers.CharField(source='seat.seat_number', read_only=True, default=None)
+
+    class Meta:
+        model = WaitlistEntry
+        fields = ['id', 'movie', 'theater', 'status', 'seat', 'seat_number', 'offer_expires_at', 'created_at']
+        read_only_fields = fields
+
+# A scheduled showing with the auditorium name flattened in
+class ShowtimeSerializer(serializers.ModelSerializer):
+    auditorium_name = serializers.CharField(source='auditorium.name', read_only=True)
+
+    class Meta:
+        model = Showtime
+        fields = ['id', 'movie', 'theater', 'auditorium', 'auditorium_name', 'starts_at', 'ends_at']
+        read_only_fields = fields
+
+class TheaterSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = Theater
+        fields = ['id', 'name']
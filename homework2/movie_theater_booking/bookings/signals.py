@@ -0,0 +1,6 @@
+from django.dispatch import Signal
+
+# Sent after a transaction that changes the booking_status of one or more seats commits.
+# Receivers get seat_ids (list of seat ids) and status (the new booking_status) so seat-map
+# caches and other subscribers can refresh once per change instead of once per seat
+seats_changed = Signal()
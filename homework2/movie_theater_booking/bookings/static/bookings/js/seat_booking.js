@@ -0,0 +1,78 @@
+document.addEventListener('DOMContentLoaded', function() {
+    const seats = document.querySelectorAll('.seat.available');
+    const bookingSummary = document.getElementById('booking-summary');
+    const noSelection = document.getElementById('no-selection');
+    const selectedSeatSpan = document.getElementById('selected-seat');
+    const confirmButton = document.getElementById('confirm-booking');
+    // Page specific values come from the template so this file can be cached for every movie
+    const seatGrid = document.querySelector('.seat-grid');
+    let selectedSeat = null;
+
+    seats.forEach(seat => {
+        seat.addEventListener('click', function() {
+            // Remove previous selection
+            document.querySelectorAll('.seat.selected').forEach(s => {
+                s.classList.remove('selected');
+                s.classList.add('available');
+            });
+
+            // Select current seat
+            this.classList.remove('available');
+            this.classList.add('selected');
+            selectedSeat = this;
+
+            // Update UI
+            selectedSeatSpan.textContent = this.dataset.seatNumber;
+            bookingSummary.style.display = 'block';
+            noSelection.style.display = 'none';
+        });
+    });
+
+    // Ensure confirmButton exists before adding event listener
+    if (confirmButton) {
+        confirmButton.addEventListener('click', function() {
+            if (!selectedSeat) return;
+
+            const seatId = selectedSeat.dataset.seatId;
+            const movieId = seatGrid.dataset.movieId;
+
+            // Make API call to book seat
+            fetch(`/api/seats/${seatId}/book/`, {
+                method: 'POST',
+                headers: {
+                    'Content-Type': 'application/json',
+                    'X-CSRFToken': getCookie('csrftoken')
+                },
+                body: JSON.stringify({ movie_id: movieId })
+            })
+            .then(response => response.json())
+            .then(data => {
+                if (data.id) {
+                    alert('Booking confirmed successfully!');
+                    window.location.href = seatGrid.dataset.historyUrl;
+                } else {
+                    alert('Booking failed: ' + (data.error || JSON.stringify(data)));
+                }
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                alert('Booking failed. Please try again.');
+            });
+        });
+    }
+
+    function getCookie(name) {
+        let cookieValue = null;
+        if (document.cookie && document.cookie !== '') {
+            const cookies = document.cookie.split(';');
+            for (let i = 0; i < cookies.length; i++) {
+                const cookie = cookies[i].trim();
+                if (cookie.substring(0, name.length + 1) === (name + '=')) {
+                    cookieValue = decodeURIComponent(cookie.substring(name.length + 1));
+                    break;
+                }
+            }
+        }
+        return cookieValue;
+    }
+});
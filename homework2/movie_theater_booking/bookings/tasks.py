@@ -0,0 +1,35 @@
+from django.core.mail import send_mail
+from django.dispatch import receiver
+
+from .jobs import enqueue, job
+from .models import Booking
+from .signals import seats_changed
+from .waitlist import process_waitlist as run_waitlist_pass
+
+
+# Emails the user a confirmation for their booking
+@job
+def send_booking_confirmation(booking_id):
+    booking = Booking.objects.select_related('movie', 'seat', 'user').filter(id=booking_id).first()
+    # Booking was cancelled before the job ran or the user has no email
+    if booking is None or not booking.user.email:
+        return
+    send_mail(
+        subject=f"Booking confirmed: {booking.movie.title}",
+        message=f"Your seat {booking.seat.seat_number} for {booking.movie.title} is booked.",
+        from_email=None,
+        recipient_list=[booking.user.email],
+    )
+
+
+# Runs a waitlist pass so freed seats are offered without waiting for the next poll
+@job
+def process_waitlist(batch_size=100):
+    run_waitlist_pass(batch_size=batch_size)
+
+
+# Queues a waitlist pass whenever seats become available
+@receiver(seats_changed)
+def queue_waitlist_pass(sender, seat_ids, status, **kwargs):
+    if status == 'available':
+        enqueue('process_waitlist', unique=True)
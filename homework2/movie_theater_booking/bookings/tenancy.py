@@ -0,0 +1,37 @@
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import models
+
+# Theater id the current request or worker is scoped to, None for all theaters
+_current_theater = ContextVar('current_theater', default=None)
+
+
+# Scopes every theater-owned query in the block to one location
+@contextmanager
+def use_theater(theater_id):
+    token = _current_theater.set(theater_id)
+    try:
+        yield
+    finally:
+        _current_theater.reset(token)
+
+
+def current_theater():
+    return _current_theater.get()
+
+
+class TheaterQuerySet(models.QuerySet):
+    def for_theater(self, theater):
+        return self.filter(theater=theater)
+
+
+# Manager for models owned by a theater. Inside use_theater() every queryset starts
+# filtered to that theater, so per-location code can't read another location's rows
+class TheaterScopedManager(models.Manager):
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        theater_id = current_theater()
+        if theater_id is not None:
+            queryset = queryset.filter(theater_id=theater_id)
+        return queryset
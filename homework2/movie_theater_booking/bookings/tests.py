@@ -1,28 +1,76 @@
-from django.test import TestCase
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from io import StringIO
+from unittest import mock, skipUnless
+import base64
+import json
+import os
+import tempfile
+
+from django.conf import settings
+from django.test import TestCase, RequestFactory, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.contrib.auth.models import User
-from rest_framework.test import APITestCase, APIClient
+from django.core import mail
+from django.core.exceptions import ValidationError
+from django.core.cache import cache
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection, transaction
+from django.http import HttpResponse
+from django.utils import timezone
+from rest_framework.test import APITestCase
 from rest_framework import status
-from datetime import date, timedelta
-from .models import Movie, Seat, Booking
+from rest_framework.renderers import JSONRenderer
+
+from . import pricing, renderers, search, seatmap
+from .admin import EstimatedCountPaginator
+from .archive import archive_bookings
+from .batch import MAX_BATCH_IDS
+from .events import replay
+from .factories import make_bookings, make_dataset, make_movies, make_seats
+from .jobs import enqueue, run_jobs
+from .middleware import HealthCheckMiddleware, ReplicaPinningMiddleware
+from .models import (
+    Movie, Seat, Booking, WaitlistEntry, Job, ArchivedBooking, Auditorium, Showtime, BookingEvent, Theater,
+    default_theater_id,
+)
+from .partitions import DEFAULT_PARTITION, add_months, archive_partitions, ensure_partitions, partition_name
+from .pricing import price_table, reprice_showtimes
+from .renderers import FastJSONRenderer
+from .routers import PrimaryReplicaRouter, use_primary, use_replica
+from .scheduling import IntervalIndex, schedule_showtimes
+from .search import matching_movie_ids, search_movie_ids
+from .signals import seats_changed
+from .tenancy import use_theater
+from .waitlist import process_waitlist
+from .warmup import warm_caches
+
+
+# SQL of the captured queries, leaving out reads and writes of the database cache table
+def app_queries(queries):
+    table = settings.CACHES['default'].get('LOCATION', '')
+    return [query['sql'] for query in queries if table not in query['sql']]
 
 
 class ModelUnitTests(TestCase):
     
-    # Set up func to create a user, movie, and available seat
-    def setUp(self):
+    # Creates a user, movie, and available seat once for the class
+    @classmethod
+    def setUpTestData(cls):
         """Set up test data for model tests"""
-        self.user = User.objects.create_user(
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123'
         )
-        self.movie = Movie.objects.create(
+        cls.movie = Movie.objects.create(
             title='Test Movie',
             description='A test movie description',
             release_date=date.today(),
             duration=120
         )
-        self.seat = Seat.objects.create(
+        cls.seat = Seat.objects.create(
+            theater_id=default_theater_id(),
             seat_number='A1',
             booking_status='available'
         )
@@ -121,6 +169,7 @@ class ModelUnitTests(TestCase):
         # Test Seat seat_number is unique
         with self.assertRaises(Exception):
             Seat.objects.create(
+                theater_id=default_theater_id(),
                 seat_number='A1',  # Duplicate seat number
                 booking_status='available'
             )
@@ -133,7 +182,7 @@ class ModelUnitTests(TestCase):
                 self.assertLessEqual(movies[i].release_date, movies[i + 1].release_date)
         
         # Test Seat ordering
-        seat2 = Seat.objects.create(seat_number='A2', booking_status='available')
+        seat2 = Seat.objects.create(theater_id=default_theater_id(), seat_number='A2', booking_status='available')
         seats = Seat.objects.all()
         self.assertEqual(seats[0].seat_number, 'A1')
         self.assertEqual(seats[1].seat_number, 'A2')
@@ -142,20 +191,21 @@ class ModelUnitTests(TestCase):
 class APIIntegrationTests(APITestCase):
     
     # Sets up test data for API
-    def setUp(self):
-        self.client = APIClient()
-        self.user = User.objects.create_user(
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(
             username='testuser',
             email='test@example.com',
             password='testpass123'
         )
-        self.movie = Movie.objects.create(
+        cls.movie = Movie.objects.create(
             title='Integration Test Movie',
             description='A movie for integration testing',
             release_date=date.today(),
             duration=150
         )
-        self.seat = Seat.objects.create(
+        cls.seat = Seat.objects.create(
+            theater_id=default_theater_id(),
             seat_number='B1',
             booking_status='available'
         )
@@ -426,4 +476,1398 @@ class APIIntegrationTests(APITestCase):
             self.assertIn('description', movie_data)
             self.assertIn('duration', movie_data)
             self.assertEqual(movie_data['title'], 'Integration Test Movie')
-            self.assertEqual(movie_data['duration'], 150)
\ No newline at end of file
+            self.assertEqual(movie_data['duration'], 150)
+
+class BookingCancellationTests(APITestCase):
+
+    # Sets up a user with one booked seat
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='canceluser', password='testpass123')
+        cls.movie = Movie.objects.create(
+            title='Cancel Movie',
+            description='A movie for cancellation testing',
+            release_date=date.today(),
+            duration=100
+        )
+        cls.seat = Seat.objects.create(theater_id=default_theater_id(), seat_number='C1', booking_status='booked')
+        cls.booking = Booking.objects.create(movie=cls.movie, seat=cls.seat, user=cls.user)
+
+    # Tests that the cancel action removes the booking and frees the seat
+    def test_cancel_action_releases_seat(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f'/api/bookings/{self.booking.id}/cancel/')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertFalse(Booking.objects.filter(id=self.booking.id).exists())
+        self.seat.refresh_from_db()
+        self.assertEqual(self.seat.booking_status, 'available')
+
+    # Tests that DELETE goes through the same release path
+    def test_delete_releases_seat(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.delete(f'/api/bookings/{self.booking.id}/')
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.seat.refresh_from_db()
+        self.assertEqual(self.seat.booking_status, 'available')
+
+    # Tests that a user can't cancel someone else's booking
+    def test_cancel_other_users_booking_not_found(self):
+        other = User.objects.create_user(username='otheruser', password='testpass123')
+        self.client.force_authenticate(user=other)
+        response = self.client.post(f'/api/bookings/{self.booking.id}/cancel/')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.seat.refresh_from_db()
+        self.assertEqual(self.seat.booking_status, 'booked')
+
+    # Tests the bulk cancel for a movie and that maintenance seats stay untouched
+    def test_cancel_bookings_for_movie(self):
+        maintenance_seat = Seat.objects.create(
+            theater_id=default_theater_id(), seat_number='C2', booking_status='maintenance',
+        )
+        Booking.objects.create(movie=self.movie, seat=maintenance_seat, user=self.user)
+        admin = User.objects.create_superuser(username='staff', password='testpass123')
+        self.client.force_authenticate(user=admin)
+        received = []
+        handler = lambda sender, **kwargs: received.append(kwargs)
+        seats_changed.connect(handler)
+        self.addCleanup(seats_changed.disconnect, handler)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(f'/api/movies/{self.movie.id}/cancel_bookings/')
+        self.assertEqual(response.data['cancelled'], 2)
+        # Subscribers are told once for the whole batch
+        self.assertEqual(len(received), 1)
+        self.assertEqual(sorted(received[0]['seat_ids']), sorted([self.seat.id, maintenance_seat.id]))
+        self.assertFalse(Booking.objects.filter(movie=self.movie).exists())
+        self.seat.refresh_from_db()
+        maintenance_seat.refresh_from_db()
+        self.assertEqual(self.seat.booking_status, 'available')
+        self.assertEqual(maintenance_seat.booking_status, 'maintenance')
+
+    # Tests that a bulk cancel runs the same queries for 50 bookings as for one. The
+    # cascade receiver must not add an UPDATE per deleted booking
+    def test_bulk_cancel_query_count(self):
+        seats = make_seats(50, prefix='Q', booking_status='booked')
+        make_bookings(50, [self.movie], seats, [self.user])
+        with self.assertNumQueries(7):
+            cancelled, _ = Booking.objects.filter(movie=self.movie, seat__in=seats).cancel()
+        self.assertEqual(cancelled, 50)
+        self.assertFalse(Seat.objects.filter(id__in=[seat.id for seat in seats], booking_status='booked').exists())
+
+    # Tests that cancelling returns the prices paid and logs each refund on its cancel event
+    def test_cancel_refunds_price(self):
+        Booking.objects.filter(id=self.booking.id).update(price=Decimal('12.50'))
+        priced_seat = Seat.objects.create(theater_id=default_theater_id(), seat_number='C3', booking_status='booked')
+        Booking.objects.create(movie=self.movie, seat=priced_seat, user=self.user, price=Decimal('9.00'))
+        unpriced_seat = Seat.objects.create(theater_id=default_theater_id(), seat_number='C4', booking_status='booked')
+        Booking.objects.create(movie=self.movie, seat=unpriced_seat, user=self.user)
+        admin = User.objects.create_superuser(username='refunds', password='testpass123')
+        self.client.force_authenticate(user=admin)
+        response = self.client.post(f'/api/movies/{self.movie.id}/cancel_bookings/')
+        self.assertEqual(response.data, {'cancelled': 3, 'refunded': '21.50'})
+        refunds = BookingEvent.objects.filter(kind='cancel').values_list('seat_id', 'refund')
+        self.assertEqual(dict(refunds), {
+            self.seat.id: Decimal('12.50'), priced_seat.id: Decimal('9.00'), unpriced_seat.id: None,
+        })
+
+    # Tests that a user's cancel reports the refund for their booking
+    def test_cancel_action_reports_refund(self):
+        Booking.objects.filter(id=self.booking.id).update(price=Decimal('12.50'))
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f'/api/bookings/{self.booking.id}/cancel/')
+        self.assertEqual(response.data, {'cancelled': self.booking.id, 'refunded': '12.50'})
+
+    # Tests that regular users can't cancel a whole movie
+    def test_cancel_bookings_requires_staff(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f'/api/movies/{self.movie.id}/cancel_bookings/')
+        self.assertEqual(response.status_code, status.HTTP_403_FORBIDDEN)
+
+
+class WaitlistTests(APITestCase):
+
+    # Sets up a sold out movie with two users waiting in line
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie = Movie.objects.create(
+            title='Sold Out Movie',
+            description='Every seat is gone',
+            release_date=date.today(),
+            duration=120
+        )
+        cls.seat = Seat.objects.create(theater_id=default_theater_id(), seat_number='W1', booking_status='booked')
+        cls.owner = User.objects.create_user(username='owner', password='testpass123')
+        cls.booking = Booking.objects.create(movie=cls.movie, seat=cls.seat, user=cls.owner)
+        cls.first = User.objects.create_user(username='first', password='testpass123')
+        cls.second = User.objects.create_user(username='second', password='testpass123')
+
+    # Tests that users can join the queue and see their position
+    def test_join_waitlist_reports_position(self):
+        self.client.force_authenticate(user=self.first)
+        self.client.post(f'/api/movies/{self.movie.id}/waitlist/')
+        self.client.force_authenticate(user=self.second)
+        response = self.client.post(f'/api/movies/{self.movie.id}/waitlist/')
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['status'], 'waiting')
+        self.assertEqual(response.data['position'], 2)
+
+    # Tests that the queue can't be joined while seats are still open
+    def test_join_rejected_when_seats_available(self):
+        Seat.objects.create(theater_id=default_theater_id(), seat_number='W2', booking_status='available')
+        self.client.force_authenticate(user=self.first)
+        response = self.client.post(f'/api/movies/{self.movie.id}/waitlist/')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    # Tests that a freed seat is held for the first user in line who can then book it
+    def test_freed_seat_offered_to_first_in_line(self):
+        first_entry = WaitlistEntry.objects.create(movie=self.movie, user=self.first, theater=self.seat.theater)
+        second_entry = WaitlistEntry.objects.create(movie=self.movie, user=self.second, theater=self.seat.theater)
+        self.booking.cancel()
+
+        self.assertEqual(process_waitlist(), (0, 1))
+        first_entry.refresh_from_db()
+        second_entry.refresh_from_db()
+        self.seat.refresh_from_db()
+        self.assertEqual(first_entry.status, 'offered')
+        self.assertEqual(first_entry.seat, self.seat)
+        self.assertEqual(second_entry.status, 'waiting')
+        self.assertEqual(self.seat.booking_status, 'held')
+
+        # Only the user the seat is held for can book it
+        self.client.force_authenticate(user=self.second)
+        response = self.client.post(f'/api/seats/{self.seat.id}/book/', {'movie_id': self.movie.id})
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.client.force_authenticate(user=self.first)
+        response = self.client.post(f'/api/seats/{self.seat.id}/book/', {'movie_id': self.movie.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        first_entry.refresh_from_db()
+        self.assertEqual(first_entry.status, 'fulfilled')
+
+    # Tests that an expired hold moves on to the next user in line
+    def test_expired_hold_goes_to_next_in_line(self):
+        self.booking.cancel()
+        first_entry = WaitlistEntry.objects.create(movie=self.movie, user=self.first, theater=self.seat.theater)
+        second_entry = WaitlistEntry.objects.create(movie=self.movie, user=self.second, theater=self.seat.theater)
+        process_waitlist()
+        WaitlistEntry.objects.filter(id=first_entry.id).update(
+            offer_expires_at=timezone.now() - timedelta(minutes=1)
+        )
+
+        self.assertEqual(process_waitlist(), (1, 1))
+        first_entry.refresh_from_db()
+        second_entry.refresh_from_db()
+        self.assertEqual(first_entry.status, 'expired')
+        self.assertEqual(second_entry.status, 'offered')
+        self.assertEqual(second_entry.seat, self.seat)
+
+
+class JobQueueTests(APITestCase):
+
+    # Sets up a user with an email address and a seat to book
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='jobuser', email='job@example.com', password='testpass123')
+        cls.movie = Movie.objects.create(
+            title='Job Movie',
+            description='A movie for job queue testing',
+            release_date=date.today(),
+            duration=90
+        )
+        cls.seat = Seat.objects.create(
+            theater_id=default_theater_id(), seat_number='J1', booking_status='available',
+        )
+
+    # Tests that booking queues the confirmation email instead of sending it inline
+    def test_booking_defers_confirmation_email(self):
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f'/api/seats/{self.seat.id}/book/', {'movie_id': self.movie.id})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(mail.outbox), 0)
+        job = Job.objects.get(name='send_booking_confirmation')
+        self.assertEqual(job.payload, {'booking_id': response.data['id']})
+
+        self.assertEqual(run_jobs(), (1, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'done')
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn('Job Movie', mail.outbox[0].subject)
+
+    # Tests that a failing job is retried later and then marked failed
+    def test_failed_job_is_retried_then_failed(self):
+        job = enqueue('send_booking_confirmation', booking_id='not-an-id')
+        with self.assertLogs('bookings.jobs', level='ERROR'):
+            self.assertEqual(run_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'queued')
+        self.assertGreater(job.run_at, timezone.now())
+        self.assertIn('Traceback', job.last_error)
+
+        Job.objects.filter(id=job.id).update(run_at=timezone.now(), attempts=job.max_attempts - 1)
+        with self.assertLogs('bookings.jobs', level='ERROR'):
+            self.assertEqual(run_jobs(), (0, 1))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+
+    # Tests that a job left running by a dead worker is retried until it runs out of attempts
+    def test_stale_running_job_respects_max_attempts(self):
+        job = enqueue('send_booking_confirmation', booking_id='not-an-id')
+        stale = timezone.now() - timedelta(hours=1)
+        Job.objects.filter(id=job.id).update(status='running', locked_at=stale, attempts=job.max_attempts)
+        self.assertEqual(run_jobs(), (0, 0))
+        job.refresh_from_db()
+        self.assertEqual(job.status, 'failed')
+        self.assertEqual(job.attempts, job.max_attempts)
+        self.assertIsNotNone(job.finished_at)
+
+        retried = enqueue('send_booking_confirmation', booking_id='not-an-id')
+        Job.objects.filter(id=retried.id).update(status='running', locked_at=stale, attempts=1)
+        with self.assertLogs('bookings.jobs', level='ERROR'):
+            self.assertEqual(run_jobs(), (0, 1))
+        retried.refresh_from_db()
+        self.assertEqual(retried.attempts, 2)
+        self.assertEqual(retried.status, 'queued')
+
+    # Tests that freeing seats queues a single waitlist pass
+    def test_released_seats_queue_one_waitlist_pass(self):
+        seats_changed.send(sender=Seat, seat_ids=[self.seat.id], status='available')
+        seats_changed.send(sender=Seat, seat_ids=[self.seat.id], status='available')
+        self.assertEqual(Job.objects.filter(name='process_waitlist', status='queued').count(), 1)
+
+
+class MovieSearchTests(APITestCase):
+
+    # Sets up movies where one matches in the title and one only in the description
+    @classmethod
+    def setUpTestData(cls):
+        cls.title_match = Movie.objects.create(
+            title='Space Odyssey',
+            description='A voyage to Jupiter',
+            release_date=date.today(),
+            duration=149
+        )
+        cls.description_match = Movie.objects.create(
+            title='Interstellar',
+            description='Explorers travel through space to save humanity',
+            release_date=date.today(),
+            duration=169
+        )
+        Movie.objects.create(
+            title='Inception',
+            description='A thief who steals secrets through dreams',
+            release_date=date.today(),
+            duration=148
+        )
+
+    # Tests that results are ranked with title matches first
+    def test_search_ranks_title_matches_first(self):
+        response = self.client.get('/api/movies/search/', {'q': 'space'})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        titles = [movie['title'] for movie in response.data]
+        self.assertEqual(titles, ['Space Odyssey', 'Interstellar'])
+
+    # Tests that words match as prefixes and the index follows updates
+    def test_search_prefix_and_updates(self):
+        self.assertEqual(search_movie_ids('jupit'), [self.title_match.id])
+        self.title_match.description = 'A voyage to Saturn'
+        self.title_match.save()
+        self.assertEqual(search_movie_ids('jupiter'), [])
+        self.assertEqual(search_movie_ids('saturn'), [self.title_match.id])
+
+    # Tests that search operators in user input are treated as plain text
+    def test_search_ignores_query_syntax(self):
+        response = self.client.get('/api/movies/search/', {'q': 'space" OR NEAR('})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(search_movie_ids('   '), [])
+
+    # Tests the scan used on databases without a full-text index matches descriptions too
+    def test_fallback_searches_descriptions(self):
+        with mock.patch.object(search.connection, 'vendor', 'other'):
+            self.assertEqual(set(search_movie_ids('space')), {self.title_match.id, self.description_match.id})
+            matches = Movie.objects.filter(id__in=matching_movie_ids('humanity'))
+            self.assertEqual(list(matches), [self.description_match])
+
+
+# Admin pages need static file urls, the manifest only exists after collectstatic
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class BookingAdminTests(TestCase):
+
+    # Sets up a staff user and bookings for two movies
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='adminuser', password='testpass123')
+        cls.matrix = Movie.objects.create(
+            title='The Matrix', description='Simulated reality', release_date=date.today(), duration=136
+        )
+        cls.inception = Movie.objects.create(
+            title='Inception', description='Dreams within dreams', release_date=date.today(), duration=148
+        )
+        for index in range(5):
+            user = User.objects.create_user(username=f'viewer{index}', password='testpass123')
+            seat = Seat.objects.create(
+                theater_id=default_theater_id(), seat_number=f'D{index}', booking_status='booked',
+            )
+            movie = cls.matrix if index % 2 else cls.inception
+            Booking.objects.create(movie=movie, seat=seat, user=user)
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    # Tests that the changelist query count doesn't grow with the number of rows
+    def test_changelist_joins_related_rows(self):
+        url = '/admin/bookings/booking/'
+        with CaptureQueriesContext(connection) as few:
+            self.client.get(url)
+        for index in range(5, 10):
+            user = User.objects.create_user(username=f'viewer{index}', password='testpass123')
+            seat = Seat.objects.create(
+                theater_id=default_theater_id(), seat_number=f'D{index}', booking_status='booked',
+            )
+            Booking.objects.create(movie=self.matrix, seat=seat, user=user)
+        with CaptureQueriesContext(connection) as more:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(few), len(more))
+
+    # Tests the movie title text filter and the indexed search
+    def test_title_filter_and_search(self):
+        response = self.client.get('/admin/bookings/booking/', {'movie_title': 'matrix'})
+        self.assertContains(response, 'name="movie_title" value="matrix"')
+        self.assertEqual(response.context['cl'].result_count, 2)
+        response = self.client.get('/admin/bookings/booking/', {'q': 'viewer0'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+        response = self.client.get('/admin/bookings/booking/', {'q': 'D3'})
+        self.assertEqual(list(response.context['cl'].result_list), [Booking.objects.get(seat__seat_number='D3')])
+
+    # Tests movie search filters in the database instead of stopping at a fixed number of ids
+    def test_movie_search_is_not_capped(self):
+        make_movies(1100, prefix='Sequel')
+        response = self.client.get('/admin/bookings/movie/', {'q': 'sequel'})
+        self.assertEqual(response.context['cl'].result_count, 1100)
+        response = self.client.get('/admin/bookings/booking/', {'movie_title': 'matrix reality'})
+        self.assertEqual(response.context['cl'].result_count, 2)
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class SeatAdminActionTests(TestCase):
+
+    # Sets up row E with one booked seat and row F
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser(username='seatadmin', password='testpass123')
+        for number in ['E1', 'E2', 'E3', 'F1']:
+            Seat.objects.create(theater_id=default_theater_id(), seat_number=number, booking_status='available')
+        Seat.objects.filter(seat_number='E2').update(booking_status='booked')
+
+    def setUp(self):
+        self.client.force_login(self.admin)
+
+    # Posts an admin action for every seat in a row
+    def run_action(self, action, row):
+        ids = Seat.objects.filter(seat_number__startswith=row).values_list('id', flat=True)
+        return self.client.post('/admin/bookings/seat/', {
+            'action': action,
+            '_selected_action': [str(seat_id) for seat_id in ids],
+        }, follow=True)
+
+    # Tests closing a row with one UPDATE that skips booked seats and notifies once
+    def test_mark_row_maintenance(self):
+        received = []
+        handler = lambda sender, **kwargs: received.append(kwargs)
+        seats_changed.connect(handler)
+        self.addCleanup(seats_changed.disconnect, handler)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.run_action('mark_maintenance', 'E')
+        self.assertContains(response, '2 seats marked maintenance')
+        self.assertContains(response, 'were skipped')
+        statuses = dict(Seat.objects.values_list('seat_number', 'booking_status'))
+        self.assertEqual(statuses, {'E1': 'maintenance', 'E2': 'booked', 'E3': 'maintenance', 'F1': 'available'})
+        self.assertEqual(len(received), 1)
+        self.assertEqual(received[0]['status'], 'maintenance')
+
+    # Tests reopening a row and the row filter
+    def test_mark_row_available_and_row_filter(self):
+        Seat.objects.filter(seat_number='E1').update(booking_status='maintenance')
+        self.run_action('mark_available', 'E')
+        self.assertEqual(Seat.objects.get(seat_number='E1').booking_status, 'available')
+        self.assertEqual(Seat.objects.get(seat_number='E2').booking_status, 'booked')
+        response = self.client.get('/admin/bookings/seat/', {'row': 'F'})
+        self.assertEqual(response.context['cl'].result_count, 1)
+
+
+class CatalogImportExportTests(TestCase):
+
+    # Writes content to a temporary file that is removed after the test
+    def write_file(self, suffix, content):
+        handle = tempfile.NamedTemporaryFile('w', suffix=suffix, delete=False, encoding='utf-8')
+        handle.write(content)
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        return handle.name
+
+    # Tests importing movies from CSV and seats from JSON Lines in small batches
+    def test_import_movies_and_seats(self):
+        movies = self.write_file('.csv', (
+            'title,description,release_date,duration\n'
+            'Alien,In space no one can hear you scream,1979-05-25,117\n'
+            'Aliens,This time it is war,1986-07-18,137\n'
+            'Heat,A group of professional bank robbers,1995-12-15,170\n'
+        ))
+        seats = self.write_file('.jsonl', '{"seat_number": "G1"}\n{"seat_number": "G2", "booking_status": "maintenance"}\n')
+        out = StringIO()
+        call_command('import_catalog', movies, kind='movies', batch_size=2, stdout=out, stderr=StringIO())
+        self.assertIn('Imported 3 movies', out.getvalue())
+        call_command('import_catalog', seats, kind='seats', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Movie.objects.count(), 3)
+        self.assertEqual(Seat.objects.get(seat_number='G2').booking_status, 'maintenance')
+
+    # Tests importing bookings and exporting them back out
+    def test_import_then_export_bookings(self):
+        user = User.objects.create_user(username='importer', password='testpass123')
+        movie = Movie.objects.create(title='Heat', description='Bank robbers', release_date=date.today(), duration=170)
+        Seat.objects.create(theater_id=default_theater_id(), seat_number='H1')
+        bookings = self.write_file('.csv', f'username,movie_id,seat_number\nimporter,{movie.id},H1\n')
+        call_command('import_catalog', bookings, kind='bookings', stdout=StringIO(), stderr=StringIO())
+        self.assertTrue(Booking.objects.filter(user=user, movie=movie, seat__seat_number='H1').exists())
+        self.assertEqual(Seat.objects.get(seat_number='H1').booking_status, 'booked')
+
+        out = StringIO()
+        call_command('export_bookings', format='jsonl', chunk_size=1, stdout=out, stderr=StringIO())
+        record = json.loads(out.getvalue().splitlines()[0])
+        self.assertEqual(record['username'], 'importer')
+        self.assertEqual(record['movie_title'], 'Heat')
+        self.assertEqual(record['seat_number'], 'H1')
+
+    # Tests that movies already in the catalog are skipped and counted, not duplicated
+    def test_reimport_skips_existing_movies(self):
+        movies = self.write_file('.csv', (
+            'title,description,release_date,duration\n'
+            'Alien,In space no one can hear you scream,1979-05-25,117\n'
+            'Alien,Remake,2029-05-25,117\n'
+            'Alien,In space no one can hear you scream,1979-05-25,117\n'
+        ))
+        call_command('import_catalog', movies, kind='movies', stdout=StringIO(), stderr=StringIO())
+        out = StringIO()
+        call_command('import_catalog', movies, kind='movies', stdout=out, stderr=StringIO())
+        self.assertIn('Imported 0 movies', out.getvalue())
+        self.assertIn('3 already existed', out.getvalue())
+        self.assertEqual(Movie.objects.filter(title='Alien').count(), 2)
+
+    # Tests that exported bookings import with their original booking dates
+    def test_round_trip_keeps_booking_date(self):
+        user = User.objects.create_user(username='roundtrip', password='testpass123')
+        movie = Movie.objects.create(title='Heat', description='Bank robbers', release_date=date.today(), duration=170)
+        seat = Seat.objects.create(theater_id=default_theater_id(), seat_number='R1')
+        booked_at = timezone.now().replace(microsecond=0) - timedelta(days=400)
+        Booking.objects.create(movie=movie, seat=seat, user=user, booking_date=booked_at)
+        for fmt in ['csv', 'jsonl']:
+            out = StringIO()
+            call_command('export_bookings', format=fmt, stdout=out, stderr=StringIO())
+            Booking.objects.all().delete()
+            path = self.write_file(f'.{fmt}', out.getvalue())
+            call_command('import_catalog', path, kind='bookings', stdout=StringIO(), stderr=StringIO())
+            self.assertEqual(Booking.objects.get(seat=seat).booking_date, booked_at)
+
+    # Tests that a malformed --since is reported as a command error
+    def test_export_rejects_bad_since(self):
+        with self.assertRaises(CommandError):
+            call_command('export_bookings', since='last week', stdout=StringIO(), stderr=StringIO())
+
+    # Tests full batches of seats and bookings import without one huge OR of seat lookups
+    def test_import_large_batches(self):
+        user = User.objects.create_user(username='bulk', password='testpass123')
+        movie = Movie.objects.create(title='Bulk', description='', release_date=date.today(), duration=90)
+        seats = self.write_file('.csv', 'seat_number,booking_status\n' + ''.join(
+            f'Z{i},{"maintenance" if i % 2 else "available"}\n' for i in range(1200)
+        ))
+        call_command('import_catalog', seats, kind='seats', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(BookingEvent.objects.filter(kind='maintenance').count(), 600)
+
+        Seat.objects.update(booking_status='available')
+        bookings = self.write_file('.csv', 'username,movie_id,seat_number\n' + ''.join(
+            f'bulk,{movie.id},Z{i}\n' for i in range(1200)
+        ))
+        call_command('import_catalog', bookings, kind='bookings', stdout=StringIO(), stderr=StringIO())
+        self.assertEqual(Booking.objects.filter(user=user).count(), 1200)
+
+
+@override_settings(REPLICA_DATABASE_ALIAS='replica')
+class ReplicaRoutingTests(TestCase):
+
+    # Runs a request through the pinning middleware and returns the read alias seen by the view
+    def read_alias_during(self, request):
+        seen = {}
+
+        def view(request):
+            seen['alias'] = PrimaryReplicaRouter().db_for_read(Movie)
+            return HttpResponse()
+
+        response = ReplicaPinningMiddleware(view)(request)
+        return seen['alias'], response
+
+    # Tests that reads opt into the replica and writes go to the primary
+    def test_reads_use_replica(self):
+        router = PrimaryReplicaRouter()
+        self.assertEqual(router.db_for_read(Movie), 'default')
+        with use_replica():
+            self.assertEqual(router.db_for_read(Movie), 'replica')
+            self.assertEqual(router.db_for_write(Movie), 'default')
+            with use_primary():
+                self.assertEqual(router.db_for_read(Movie), 'default')
+        self.assertFalse(router.allow_migrate('replica', 'bookings'))
+
+    # Tests that management commands read from the primary. The 'replica' alias isn't
+    # configured here, so any read routed to it would raise
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_commands_read_primary(self):
+        Movie.objects.create(title='Primary', description='', release_date=date.today(), duration=90)
+        out = StringIO()
+        call_command('warm_caches', stdout=out)
+        self.assertIn('movie_list', out.getvalue())
+
+    # Tests that a write pins the client to the primary for its next reads
+    def test_write_makes_client_sticky(self):
+        factory = RequestFactory()
+        alias, response = self.read_alias_during(factory.get('/api/movies/'))
+        self.assertEqual(alias, 'replica')
+
+        alias, response = self.read_alias_during(factory.post('/api/seats/1/book/'))
+        self.assertEqual(alias, 'default')
+        self.assertIn(ReplicaPinningMiddleware.cookie_name, response.cookies)
+
+        request = factory.get('/history/')
+        request.COOKIES[ReplicaPinningMiddleware.cookie_name] = '1'
+        alias, response = self.read_alias_during(request)
+        self.assertEqual(alias, 'default')
+
+
+@skipUnless(connection.vendor == 'postgresql', 'Booking partitions only exist on PostgreSQL')
+class BookingPartitionTests(TestCase):
+
+    # Sets up a booking made two months ago and one made today
+    @classmethod
+    def setUpTestData(cls):
+        user = User.objects.create_user(username='partitionuser', password='testpass123')
+        cls.movie = Movie.objects.create(title='Old Movie', description='Old', release_date=date.today(), duration=90)
+        cls.old_seat = Seat.objects.create(
+            theater_id=default_theater_id(), seat_number='P1', booking_status='booked',
+        )
+        new_seat = Seat.objects.create(theater_id=default_theater_id(), seat_number='P2', booking_status='booked')
+        cls.old = Booking.objects.create(movie=cls.movie, seat=cls.old_seat, user=user)
+        Booking.objects.filter(id=cls.old.id).update(booking_date=timezone.now() - timedelta(days=62))
+        cls.new = Booking.objects.create(movie=cls.movie, seat=new_seat, user=user)
+        cls.user = user
+
+    # Tests that monthly partitions pick up existing rows and keep (movie, seat) unique
+    def test_roll_forward_keeps_bookings_and_uniqueness(self):
+        created = ensure_partitions(ahead=1)
+        self.assertIn(partition_name(date.today().replace(day=1)), created)
+        self.assertEqual(Booking.objects.count(), 2)
+        with connection.cursor() as cursor:
+            cursor.execute(f"SELECT COUNT(*) FROM {DEFAULT_PARTITION}")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Booking.objects.create(movie=self.movie, seat=self.old_seat, user=self.user)
+
+    # Tests that archiving detaches old months into the archive and frees their seats for rebooking
+    def test_archive_old_partitions(self):
+        ensure_partitions(ahead=1)
+        archived = archive_partitions(add_months(date.today(), -1))
+        self.assertEqual(len(archived), 1)
+        self.assertEqual(list(Booking.objects.values_list('id', flat=True)), [self.new.id])
+        self.assertEqual(list(ArchivedBooking.objects.values_list('booking_id', flat=True)), [self.old.id])
+        Booking.objects.create(movie=self.movie, seat=self.old_seat, user=self.user)
+
+    # Tests that the admin paginator estimates the partitioned table from its partitions
+    def test_estimated_count_sums_partitions(self):
+        with connection.cursor() as cursor:
+            cursor.execute("ANALYZE bookings_booking")
+        paginator = EstimatedCountPaginator(Booking.objects.all(), 10)
+        paginator.estimate_threshold = 1
+        # The estimate is used, so no COUNT(*) runs
+        with self.assertNumQueries(1):
+            self.assertEqual(paginator.count, 2)
+
+    # Tests that truncating bookings (as flush does) clears the slots too
+    def test_truncate_clears_slots(self):
+        with connection.cursor() as cursor:
+            # Runs the deferred foreign key checks still pending from setUpTestData
+            cursor.execute("SET CONSTRAINTS ALL IMMEDIATE")
+            cursor.execute("TRUNCATE bookings_booking CASCADE")
+            cursor.execute("SELECT COUNT(*) FROM bookings_booking_slot")
+            self.assertEqual(cursor.fetchone()[0], 0)
+        Booking.objects.create(movie=self.movie, seat=self.old_seat, user=self.user)
+
+
+class BookingArchiveTests(APITestCase):
+
+    # Sets up one old and one recent booking for the same user
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='archiveuser', password='testpass123')
+        cls.movie = Movie.objects.create(title='Casablanca', description='Classic', release_date=date.today(), duration=102)
+        cls.old_seat = Seat.objects.create(
+            theater_id=default_theater_id(), seat_number='K1', booking_status='booked',
+        )
+        cls.old = Booking.objects.create(movie=cls.movie, seat=cls.old_seat, user=cls.user)
+        Booking.objects.filter(id=cls.old.id).update(booking_date=timezone.now() - timedelta(days=400))
+        cls.recent = Booking.objects.create(
+            movie=cls.movie, user=cls.user,
+            seat=Seat.objects.create(theater_id=default_theater_id(), seat_number='K2', booking_status='booked'),
+        )
+
+    # Tests that old bookings move to the archive in batches without being cancelled
+    def test_archive_moves_old_bookings(self):
+        events = BookingEvent.objects.count()
+        out = StringIO()
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            call_command('archive_bookings', days=365, batch_size=1, stdout=out)
+        self.assertIn('Archived 1 bookings', out.getvalue())
+        self.assertEqual(list(Booking.objects.values_list('id', flat=True)), [self.recent.id])
+        archived = ArchivedBooking.objects.get()
+        self.assertEqual((archived.booking_id, archived.movie_title, archived.seat_number), (self.old.id, 'Casablanca', 'K1'))
+        self.old_seat.refresh_from_db()
+        self.assertEqual(self.old_seat.booking_status, 'booked')
+        self.assertEqual(BookingEvent.objects.count(), events)
+        self.assertEqual(callbacks, [])
+
+    # Tests that history only merges archived rows when full history is asked for
+    def test_history_merges_archive(self):
+        archive_bookings(timezone.now() - timedelta(days=365))
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get('/api/bookings/history/')
+        self.assertEqual([b['id'] for b in response.data], [self.recent.id])
+        response = self.client.get('/api/bookings/history/', {'full': 'true'})
+        self.assertEqual([b['id'] for b in response.data], [self.recent.id, self.old.id])
+        self.assertFalse(response.data[0]['archived'])
+        self.assertTrue(response.data[1]['archived'])
+        self.assertEqual(response.data[1]['seat_number'], 'K1')
+        self.assertEqual(response.data[1]['username'], 'archiveuser')
+
+
+class StartupProfileTests(TestCase):
+
+    # Tests that the startup profile reports each phase and the slowest packages
+    def test_profile_startup_reports_phases(self):
+        out = StringIO()
+        call_command('profile_startup', top=3, stdout=out)
+        for phase in ['settings', 'apps_ready', 'url_router', 'wsgi_middleware', 'total']:
+            self.assertIn(phase, out.getvalue())
+        self.assertIn('django', out.getvalue())
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class StaticAssetTests(TestCase):
+
+    # Tests that pages load local assets and the seat script as a cached file
+    def test_seat_booking_page_uses_static_bundle(self):
+        movie = Movie.objects.create(title='Static Movie', description='Assets', release_date=date.today(), duration=95)
+        response = self.client.get(f'/book/{movie.id}/')
+        self.assertEqual(response.status_code, 200)
+        self.assertContains(response, '/static/bookings/js/seat_booking.js')
+        self.assertContains(response, '/static/bookings/vendor/bootstrap/css/bootstrap.min.css')
+        self.assertContains(response, f'data-movie-id="{movie.id}"')
+        self.assertNotContains(response, 'cdn.jsdelivr.net')
+        self.assertNotContains(response, '<script>')
+
+
+class FastJSONRendererTests(TestCase):
+
+    # Tests that orjson and the stdlib fallback produce the same JSON
+    def test_matches_stdlib_renderer(self):
+        data = {'id': 1, 'price': Decimal('9.50'), 'title': 'Amélie', 'seats': [{'seat_number': 'A1'}], 2: None}
+        expected = json.loads(JSONRenderer().render(data))
+        self.assertEqual(json.loads(FastJSONRenderer().render(data)), expected)
+        with mock.patch.object(renderers, 'orjson', None):
+            self.assertEqual(json.loads(FastJSONRenderer().render(data)), expected)
+        self.assertEqual(FastJSONRenderer().render(None), b'')
+
+
+class SeatMapTests(APITestCase):
+
+    # Sets up three seats and a logged in user. The cache outlives test rollbacks so it starts empty
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='mapuser', password='testpass123')
+        cls.movie = Movie.objects.create(
+            title='Map Movie', description='Test', release_date=date.today(), duration=90
+        )
+        theater_id = default_theater_id()
+        cls.seats = [Seat.objects.create(theater_id=theater_id, seat_number=number) for number in ['M1', 'M2', 'M3']]
+        Seat.objects.filter(id=cls.seats[2].id).update(booking_status='maintenance')
+
+    def setUp(self):
+        cache.clear()
+
+    def decode(self, response):
+        layout = self.client.get('/api/seats/layout/').data
+        self.assertEqual(response.data['layout'], layout['version'])
+        packed = base64.b64decode(response.data['bitmap'])
+        return dict(zip(layout['seats'], seatmap.unpack(packed, len(layout['ids']))))
+
+    # Tests packing round trips and that four seats fit in a byte
+    def test_pack_unpack(self):
+        statuses = ['available', 'booked', 'maintenance', 'held', 'booked']
+        packed = seatmap.pack(statuses)
+        self.assertEqual(len(packed), 2)
+        self.assertEqual(seatmap.unpack(packed, len(statuses)), statuses)
+
+    # Tests the bitmap is served from cache and refreshed when a booking changes a seat
+    def test_status_map_follows_bookings(self):
+        self.assertEqual(self.decode(self.client.get('/api/seats/status_map/')),
+                         {'M1': 'available', 'M2': 'available', 'M3': 'maintenance'})
+        # Only the theater lookup, the map itself comes from the cache
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get('/api/seats/status_map/')
+        self.assertEqual(len(app_queries(queries)), 1)
+
+        self.client.force_authenticate(user=self.user)
+        self.client.post(f'/api/seats/{self.seats[0].id}/book/', {'movie_id': self.movie.id})
+        self.assertEqual(self.decode(self.client.get('/api/seats/status_map/'))['M1'], 'booked')
+
+        with self.captureOnCommitCallbacks(execute=True):
+            Booking.objects.filter(seat=self.seats[0]).cancel()
+        self.assertEqual(self.decode(self.client.get('/api/seats/status_map/'))['M1'], 'available')
+
+    # Tests the raw bytes carry the layout version in a header and a new seat changes the layout
+    def test_binary_status_map_and_layout_version(self):
+        version = self.client.get('/api/seats/layout/').data['version']
+        response = self.client.get('/api/seats/status_map/', {'encoding': 'binary'})
+        self.assertEqual(response['Content-Type'], 'application/octet-stream')
+        self.assertEqual(response['X-Layout-Version'], version)
+        self.assertEqual(seatmap.unpack(response.content, 3), ['available', 'available', 'maintenance'])
+
+        Seat.objects.create(theater_id=default_theater_id(), seat_number='M4')
+        layout = self.client.get('/api/seats/layout/').data
+        self.assertNotEqual(layout['version'], version)
+        self.assertEqual(layout['seats'], ['M1', 'M2', 'M3', 'M4'])
+
+
+class ShowtimeSchedulingTests(TestCase):
+
+    # Sets up two auditoriums and two released movies
+    @classmethod
+    def setUpTestData(cls):
+        cls.big = Auditorium.objects.create(theater_id=default_theater_id(), name='Big', cleaning_minutes=20)
+        cls.small = Auditorium.objects.create(theater_id=default_theater_id(), name='Small', cleaning_minutes=10)
+        cls.long = Movie.objects.create(title='Long', description='', release_date=date(2024, 1, 1), duration=160)
+        cls.short = Movie.objects.create(title='Short', description='', release_date=date(2024, 1, 1), duration=85)
+        cls.day = date(2025, 3, 3)
+
+    def at(self, hour, minute=0):
+        return datetime.combine(self.day, time(hour, minute))
+
+    # Tests the index against touching, overlapping and nested intervals
+    def test_interval_index(self):
+        index = IntervalIndex([(10, 20), (30, 40)])
+        self.assertFalse(index.overlaps(20, 30))
+        self.assertTrue(index.overlaps(15, 25))
+        self.assertTrue(index.overlaps(5, 50))
+        self.assertTrue(index.overlaps(32, 35))
+        self.assertTrue(index.add(0, 10))
+        self.assertFalse(index.add(39, 45))
+        self.assertEqual(index.starts, [0, 10, 30])
+        self.assertEqual(index.next_free(12, 5), 20)
+        self.assertEqual(index.next_free(12, 15), 40)
+
+    # Tests the end time includes the cleaning buffer and clean() rejects an overlap
+    def test_end_time_and_clean(self):
+        first = Showtime.objects.create(movie=self.short, auditorium=self.big, starts_at=self.at(18))
+        self.assertEqual(first.ends_at, self.at(19, 45))
+        clash = Showtime(movie=self.long, auditorium=self.big, starts_at=self.at(19, 30))
+        with self.assertRaises(ValidationError):
+            clash.clean()
+        Showtime(movie=self.long, auditorium=self.small, starts_at=self.at(19, 30)).clean()
+        Showtime(movie=self.long, auditorium=self.big, starts_at=self.at(19, 45)).clean()
+
+    # Tests proposals that clash with the schedule or each other are rejected in one pass
+    def test_schedule_showtimes(self):
+        Showtime.objects.create(movie=self.short, auditorium=self.big, starts_at=self.at(12))
+        created, rejected = schedule_showtimes([
+            Showtime(movie=self.long, auditorium=self.big, starts_at=self.at(13)),
+            Showtime(movie=self.long, auditorium=self.big, starts_at=self.at(14)),
+            Showtime(movie=self.long, auditorium=self.big, starts_at=self.at(16, 30)),
+            Showtime(movie=self.long, auditorium=self.small, starts_at=self.at(17)),
+        ])
+        self.assertEqual([(s.auditorium, s.starts_at) for s in created],
+                         [(self.big, self.at(14)), (self.small, self.at(17))])
+        self.assertEqual(len(rejected), 2)
+        self.assertEqual(Showtime.objects.count(), 3)
+
+    # Tests the generated week fills opening hours around existing showtimes without overlaps
+    def test_generate_schedule_command(self):
+        Showtime.objects.create(movie=self.long, auditorium=self.small, starts_at=self.at(12))
+        out = StringIO()
+        call_command('generate_schedule', '--start', self.day.isoformat(), '--days', '2', stdout=out)
+        self.assertIn('0 conflicted', out.getvalue())
+
+        for auditorium in (self.big, self.small):
+            showtimes = list(Showtime.objects.filter(auditorium=auditorium).order_by('starts_at'))
+            self.assertEqual({s.starts_at.date() for s in showtimes}, {self.day, self.day + timedelta(days=1)})
+            for before, after in zip(showtimes, showtimes[1:]):
+                self.assertLessEqual(before.ends_at, after.starts_at)
+            for showtime in showtimes:
+                self.assertEqual(showtime.starts_at.minute % 5, 0)
+                self.assertGreaterEqual(showtime.starts_at.time(), time(10))
+                self.assertLess(showtime.starts_at.time(), time(23))
+        self.assertEqual(Showtime.objects.filter(auditorium=self.small, starts_at=self.at(12)).count(), 1)
+
+        # Running it again finds no free slots
+        scheduled = Showtime.objects.count()
+        call_command('generate_schedule', '--start', self.day.isoformat(), '--days', '2', stdout=StringIO())
+        self.assertEqual(Showtime.objects.count(), scheduled)
+
+    # Tests upcoming showtimes are listed per movie
+    def test_showtimes_endpoint(self):
+        later = timezone.now() + timedelta(days=1)
+        Showtime.objects.create(movie=self.short, auditorium=self.big, starts_at=later)
+        Showtime.objects.create(movie=self.short, auditorium=self.big, starts_at=timezone.now() - timedelta(days=1))
+        response = self.client.get(f'/api/movies/{self.short.id}/showtimes/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['count'], 1)
+        self.assertEqual(response.data['results'][0]['auditorium_name'], 'Big')
+
+
+class PricingTests(APITestCase):
+
+    # Sets up a premium and a standard seat, a matinee and an evening showtime
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='priceuser', password='testpass123')
+        cls.movie = Movie.objects.create(title='Priced', description='', release_date=date(2024, 1, 1), duration=100)
+        cls.auditorium = Auditorium.objects.create(theater_id=default_theater_id(), name='Main')
+        cls.premium = Seat.objects.create(theater_id=default_theater_id(), seat_number='P1', seat_class='premium')
+        cls.standard = Seat.objects.create(theater_id=default_theater_id(), seat_number='P2')
+        tomorrow = date.today() + timedelta(days=1)
+        cls.matinee = Showtime.objects.create(
+            movie=cls.movie, auditorium=cls.auditorium, starts_at=datetime.combine(tomorrow, time(13))
+        )
+        cls.evening = Showtime.objects.create(
+            movie=cls.movie, auditorium=cls.auditorium, starts_at=datetime.combine(tomorrow, time(20))
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+
+    # Tests tables are built on creation, including bulk scheduled showtimes
+    def test_price_tables(self):
+        self.assertEqual(self.evening.price_table, {'standard': '12.00', 'premium': '15.00', 'vip': '20.00'})
+        self.assertEqual(self.matinee.price_table['premium'], '11.25')
+        created, _ = schedule_showtimes([Showtime(
+            movie=self.movie, auditorium=self.auditorium,
+            starts_at=datetime.combine(date.today() + timedelta(days=2), time(21)),
+        )])
+        self.assertEqual(Showtime.objects.get(id=created[0].id).price_table['vip'], '20.00')
+
+    # Tests booking takes the cached price without reading the showtime and keeps the counter
+    def test_book_uses_cached_price_and_counts(self):
+        price_table(self.matinee.id)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(f'/api/seats/{self.premium.id}/book/', {
+                'movie_id': self.movie.id, 'showtime_id': self.matinee.id,
+            })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['price'], '11.25')
+        self.assertFalse([q for q in queries if 'price_table' in q['sql'] and 'SELECT' in q['sql']])
+        self.matinee.refresh_from_db()
+        self.assertEqual(self.matinee.booked_count, 1)
+
+        Booking.objects.get(seat=self.premium).cancel()
+        self.matinee.refresh_from_db()
+        self.assertEqual(self.matinee.booked_count, 0)
+
+    # Tests a showtime from another movie is rejected and no showtime means the evening price
+    def test_book_showtime_validation(self):
+        other = Movie.objects.create(title='Other', description='', release_date=date(2024, 1, 1), duration=90)
+        response = self.client.post(f'/api/seats/{self.standard.id}/book/', {
+            'movie_id': other.id, 'showtime_id': self.matinee.id,
+        })
+        self.assertEqual(response.status_code, 400)
+        response = self.client.post(f'/api/seats/{self.standard.id}/book/', {'movie_id': self.movie.id})
+        self.assertEqual(response.data['price'], '12.00')
+
+    # Tests the seat map carries seat classes and the showtime's prices
+    def test_status_map_prices(self):
+        self.assertEqual(self.client.get('/api/seats/layout/').data['classes'], ['premium', 'standard'])
+        response = self.client.get('/api/seats/status_map/', {'showtime': self.evening.id})
+        self.assertEqual(response.data['prices']['standard'], '12.00')
+        self.assertEqual(self.client.get('/api/seats/status_map/', {'showtime': 0}).status_code, 404)
+
+    # Tests repricing follows occupancy only in dynamic mode and updates the cache
+    def test_reprice_showtimes(self):
+        Showtime.objects.filter(id=self.evening.id).update(booked_count=2)
+        self.assertEqual(reprice_showtimes(), 0)
+        with mock.patch.object(pricing, 'DYNAMIC_PRICING', True):
+            # Only the evening showtime has bookings
+            self.assertEqual(reprice_showtimes(), 1)
+            self.assertEqual(reprice_showtimes(), 0)
+        self.assertEqual(price_table(self.evening.id)['standard'], '15.60')
+        self.assertEqual(price_table(self.matinee.id)['standard'], '9.00')
+
+
+class SparseFieldsTests(APITestCase):
+
+    # Sets up a user with bookings for three seats
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='sparse', password='testpass123')
+        cls.movie = Movie.objects.create(
+            title='Sparse', description='A very long description', release_date=date(2024, 1, 1), duration=90
+        )
+        for number in ['S1', 'S2', 'S3']:
+            seat = Seat.objects.create(theater_id=default_theater_id(), seat_number=number)
+            Booking.objects.create(movie=cls.movie, seat=seat, user=cls.user)
+
+    def setUp(self):
+        self.client.force_authenticate(user=self.user)
+
+    def booking_queries(self, queries):
+        return [q['sql'] for q in queries if 'FROM "bookings_booking"' in q['sql'] and 'COUNT' not in q['sql']]
+
+    # Tests ?fields= trims both the output and the SELECT
+    def test_movie_fields(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/movies/', {'fields': 'id,title'})
+        self.assertEqual(response.data['results'], [{'id': self.movie.id, 'title': 'Sparse'}])
+        movie_sql = [q['sql'] for q in queries if 'FROM "bookings_movie"' in q['sql'] and 'COUNT' not in q['sql']]
+        self.assertNotIn('description', movie_sql[0])
+
+    # Tests the full booking list joins its related rows instead of a query per booking
+    def test_booking_list_joins_related(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/')
+        self.assertEqual(len(response.data['results']), 3)
+        self.assertEqual(response.data['results'][0]['movie_title'], 'Sparse')
+        self.assertEqual(len(self.booking_queries(queries)), 1)
+        self.assertNotIn('FROM "bookings_movie"', ' '.join(q['sql'] for q in queries))
+
+    # Tests ?fields= drops the joins it no longer needs and ?expand= nests the movie
+    def test_booking_fields_and_expand(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/', {'fields': 'id,seat_number'})
+        self.assertEqual(set(response.data['results'][0]), {'id', 'seat_number'})
+        sql = self.booking_queries(queries)[0]
+        self.assertIn('bookings_seat', sql)
+        self.assertNotIn('bookings_movie', sql)
+        self.assertNotIn('auth_user', sql)
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/', {'fields': 'id,movie', 'expand': 'movie'})
+        self.assertEqual(response.data['results'][0]['movie']['description'], 'A very long description')
+        self.assertEqual(len(self.booking_queries(queries)), 1)
+
+    # Tests writes refuse ?fields= instead of dropping the fields it leaves out
+    def test_fields_rejected_on_writes(self):
+        seat = Seat.objects.get(seat_number='S1')
+        response = self.client.patch(f'/api/seats/{seat.id}/?fields=id', {'booking_status': 'maintenance'})
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('fields', response.data)
+        seat.refresh_from_db()
+        self.assertEqual(seat.booking_status, 'available')
+
+    # Tests unknown names are rejected
+    def test_unknown_fields(self):
+        self.assertEqual(self.client.get('/api/movies/', {'fields': 'id,nope'}).status_code, 400)
+        self.assertEqual(self.client.get('/api/bookings/', {'expand': 'user'}).status_code, 400)
+
+    # Tests full history keeps its order and trims archived rows the same way
+    def test_full_history_with_fields(self):
+        archive_bookings(timezone.now() + timedelta(days=1), batch_size=2)
+        Booking.objects.create(movie=self.movie, seat=Seat.objects.get(seat_number='S1'), user=self.user)
+        response = self.client.get('/api/bookings/history/', {'full': 'true', 'fields': 'id,seat_number'})
+        self.assertEqual(len(response.data), 4)
+        self.assertEqual(set(response.data[0]), {'id', 'seat_number', 'archived'})
+        self.assertEqual(set(response.data[1]), {'id', 'seat_number', 'archived'})
+        self.assertEqual([b['archived'] for b in response.data], [False, True, True, True])
+
+
+class BatchRetrieveTests(APITestCase):
+
+    # Sets up four movies and two seats
+    @classmethod
+    def setUpTestData(cls):
+        cls.movies = [
+            Movie.objects.create(title=f'Batch {i}', description='', release_date=date(2024, 1, i + 1), duration=90)
+            for i in range(4)
+        ]
+        theater_id = default_theater_id()
+        cls.seats = [Seat.objects.create(theater_id=theater_id, seat_number=number) for number in ['B1', 'B2']]
+
+    # Tests one IN query returns the movies in the order asked for, once each
+    def test_movies_by_ids(self):
+        ids = [self.movies[2].id, self.movies[0].id, self.movies[2].id, 9999]
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/movies/', {'ids': ','.join(map(str, ids))})
+        self.assertEqual([movie['title'] for movie in response.data['results']], ['Batch 2', 'Batch 0'])
+        self.assertEqual(response.data['missing'], [9999])
+        self.assertEqual(len([q for q in queries if 'bookings_movie' in q['sql']]), 1)
+
+    # Tests batches combine with ?fields= and work for seats
+    def test_seats_by_ids_with_fields(self):
+        response = self.client.get('/api/seats/', {'ids': f'{self.seats[1].id},{self.seats[0].id}', 'fields': 'seat_number'})
+        self.assertEqual(response.data['results'], [{'seat_number': 'B2'}, {'seat_number': 'B1'}])
+
+    # Tests bad, empty and oversized id lists are rejected
+    def test_invalid_ids(self):
+        for value in ['1,abc', '1,²', '١', '', '0', '-1', ','.join(str(i) for i in range(1, MAX_BATCH_IDS + 2))]:
+            response = self.client.get('/api/movies/', {'ids': value})
+            self.assertEqual(response.status_code, 400, value)
+            self.assertIn('ids', response.data)
+
+
+class BookingEventTests(APITestCase):
+
+    # Sets up a user, a movie with a showtime and three seats
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='eventuser', password='testpass123')
+        cls.movie = Movie.objects.create(title='Logged', description='', release_date=date(2024, 1, 1), duration=90)
+        cls.showtime = Showtime.objects.create(
+            movie=cls.movie, auditorium=Auditorium.objects.create(theater_id=default_theater_id(), name='Log'),
+            starts_at=datetime.combine(date.today() + timedelta(days=1), time(20)),
+        )
+        theater_id = default_theater_id()
+        cls.seats = [Seat.objects.create(theater_id=theater_id, seat_number=number) for number in ['L1', 'L2', 'L3']]
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_authenticate(user=self.user)
+
+    def book(self, seat):
+        return self.client.post(f'/api/seats/{seat.id}/book/', {
+            'movie_id': self.movie.id, 'showtime_id': self.showtime.id,
+        })
+
+    # Tests book, cancel and maintenance are logged with the change
+    def test_changes_are_logged(self):
+        booking_id = self.book(self.seats[0]).data['id']
+        Booking.objects.get(id=booking_id).cancel()
+        Seat.objects.filter(id=self.seats[1].id).set_status('maintenance')
+        self.assertEqual(
+            list(BookingEvent.objects.values_list('kind', 'seat_id', 'booking_id')),
+            [('book', self.seats[0].id, booking_id), ('cancel', self.seats[0].id, booking_id),
+             ('maintenance', self.seats[1].id, None)],
+        )
+
+    # Tests the log can't be rewritten
+    def test_append_only(self):
+        event = BookingEvent.record('book', [self.seats[0].id])[0]
+        with self.assertRaises(TypeError):
+            event.save()
+        with self.assertRaises(TypeError):
+            event.delete()
+        with self.assertRaises(TypeError):
+            BookingEvent.objects.all().update(kind='cancel')
+        with self.assertRaises(TypeError):
+            BookingEvent.objects.all().delete()
+
+    # Tests a replay repairs seats and counters that drifted from the log
+    def test_replay_rebuilds_state(self):
+        self.book(self.seats[0])
+        self.book(self.seats[1])
+        Booking.objects.get(seat=self.seats[1]).cancel()
+        Seat.objects.filter(id=self.seats[2].id).set_status('maintenance')
+
+        Seat.objects.update(booking_status='available')
+        Showtime.objects.update(booked_count=7)
+        out = StringIO()
+        call_command('replay_events', '--batch-size', '2', stdout=out)
+        self.assertIn('fixed 2 seats and 1 showtime counters', out.getvalue())
+        self.assertEqual(dict(Seat.objects.values_list('seat_number', 'booking_status')),
+                         {'L1': 'booked', 'L2': 'available', 'L3': 'maintenance'})
+        self.assertEqual(Showtime.objects.get().booked_count, 1)
+
+    # Tests a cancel doesn't free a seat that was put under maintenance after the booking
+    def test_replay_respects_guards(self):
+        self.book(self.seats[0])
+        BookingEvent.record('maintenance', [self.seats[0].id])
+        BookingEvent.record('cancel', [self.seats[0].id], showtime_id=self.showtime.id)
+        statuses, booked = replay()
+        self.assertEqual(statuses[self.seats[0].id], 'maintenance')
+        self.assertEqual(booked[self.showtime.id], 0)
+
+    # Tests status changes made by saving seats (API, create, get_or_create) survive a replay
+    def test_saved_status_changes_are_logged(self):
+        response = self.client.patch(f'/api/seats/{self.seats[0].id}/', {'booking_status': 'maintenance'}, format='json')
+        self.assertEqual(response.status_code, 200)
+        created = Seat.objects.create(
+            theater_id=default_theater_id(), seat_number='L4', booking_status='maintenance',
+        )
+        Seat.objects.create(theater_id=default_theater_id(), seat_number='L5')
+        self.client.patch(f'/api/seats/{self.seats[1].id}/', {'seat_class': 'vip'}, format='json')
+        self.assertEqual(
+            list(BookingEvent.objects.values_list('kind', 'seat_id')),
+            [('maintenance', self.seats[0].id), ('maintenance', created.id)],
+        )
+        call_command('replay_events', stdout=StringIO())
+        self.assertEqual(Seat.objects.get(id=self.seats[0].id).booking_status, 'maintenance')
+        self.assertEqual(Seat.objects.get(id=created.id).booking_status, 'maintenance')
+
+    # Tests bookings deleted by a cascade free their seat and are logged, so a replay agrees
+    def test_cascade_delete_is_logged(self):
+        other = Movie.objects.create(title='Gone', description='', release_date=date(2024, 1, 1), duration=90)
+        self.client.post(f'/api/seats/{self.seats[0].id}/book/', {'movie_id': other.id})
+        booking_id = self.book(self.seats[1]).data['id']
+        Booking.objects.get(id=booking_id).cancel()
+        other.delete()
+        self.assertEqual(Seat.objects.get(id=self.seats[0].id).booking_status, 'available')
+        self.assertEqual(
+            list(BookingEvent.objects.values_list('kind', 'seat_id')),
+            [('book', self.seats[0].id), ('book', self.seats[1].id), ('cancel', self.seats[1].id),
+             ('cancel', self.seats[0].id)],
+        )
+        statuses, _ = replay()
+        self.assertEqual(statuses[self.seats[0].id], 'available')
+
+    # Tests imported rows that already exist are skipped without logging events for them
+    def test_import_logs_only_inserted_rows(self):
+        self.book(self.seats[0])
+        handle = tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, encoding='utf-8')
+        handle.write(f'username,movie_id,seat_number\neventuser,{self.movie.id},L1\neventuser,{self.movie.id},L2\n'
+                     f'eventuser,{self.movie.id},L2\n')
+        handle.close()
+        self.addCleanup(os.remove, handle.name)
+        out = StringIO()
+        call_command('import_catalog', handle.name, kind='bookings', stdout=out, stderr=StringIO())
+        self.assertIn('Imported 1 bookings', out.getvalue())
+        self.assertIn('2 already existed', out.getvalue())
+        self.assertEqual(BookingEvent.objects.filter(kind='book').count(), 2)
+        statuses, _ = replay()
+        self.assertEqual(statuses, {self.seats[0].id: 'booked', self.seats[1].id: 'booked'})
+
+    # Tests --until shows the seat map as it was without changing anything
+    def test_point_in_time_replay(self):
+        self.book(self.seats[0])
+        booked_at = BookingEvent.objects.get(kind='book').created_at
+        Booking.objects.get(seat=self.seats[0]).cancel()
+        out = StringIO()
+        call_command('replay_events', '--until', booked_at.isoformat(), stdout=out)
+        self.assertIn('booked: 1', out.getvalue())
+        self.assertEqual(Seat.objects.get(id=self.seats[0].id).booking_status, 'available')
+
+
+class TheaterTenancyTests(APITestCase):
+
+    # Sets up two theaters that both have a seat A1
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user(username='tenant', password='testpass123')
+        cls.movie = Movie.objects.create(title='Everywhere', description='', release_date=date(2024, 1, 1), duration=90)
+        cls.north = Theater.objects.create(name='North')
+        cls.south = Theater.objects.create(name='South')
+        cls.north_seat = Seat.objects.create(theater=cls.north, seat_number='A1')
+        cls.south_seat = Seat.objects.create(theater=cls.south, seat_number='A1')
+        Seat.objects.create(theater=cls.south, seat_number='A2', booking_status='maintenance')
+
+    def setUp(self):
+        cache.clear()
+
+    # Tests seat numbers only have to be unique within a theater
+    def test_seat_numbers_unique_per_theater(self):
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            Seat.objects.create(theater=self.north, seat_number='A1')
+
+    # Tests the scoped manager only returns the active theater's rows
+    def test_use_theater_scopes_queries(self):
+        with use_theater(self.south.id):
+            self.assertEqual(Seat.objects.count(), 2)
+            self.assertFalse(Seat.objects.filter(id=self.north_seat.id).exists())
+        self.assertEqual(Seat.objects.count(), 3)
+        self.assertEqual(Seat.objects.for_theater(self.north).get(), self.north_seat)
+
+    # Tests nested routes list, book and map only their theater's seats
+    def test_theater_routes(self):
+        response = self.client.get(f'/api/theaters/{self.north.id}/seats/')
+        self.assertEqual([seat['id'] for seat in response.data['results']], [self.north_seat.id])
+        response = self.client.get(f'/api/theaters/{self.south.id}/seats/available/')
+        self.assertEqual([seat['id'] for seat in response.data], [self.south_seat.id])
+        self.assertEqual(self.client.get(f'/api/theaters/{self.north.id}/seats/{self.south_seat.id}/').status_code, 404)
+        self.assertEqual(self.client.get('/api/theaters/9999/seats/').status_code, 404)
+
+        layout = self.client.get(f'/api/theaters/{self.south.id}/seats/layout/').data
+        self.assertEqual(layout['ids'], [self.south_seat.id, self.south_seat.id + 1])
+
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f'/api/theaters/{self.south.id}/seats/{self.south_seat.id}/book/', {'movie_id': self.movie.id})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(Booking.objects.get().theater, self.south)
+        self.assertEqual(len(self.client.get(f'/api/theaters/{self.north.id}/bookings/').data['results']), 0)
+        self.assertEqual(len(self.client.get(f'/api/theaters/{self.south.id}/bookings/').data['results']), 1)
+
+    # Tests seats created on a nested route belong to that theater
+    def test_create_on_theater_route(self):
+        response = self.client.post(f'/api/theaters/{self.south.id}/seats/', {'seat_number': 'B1'})
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['theater'], self.south.id)
+
+    # Tests unsaved seats and auditoriums don't look up a default theater
+    def test_new_instances_skip_the_database(self):
+        with self.assertNumQueries(0):
+            Seat(seat_number='Z1')
+            Auditorium(name='Z')
+        response = self.client.post('/api/seats/', {'seat_number': 'Z1'})
+        self.assertEqual(response.data['theater'], default_theater_id())
+
+    # Tests movie routes and the booking page only offer the requested theater's seats
+    @override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+    def test_movie_routes_use_requested_theater(self):
+        url = f'/api/movies/{self.movie.id}/available_seats/'
+        self.assertEqual([seat['id'] for seat in self.client.get(url, {'theater': self.south.id}).data], [self.south_seat.id])
+        self.assertEqual(self.client.get(url, {'theater': 9999}).status_code, 404)
+        self.assertEqual(self.client.get(url, {'theater': '²'}).status_code, 404)
+        response = self.client.get(f'/book/{self.movie.id}/', {'theater': self.north.id})
+        self.assertEqual(list(response.context['seats']), [self.north_seat])
+
+        # The north seat is still free, but the south theater is sold out
+        self.client.force_authenticate(user=self.user)
+        Seat.objects.filter(id=self.south_seat.id).update(booking_status='booked')
+        response = self.client.post(f'/api/movies/{self.movie.id}/waitlist/?theater={self.south.id}')
+        self.assertEqual(response.status_code, 201)
+
+    # Tests waitlisted users are only offered seats in the theater they wait at
+    def test_waitlist_offers_seats_in_its_theater(self):
+        Seat.objects.filter(id=self.north_seat.id).update(booking_status='booked')
+        self.client.force_authenticate(user=self.user)
+        response = self.client.post(f'/api/movies/{self.movie.id}/waitlist/?theater={self.north.id}')
+        self.assertEqual(response.data['theater'], self.north.id)
+        self.assertEqual(process_waitlist(), (0, 0))
+        Seat.objects.filter(id=self.north_seat.id).update(booking_status='available')
+        self.assertEqual(process_waitlist(), (0, 1))
+        self.assertEqual(WaitlistEntry.objects.get().seat, self.north_seat)
+
+    # Tests full history on a theater's route only merges that theater's archive
+    def test_full_history_per_theater(self):
+        other = Movie.objects.create(title='Elsewhere', description='', release_date=date(2024, 1, 1), duration=90)
+        north = Booking.objects.create(movie=self.movie, seat=self.north_seat, user=self.user)
+        south = Booking.objects.create(movie=other, seat=self.south_seat, user=self.user)
+        archive_bookings(timezone.now() + timedelta(days=1))
+        self.client.force_authenticate(user=self.user)
+        response = self.client.get(f'/api/theaters/{self.north.id}/bookings/history/', {'full': 'true'})
+        self.assertEqual([b['id'] for b in response.data], [north.id])
+        response = self.client.get('/api/bookings/history/', {'full': 'true'})
+        self.assertEqual({b['id'] for b in response.data}, {north.id, south.id})
+
+    # Tests showtimes take the auditorium's theater and are listed per theater
+    def test_theater_showtimes(self):
+        auditorium = Auditorium.objects.create(theater=self.north, name='One')
+        Showtime.objects.create(movie=self.movie, auditorium=auditorium, starts_at=timezone.now() + timedelta(days=1))
+        response = self.client.get(f'/api/theaters/{self.north.id}/showtimes/')
+        self.assertEqual(response.data['results'][0]['theater'], self.north.id)
+        self.assertEqual(self.client.get(f'/api/theaters/{self.south.id}/showtimes/').data['count'], 0)
+
+    # Tests per-theater seat lookups search an index leading with the theater instead of scanning
+    def test_seat_queries_use_theater_index(self):
+        if connection.vendor != 'sqlite':
+            self.skipTest('Plan text checked on SQLite')
+        plan = Seat.objects.filter(theater=self.south, booking_status='available').explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertIn('(theater_id=?', plan)
+
+
+class HealthCheckTests(TestCase):
+
+    # Tests /healthz answers without touching the database or the session middleware
+    def test_healthz_skips_database(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/healthz')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {'status': 'ok'})
+        self.assertEqual(len(queries), 0)
+        self.assertNotIn('Set-Cookie', response.headers)
+        self.assertEqual(settings.MIDDLEWARE[0], 'bookings.middleware.HealthCheckMiddleware')
+
+    # Tests /readyz runs one SELECT 1 and reports the database and cache latency
+    def test_readyz_reports_latency(self):
+        Movie.objects.create(title='Unread', description='Probe', release_date=date.today(), duration=90)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 200)
+        data = response.json()
+        self.assertEqual(data['status'], 'ok')
+        self.assertGreaterEqual(data['database']['latency_ms'], 0)
+        self.assertGreaterEqual(data['cache']['latency_ms'], 0)
+        selects = [sql for sql in app_queries(queries) if sql.startswith('SELECT')]
+        self.assertEqual(selects, ['SELECT 1'])
+
+    # Tests /readyz answers 503 when a dependency fails
+    def test_readyz_unavailable(self):
+        with mock.patch.dict(HealthCheckMiddleware.checks, cache=mock.Mock(side_effect=ConnectionError('down'))):
+            response = self.client.get('/readyz')
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.json()['status'], 'unavailable')
+        self.assertEqual(response.json()['cache'], {'ok': False, 'error': 'down'})
+        self.assertTrue(response.json()['database']['ok'])
+
+
+@override_settings(STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage')
+class CacheWarmupTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.movie = Movie.objects.create(title='Warm Movie', description='Cached', release_date=date.today(), duration=100)
+        cls.theater = Theater.objects.create(name='Warm Theater')
+        Seat.objects.create(theater=cls.theater, seat_number='A1')
+        auditorium = Auditorium.objects.create(theater=cls.theater, name='One')
+        cls.soon = Showtime.objects.create(movie=cls.movie, auditorium=auditorium, starts_at=timezone.now() + timedelta(hours=2))
+        cls.later = Showtime.objects.create(movie=cls.movie, auditorium=auditorium, starts_at=timezone.now() + timedelta(days=3))
+
+    def setUp(self):
+        cache.clear()
+
+    # Tests the command fills seat maps and price tables for upcoming showtimes only
+    def test_warm_caches_command(self):
+        out = StringIO()
+        call_command('warm_caches', stdout=out)
+        for step in ['templates', 'movie_list', 'seat_maps', 'price_tables']:
+            self.assertIn(step, out.getvalue())
+        self.assertIsNotNone(cache.get(seatmap.status_key(self.theater.id)))
+        self.assertIsNotNone(cache.get(seatmap.layout_key(self.theater.id)))
+        self.assertEqual(cache.get(pricing.cache_key(self.soon.id)), self.soon.price_table)
+        self.assertIsNone(cache.get(pricing.cache_key(self.later.id)))
+
+    # Tests a warmed home page skips the movie query and is redrawn when a movie changes
+    def test_movie_list_served_from_warm_cache(self):
+        warm_caches()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/')
+        self.assertContains(response, 'Warm Movie')
+        self.assertFalse([query for query in queries if 'bookings_movie' in query['sql']])
+
+        Movie.objects.create(title='New Release', description='Fresh', release_date=date.today(), duration=90)
+        self.assertContains(self.client.get('/'), 'New Release')
+        self.movie.delete()
+        self.assertNotContains(self.client.get('/'), 'Warm Movie')
+
+
+class LargeDatasetTests(APITestCase):
+
+    # Builds 2000 bookings across 20 movies, 100 seats and 40 users once for the class
+    @classmethod
+    def setUpTestData(cls):
+        cls.data = make_dataset(movies=20, seats=100, bookings=2000, users=40)
+
+    # Tests the factories save unique (movie, seat) pairs in the seats' theater with usable passwords
+    def test_factories(self):
+        self.assertEqual(self.data['bookings'], 2000)
+        self.assertEqual(Booking.objects.count(), 2000)
+        self.assertEqual(Booking.objects.values('movie', 'seat').distinct().count(), 2000)
+        self.assertFalse(Booking.objects.exclude(theater=self.data['theater']).exists())
+        self.assertEqual(Seat.objects.filter(seat_class='vip').count(), 33)
+        self.assertTrue(self.client.login(username='user0', password='testpass123'))
+        with self.assertRaises(ValueError):
+            make_bookings(2001, self.data['movies'], self.data['seats'], self.data['users'])
+
+    # Tests a user's history lists only their bookings and joins instead of a query per row
+    def test_history_at_scale(self):
+        self.client.force_authenticate(user=self.data['users'][3])
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/bookings/history/')
+        self.assertEqual(len(response.data), 50)
+        self.assertEqual({booking['user'] for booking in response.data}, {self.data['users'][3].id})
+        self.assertLessEqual(len(queries), 3)
+
+    # Tests the seat list pages through every seat
+    def test_seat_list_pages(self):
+        response = self.client.get('/api/seats/', {'page': 5})
+        self.assertEqual(response.data['count'], 100)
+        self.assertEqual(len(response.data['results']), 20)
+        self.assertIsNone(response.data['next'])
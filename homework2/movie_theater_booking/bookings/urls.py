@@ -1,5 +1,5 @@
 from django.urls import path, include
-from rest_framework.routers import DefaultRouter
+from rest_framework.routers import DefaultRouter, SimpleRouter
 from . import views
 
 # Create DRF router
@@ -7,10 +7,18 @@ router = DefaultRouter()
 router.register(r'movies', views.MovieViewSet)
 router.register(r'seats', views.SeatViewSet)
 router.register(r'bookings', views.BookingViewSet, basename='booking')
+router.register(r'theaters', views.TheaterViewSet)
+
+# Per-location routes, /api/theaters/<id>/seats/, ... Only rows of that theater are visible
+theater_router = SimpleRouter()
+theater_router.register(r'seats', views.SeatViewSet, basename='theater-seat')
+theater_router.register(r'showtimes', views.ShowtimeViewSet, basename='theater-showtime')
+theater_router.register(r'bookings', views.BookingViewSet, basename='theater-booking')
 
 urlpatterns = [
     # API URLs will be /api/movies/, /api/seats/, ...
     path('api/', include(router.urls)),
+    path('api/theaters/<int:theater_id>/', include(theater_router.urls)),
     
     # Web URLs  
     path('', views.movie_list, name='movie_list'),
@@ -1,13 +1,79 @@
+import heapq
+
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
-from rest_framework.permissions import IsAuthenticated, AllowAny
+from rest_framework.permissions import IsAuthenticated, AllowAny, IsAdminUser
+from django.db.models import F
+from django.http import Http404, HttpResponse
 from django.shortcuts import render, get_object_or_404
-from .models import Movie, Seat, Booking
-from .serializers import MovieSerializer, SeatSerializer, BookingSerializer, SeatBookingSerializer
+from django.utils import timezone
+from . import seatmap
+from .batch import BatchRetrieveMixin
+from .fieldsets import SparseQuerysetMixin
+from .models import Movie, Seat, Booking, WaitlistEntry, ArchivedBooking, Showtime, Theater, default_theater_id
+from .serializers import (
+    MovieSerializer, SeatSerializer, BookingSerializer, SeatBookingSerializer, WaitlistEntrySerializer,
+    ArchivedBookingSerializer, ShowtimeSerializer, TheaterSerializer,
+)
+from .pricing import price_table
+from .search import search_movies
+from .tenancy import use_theater
+from .waitlist import leave_waitlist
+from .warmup import MOVIE_LIST_TIMEOUT
+
+
+# For viewsets also routed under /api/theaters/<theater_id>/. The whole request runs
+# inside use_theater() so every theater-owned query only sees that location, and
+# unknown theaters are a 404. Without theater_id in the URL nothing is scoped
+class TheaterScopedViewMixin:
+    def dispatch(self, request, *args, **kwargs):
+        if kwargs.get('theater_id') is None:
+            return super().dispatch(request, *args, **kwargs)
+        with use_theater(kwargs['theater_id']):
+            return super().dispatch(request, *args, **kwargs)
+
+    def initial(self, request, *args, **kwargs):
+        super().initial(request, *args, **kwargs)
+        if kwargs.get('theater_id') is not None:
+            get_object_or_404(Theater, pk=kwargs['theater_id'])
+
+    # Class-level querysets are built at import time, outside any scope
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.kwargs.get('theater_id') is not None:
+            queryset = queryset.filter(theater_id=self.kwargs['theater_id'])
+        return queryset
+
+    # Rows created on a nested route belong to that theater
+    def perform_create(self, serializer):
+        if self.kwargs.get('theater_id') is None:
+            return super().perform_create(serializer)
+        serializer.save(theater_id=self.kwargs['theater_id'])
+
+    # Theater of the URL, or the default one on the unscoped routes
+    def theater_id(self):
+        return self.kwargs.get('theater_id') or default_theater_id()
+
+
+# Movies are shared by every theater, so movie routes pick the theater with ?theater=
+# and fall back to the default one like the unscoped seat routes
+def requested_theater_id(request):
+    theater_id = request.GET.get('theater')
+    if theater_id is None:
+        return default_theater_id()
+    if not (theater_id.isascii() and theater_id.isdecimal()):
+        raise Http404("Unknown theater")
+    return get_object_or_404(Theater, pk=theater_id).pk
+
 
+class TheaterViewSet(viewsets.ReadOnlyModelViewSet):
+    queryset = Theater.objects.all()
+    serializer_class = TheaterSerializer
+    permission_classes = [AllowAny]
 
-class MovieViewSet(viewsets.ModelViewSet):
+
+class MovieViewSet(BatchRetrieveMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     # queryset selects all movies
     queryset = Movie.objects.all()
     # Used to convert to/from JSON 
@@ -15,16 +81,83 @@ class MovieViewSet(viewsets.ModelViewSet):
     # Allow public access for movies
     permission_classes = [AllowAny]  
 
+    # Full-text search over titles and descriptions, best match first: /api/movies/search/?q=...
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        try:
+            limit = min(int(request.query_params.get('limit', 20)), 100)
+        except ValueError:
+            return Response({'error': 'limit must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+        movies = search_movies(request.query_params.get('q', ''), limit=max(limit, 1))
+        serializer = self.get_serializer(movies, many=True)
+        return Response(serializer.data)
+
+    # Upcoming showtimes for the movie, soonest first
     @action(detail=True, methods=['get'])
-    # Returns all seats that are available for the movie
+    def showtimes(self, request, pk=None):
+        movie = self.get_object()
+        showtimes = Showtime.objects.filter(movie=movie, starts_at__gte=timezone.now()).select_related('auditorium')
+        page = self.paginate_queryset(showtimes)
+        serializer = ShowtimeSerializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+
+    @action(detail=True, methods=['get'])
+    # Returns all seats that are available for the movie in the requested theater
     def available_seats(self, request, pk=None):
         movie = self.get_object()
-        available_seats = Seat.objects.filter(booking_status='available')
+        available_seats = Seat.objects.filter(theater_id=requested_theater_id(request), booking_status='available')
         serializer = SeatSerializer(available_seats, many=True)
         return Response(serializer.data)
 
+    # Cancels every booking for the movie (e.g. a cancelled showing), releases the seats and
+    # returns the total refunded. Staff only, runs as one set-based UPDATE/DELETE instead of a
+    # request per booking
+    @action(detail=True, methods=['post'], permission_classes=[IsAdminUser])
+    def cancel_bookings(self, request, pk=None):
+        movie = self.get_object()
+        cancelled, refunded = Booking.objects.filter(movie=movie).cancel()
+        return Response({'cancelled': cancelled, 'refunded': str(refunded)})
+
+    # GET shows the user's waitlist entry, POST joins the queue once the movie is sold out,
+    # DELETE leaves it. Seats are offered by the process_waitlist worker, not in the request
+    @action(detail=True, methods=['get', 'post', 'delete'], permission_classes=[IsAuthenticated])
+    def waitlist(self, request, pk=None):
+        movie = self.get_object()
+        entry = WaitlistEntry.objects.filter(
+            movie=movie, user=request.user, status__in=['waiting', 'offered']
+        ).first()
+
+        if request.method == 'POST':
+            if entry is None:
+                theater_id = requested_theater_id(request)
+                if Seat.objects.filter(theater_id=theater_id, booking_status='available').exists():
+                    return Response({'error': 'Seats are still available'},
+                                    status=status.HTTP_400_BAD_REQUEST)
+                entry = WaitlistEntry.objects.create(movie=movie, user=request.user, theater_id=theater_id)
+            return Response(self._waitlist_data(entry), status=status.HTTP_201_CREATED)
 
-class SeatViewSet(viewsets.ModelViewSet):
+        if entry is None:
+            return Response({'error': 'Not on the waitlist'}, status=status.HTTP_404_NOT_FOUND)
+
+        if request.method == 'DELETE':
+            leave_waitlist(entry)
+            return Response(status=status.HTTP_204_NO_CONTENT)
+
+        return Response(self._waitlist_data(entry))
+
+    # Entry data plus how many people are ahead in the queue
+    def _waitlist_data(self, entry):
+        data = WaitlistEntrySerializer(entry).data
+        data['position'] = None
+        if entry.status == 'waiting':
+            data['position'] = WaitlistEntry.objects.filter(
+                movie_id=entry.movie_id, theater_id=entry.theater_id, status='waiting',
+                created_at__lt=entry.created_at,
+            ).count() + 1
+        return data
+
+
+class SeatViewSet(TheaterScopedViewMixin, BatchRetrieveMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     # queryset selects all seats
     queryset = Seat.objects.all()
     # Converts to/from JSON
@@ -32,16 +165,48 @@ class SeatViewSet(viewsets.ModelViewSet):
     # Allow public access for seats
     permission_classes = [AllowAny] 
 
+    # New seats go to the URL's theater, or the default one on /api/seats/
+    def perform_create(self, serializer):
+        serializer.save(theater_id=self.theater_id())
+
     # Returns seats with available status
     @action(detail=False, methods=['get'])
-    def available(self, request):
-        available_seats = Seat.objects.filter(booking_status='available')
+    def available(self, request, theater_id=None):
+        available_seats = self.get_queryset().filter(booking_status='available')
         serializer = self.get_serializer(available_seats, many=True)
         return Response(serializer.data)
 
+    # Seat ids, numbers and status codes in bitmap order. Clients fetch it once and
+    # refetch only when the version returned by status_map changes. Maps are per theater,
+    # /api/seats/ serves the default theater's
+    @action(detail=False, methods=['get'])
+    def layout(self, request, theater_id=None):
+        return Response(seatmap.layout(self.theater_id()))
+
+    # Every seat's status packed into 2 bits, base64 in JSON by default or the raw
+    # bytes with ?encoding=binary. A few hundred bytes even for a large auditorium.
+    # ?showtime=<id> adds the showtime's cached price per seat class to the JSON
+    @action(detail=False, methods=['get'])
+    def status_map(self, request, theater_id=None):
+        if request.query_params.get('encoding') == 'binary':
+            version, packed = seatmap.status_bitmap(self.theater_id())
+            response = HttpResponse(packed, content_type='application/octet-stream')
+            response['X-Layout-Version'] = version
+            return response
+        version, bitmap = seatmap.status_bitmap_base64(self.theater_id())
+        data = {'layout': version, 'bitmap': bitmap}
+        if request.query_params.get('showtime'):
+            try:
+                data['prices'] = price_table(int(request.query_params['showtime']))
+            except ValueError:
+                return Response({'error': 'showtime must be a number'}, status=status.HTTP_400_BAD_REQUEST)
+            if data['prices'] is None:
+                return Response({'error': 'Showtime not found'}, status=status.HTTP_404_NOT_FOUND)
+        return Response(data)
+
     # Creates a booking if seat is available for the specific movie. This requires authentication (logged in)
     @action(detail=True, methods=['post'], permission_classes=[IsAuthenticated])
-    def book(self, request, pk=None):
+    def book(self, request, pk=None, theater_id=None):
         seat = self.get_object()
         movie_id = request.data.get('movie_id')
 
@@ -50,7 +215,7 @@ class SeatViewSet(viewsets.ModelViewSet):
                             status=status.HTTP_400_BAD_REQUEST)
 
         serializer = SeatBookingSerializer(
-            data={'movie_id': movie_id, 'seat_id': seat.id},
+            data={'movie_id': movie_id, 'seat_id': seat.id, 'showtime_id': request.data.get('showtime_id')},
             context={'request': request}
         )
 
@@ -61,8 +226,19 @@ class SeatViewSet(viewsets.ModelViewSet):
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
 
 
-class BookingViewSet(viewsets.ModelViewSet):
+# Upcoming showtimes of one theater, soonest first: /api/theaters/<id>/showtimes/
+class ShowtimeViewSet(TheaterScopedViewMixin, viewsets.ReadOnlyModelViewSet):
+    serializer_class = ShowtimeSerializer
+    permission_classes = [AllowAny]
+
+    def get_queryset(self):
+        return Showtime.objects.filter(starts_at__gte=timezone.now()).select_related('auditorium')
+
+
+class BookingViewSet(TheaterScopedViewMixin, SparseQuerysetMixin, viewsets.ModelViewSet):
     serializer_class = BookingSerializer
+    # ?fields= and ?expand= also narrow the history query
+    sparse_actions = ('list', 'retrieve', 'history')
 
     # Ensure bookings requires login
     permission_classes = [IsAuthenticated]
@@ -74,24 +250,56 @@ class BookingViewSet(viewsets.ModelViewSet):
             return Booking.objects.none()
         return Booking.objects.filter(user=user)
 
-    # Returns a list of bookings from user
+    # DELETE releases the seat in the same transaction as the booking is removed
+    def perform_destroy(self, instance):
+        instance.cancel()
+
+    # Cancels one of the user's bookings, frees the seat and returns the amount refunded
+    @action(detail=True, methods=['post'])
+    def cancel(self, request, pk=None, theater_id=None):
+        booking = self.get_object()
+        _, refunded = booking.cancel()
+        return Response({'cancelled': booking.id, 'refunded': str(refunded)})
+
+    # Returns a list of bookings from user. ?full=true also includes archived bookings,
+    # merged newest first
     @action(detail=False, methods=['get'])
-    def history(self, request):
-        bookings = self.get_queryset()
-        serializer = self.get_serializer(bookings, many=True)
-        return Response(serializer.data)
+    def history(self, request, theater_id=None):
+        bookings = self.filter_queryset(self.get_queryset())
+        if request.query_params.get('full') not in ('1', 'true'):
+            return Response(self.get_serializer(bookings, many=True).data)
+
+        # The merge sorts on an annotated date so it works whatever ?fields= left out
+        bookings = list(bookings.annotate(merge_date=F('booking_date')))
+        archived = list(
+            ArchivedBooking.objects.filter(user=request.user).select_related('user')
+            .annotate(merge_date=F('booking_date'))
+        )
+        # Archived rows get the same fields as current ones, never expanded
+        keep = set(self.get_serializer().fields) | {'archived'}
+        current = (
+            (row, {**data, 'archived': False})
+            for row, data in zip(bookings, self.get_serializer(bookings, many=True).data)
+        )
+        old = (
+            (row, {name: value for name, value in data.items() if name in keep})
+            for row, data in zip(archived, ArchivedBookingSerializer(archived, many=True).data)
+        )
+        # Both lists are already newest first, so a merge keeps the order without a full sort
+        merged = heapq.merge(current, old, key=lambda pair: pair[0].merge_date, reverse=True)
+        return Response([data for _, data in merged])
 
 
 # Gets all movies at displays as movie_list.html
 def movie_list(request):
     movies = Movie.objects.all()
-    return render(request, 'bookings/movie_list.html', {'movies': movies})
+    return render(request, 'bookings/movie_list.html', {'movies': movies, 'movie_list_timeout': MOVIE_LIST_TIMEOUT})
 
 # Gets a specific movie by id or 404 
-# Gets all seats and displays at seat_bookings.html
+# Gets the theater's available seats and displays at seat_bookings.html
 def seat_booking(request, movie_id):
     movie = get_object_or_404(Movie, id=movie_id)
-    available_seats = Seat.objects.filter(booking_status='available')
+    available_seats = Seat.objects.filter(theater_id=requested_theater_id(request), booking_status='available')
     return render(request, 'bookings/seat_booking.html', {
         'movie': movie,
         'seats': available_seats
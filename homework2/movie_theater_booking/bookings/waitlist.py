@@ -0,0 +1,119 @@
+from collections import Counter
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from .models import Booking, BookingEvent, Seat, WaitlistEntry
+from .signals import seats_changed
+
+# How long a freed seat is held for the next user in line
+HOLD_MINUTES = getattr(settings, 'WAITLIST_HOLD_MINUTES', 15)
+
+
+# Sends seats_changed once the surrounding transaction commits
+def _notify(seat_ids, status):
+    if seat_ids:
+        transaction.on_commit(lambda: seats_changed.send(sender=Seat, seat_ids=seat_ids, status=status))
+
+
+# Removes a user from the queue. Leaving while an offer is open gives the held seat back
+def leave_waitlist(entry):
+    with transaction.atomic():
+        if entry.status == 'offered' and entry.seat_id:
+            if Seat.objects.filter(id=entry.seat_id, booking_status='held').update(booking_status='available'):
+                BookingEvent.record('release', [entry.seat_id], movie_id=entry.movie_id, user_id=entry.user_id)
+            _notify([entry.seat_id], 'available')
+        entry.status = 'expired'
+        entry.save(update_fields=['status'])
+
+
+# Releases seats whose hold ran out and marks those offers expired. Returns how many expired
+def expire_offers(batch_size=100):
+    with transaction.atomic():
+        entries = list(
+            WaitlistEntry.objects.select_for_update(skip_locked=True)
+            .filter(status='offered', offer_expires_at__lte=timezone.now())[:batch_size]
+        )
+        if not entries:
+            return 0
+        seat_ids = [entry.seat_id for entry in entries if entry.seat_id]
+        Seat.objects.filter(id__in=seat_ids, booking_status='held').update(booking_status='available')
+        WaitlistEntry.objects.filter(id__in=[entry.id for entry in entries]).update(status='expired')
+        BookingEvent.objects.bulk_create([
+            BookingEvent(kind='release', seat_id=entry.seat_id, movie_id=entry.movie_id, user_id=entry.user_id)
+            for entry in entries if entry.seat_id
+        ])
+        _notify(seat_ids, 'available')
+    return len(entries)
+
+
+# Holds available seats for the oldest waiting users. Returns how many offers were made
+def offer_seats(batch_size=100):
+    with transaction.atomic():
+        entries = list(
+            WaitlistEntry.objects.select_for_update(skip_locked=True)
+            .filter(status='waiting')[:batch_size]
+        )
+        if not entries:
+            return 0
+        # Users are only offered seats in the theater they are waiting at, one query per theater
+        waiting = Counter(entry.theater_id for entry in entries)
+        seats = {
+            theater_id: list(
+                Seat.objects.select_for_update(skip_locked=True)
+                .filter(theater_id=theater_id, booking_status='available')[:count]
+            )
+            for theater_id, count in waiting.items()
+        }
+        if not any(seats.values()):
+            return 0
+
+        # Skip any seat that already has a booking for the waiter's movie
+        taken = set(
+            Booking.objects.filter(
+                seat__in=[seat for free in seats.values() for seat in free],
+                movie_id__in={entry.movie_id for entry in entries},
+            ).values_list('movie_id', 'seat_id')
+        )
+        expires_at = timezone.now() + timedelta(minutes=HOLD_MINUTES)
+        offered = []
+        for entry in entries:
+            free = seats[entry.theater_id]
+            for seat in free:
+                if (entry.movie_id, seat.id) not in taken:
+                    free.remove(seat)
+                    entry.status = 'offered'
+                    entry.seat = seat
+                    entry.offer_expires_at = expires_at
+                    offered.append(entry)
+                    break
+
+        seat_ids = [entry.seat_id for entry in offered]
+        Seat.objects.filter(id__in=seat_ids).update(booking_status='held')
+        WaitlistEntry.objects.bulk_update(offered, ['status', 'seat', 'offer_expires_at'])
+        BookingEvent.objects.bulk_create([
+            BookingEvent(kind='hold', seat_id=entry.seat_id, movie_id=entry.movie_id, user_id=entry.user_id)
+            for entry in offered
+        ])
+        _notify(seat_ids, 'held')
+    return len(offered)
+
+
+# One pass of the waitlist worker. Expired holds are released first so their seats
+# can go straight to the next user in line
+def process_waitlist(batch_size=100):
+    expired = 0
+    while True:
+        count = expire_offers(batch_size)
+        expired += count
+        if count < batch_size:
+            break
+    offered = 0
+    while True:
+        count = offer_seats(batch_size)
+        offered += count
+        if count < batch_size:
+            break
+    return expired, offered
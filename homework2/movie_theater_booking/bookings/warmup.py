@@ -0,0 +1,95 @@
+import time
+from datetime import timedelta
+
+from django.contrib.auth.models import AnonymousUser
+from django.core.cache import cache
+from django.core.cache.utils import make_template_fragment_key
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from django.http import HttpRequest
+from django.template.loader import get_template
+from django.utils import timezone
+
+from . import pricing, seatmap
+from .models import Movie, Showtime
+
+# The movie cards on the home page are cached as one template fragment under this name.
+# Saves and deletes clear it, the timeout bounds how long it outlives other writes
+MOVIE_LIST_FRAGMENT = 'movie_list'
+MOVIE_LIST_TIMEOUT = 10 * 60
+
+# Templates compiled ahead of the first request
+TEMPLATES = [
+    'bookings/base.html',
+    'bookings/movie_list.html',
+    'bookings/seat_booking.html',
+    'bookings/booking_history.html',
+]
+
+
+# Drops the rendered movie cards. Call after bulk writes that skip model signals
+def invalidate_movie_list():
+    cache.delete(make_template_fragment_key(MOVIE_LIST_FRAGMENT))
+
+
+@receiver(post_save, sender=Movie)
+@receiver(post_delete, sender=Movie)
+def movie_changed_invalidate(sender, **kwargs):
+    invalidate_movie_list()
+
+
+def prime_templates():
+    for name in TEMPLATES:
+        get_template(name)
+    return len(TEMPLATES)
+
+
+# Renders the home page once as an anonymous visitor, which fills the movie list fragment
+def render_movie_list():
+    from .views import movie_list
+
+    request = HttpRequest()
+    request.method = 'GET'
+    request.path = '/'
+    request.user = AnonymousUser()
+    movie_list(request)
+    return Movie.objects.count()
+
+
+# Seat layouts and status bitmaps of every theater with a showtime in the window
+def warm_seat_maps(upcoming):
+    theater_ids = list(upcoming.values_list('theater_id', flat=True).distinct().order_by())
+    for theater_id in theater_ids:
+        seatmap.status_bitmap(theater_id)
+    return len(theater_ids)
+
+
+# Stored price tables go to the cache in one call. Showtimes without one are built one by one
+def warm_price_tables(upcoming):
+    tables = {}
+    for showtime_id, table in upcoming.values_list('id', 'price_table'):
+        if table:
+            tables[pricing.cache_key(showtime_id)] = table
+        else:
+            pricing.price_table(showtime_id)
+    cache.set_many(tables, pricing.PRICE_TABLE_TIMEOUT)
+    return upcoming.count()
+
+
+# Fills the caches a cold process would otherwise fill on its first requests.
+# Returns (step, items warmed, seconds) for each step
+def warm_caches(hours=24):
+    now = timezone.now()
+    upcoming = Showtime.objects.filter(starts_at__gte=now, starts_at__lt=now + timedelta(hours=hours))
+    steps = [
+        ('templates', prime_templates),
+        ('movie_list', render_movie_list),
+        ('seat_maps', lambda: warm_seat_maps(upcoming)),
+        ('price_tables', lambda: warm_price_tables(upcoming)),
+    ]
+    timings = []
+    for name, step in steps:
+        started = time.perf_counter()
+        count = step()
+        timings.append((name, count, time.perf_counter() - started))
+    return timings
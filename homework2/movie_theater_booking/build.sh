@@ -10,6 +10,12 @@ python manage.py collectstatic --no-input
 echo "Running migrations"
 python manage.py migrate
 
+echo "Creating the cache table"
+python manage.py createcachetable
+
+echo "Creating upcoming booking partitions"
+python manage.py booking_partitions --ahead 3
+
 echo "Creating superuser if it doesn't exist"
 python manage.py shell -c "
 from django.contrib.auth import get_user_model
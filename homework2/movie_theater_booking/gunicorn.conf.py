@@ -0,0 +1,64 @@
+# Gunicorn settings for Render. Gunicorn picks this file up from the working directory,
+# so the start command is just: gunicorn
+import os
+
+
+# CPUs this process may actually run on (respects container limits where cpu_count doesn't)
+def available_cpus():
+    try:
+        return len(os.sched_getaffinity(0))
+    except AttributeError:
+        return os.cpu_count() or 1
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '8000')}"
+
+# sync, gthread (default, good for views that mostly wait on the database) or
+# uvicorn.workers.UvicornWorker (needs uvicorn installed, serves the ASGI app)
+worker_class = os.environ.get('GUNICORN_WORKER_CLASS', 'gthread')
+wsgi_app = (
+    'movie_theater_booking.asgi:application' if 'uvicorn' in worker_class
+    else 'movie_theater_booking.wsgi:application'
+)
+
+# (2 x cores) + 1, capped so small instances don't run out of memory.
+# WEB_CONCURRENCY overrides it
+workers = int(os.environ.get(
+    'WEB_CONCURRENCY', min(available_cpus() * 2 + 1, int(os.environ.get('GUNICORN_MAX_WORKERS', 8)))
+))
+# Only used by gthread workers
+threads = int(os.environ.get('GUNICORN_THREADS', 4))
+
+# Import Django once in the master and fork workers from it, so workers start instantly
+# and share the imported code copy-on-write. Nothing may open a database connection
+# before the fork
+preload_app = True
+
+# Recycle workers now and then to cap memory growth, with jitter so they don't all restart together
+max_requests = int(os.environ.get('GUNICORN_MAX_REQUESTS', 1000))
+max_requests_jitter = 100
+
+timeout = 30
+graceful_timeout = 30
+keepalive = 5
+accesslog = '-'
+
+
+# Runs in the master once the app is loaded, before any worker is forked. Templates compiled
+# here are shared by the workers copy-on-write, and the movie list, seat maps and price
+# tables go to the shared cache once instead of once per worker. The database connection
+# used for warming is closed so no worker inherits the master's socket.
+# WARM_CACHES=False skips it
+def when_ready(server):
+    if not preload_app or os.environ.get('WARM_CACHES', 'True') != 'True':
+        return
+    from django.db import connections
+    from bookings.warmup import warm_caches
+
+    try:
+        for name, count, elapsed in warm_caches():
+            server.log.info("Warmed %s (%d) in %.1fms", name, count, elapsed * 1000)
+    except Exception:
+        server.log.exception("Cache warm-up failed, starting cold")
+    finally:
+        connections.close_all()
@@ -6,7 +6,8 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 
 SECRET_KEY = os.environ.get('SECRET_KEY', 'supa-secwet-key')
 
-DEBUG = 'True'
+# On unless DEBUG=False is set in the environment (e.g. on Render)
+DEBUG = os.environ.get('DEBUG', 'True') == 'True'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -34,12 +35,15 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    # /healthz and /readyz are answered here, before the rest of the stack
+    'bookings.middleware.HealthCheckMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
     'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'bookings.middleware.ReplicaPinningMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
 ]
@@ -71,6 +75,12 @@ if os.environ.get('DATABASE_URL'):
     DATABASES = {
         'default': dj_database_url.parse(os.environ.get('DATABASE_URL'))
     }
+    # Optional read replica for list/detail reads
+    if os.environ.get('REPLICA_DATABASE_URL'):
+        DATABASES['replica'] = dj_database_url.parse(os.environ.get('REPLICA_DATABASE_URL'))
+        # Tests use the primary's test database for the replica alias
+        DATABASES['replica']['TEST'] = {'MIRROR': 'default'}
+        REPLICA_DATABASE_ALIAS = 'replica'
 else:
     # Local db
     DATABASES = {
@@ -80,6 +90,32 @@ else:
         }
     }
 
+# Seat maps, price tables and the movie list are cached for every gunicorn worker and
+# invalidated by whichever process writes (workers, run_jobs, reprice_showtimes, imports),
+# so the cache must be shared between processes. Redis when REDIS_URL is set, otherwise
+# a table in the default database (created by python manage.py createcachetable)
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'bookings_cache',
+        }
+    }
+
+# Reads go to the replica when one is configured, writes always go to default
+DATABASE_ROUTERS = ['bookings.routers.PrimaryReplicaRouter']
+# Seconds a client keeps reading from the primary after a write
+REPLICA_STICKY_SECONDS = 10
+# Seconds /readyz gives the database before reporting it unavailable
+READYZ_DB_TIMEOUT = 2
+
 # Password validation
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -96,13 +132,24 @@ AUTH_PASSWORD_VALIDATORS = [
     },
 ]
 
+# Swaps in a fast password hasher for the test run
+TEST_RUNNER = 'movie_theater_booking.test_runner.TestRunner'
+
 LANGUAGE_CODE = 'en-us'
 
 # Static files
 STATIC_URL = '/static/'
 STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
+# Fingerprinted file names plus gzip and brotli (when Brotli is installed) copies made at
+# collectstatic time. WhiteNoise serves hashed files with immutable, year-long cache headers
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Reprice upcoming showtimes from occupancy in the reprice_showtimes batch. Off means fixed prices
+DYNAMIC_PRICING = os.environ.get('DYNAMIC_PRICING', 'False') == 'True'
+
+# Emails from background jobs print to the console unless a real backend is configured
+EMAIL_BACKEND = os.environ.get('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+
 # Default primary key field type
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
@@ -116,5 +163,10 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.BasicAuthentication',
     ],
     'DEFAULT_PAGINATION_CLASS': 'rest_framework.pagination.PageNumberPagination',
-    'PAGE_SIZE': 20
+    'PAGE_SIZE': 20,
+    # JSON only in production, the browsable API (templates, forms, extra content
+    # negotiation) is only set up when DEBUG is on. JSON is encoded with orjson when installed
+    'DEFAULT_RENDERER_CLASSES': [
+        'bookings.renderers.FastJSONRenderer',
+    ] + (['rest_framework.renderers.BrowsableAPIRenderer'] if DEBUG else []),
 }